@@ -1,48 +1,163 @@
-from flask import Flask, render_template, jsonify, request, redirect, url_for, flash
+from flask import Flask, render_template, jsonify, request, redirect, url_for, flash, Response, stream_with_context, session, g
 import os
 import json
+import uuid
+import re
 import pandas as pd
-from data_processor import DataProcessor
+from data_processor import DataProcessor, DEFAULT_PAGE_SIZE
+from session_registry import ProcessorRegistry
+from profile_store import ProfileStore
+from backends import DEFAULT_BACKEND, create_backend
+from upload_store import UploadStore, MAX_CHUNK_BYTES
+from connection_pool import shared_pool
+from table_cache import shared_table_cache
+from query_cache import shared_query_cache
+from chart_cache import shared_chart_cache
+from instrumentation import (
+    metrics, start_trace, end_trace, start_profiler, profile_report, stats_gauges
+)
+from job_queue import JobQueue
+from warmup import schedule_warmup
+from serialization import FastJSONProvider, ORIENTS, DEFAULT_ORIENT, json_response, frame_to_json, compress_response
+from live_dashboard import live_events
+from table_loader import is_date_type
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key'
 app.config['UPLOAD_FOLDER'] = 'uploads'
 
+# jsonify() through orjson when it is installed
+app.json = FastJSONProvider(app)
+
+# Per-request timings in a Server-Timing header, and cProfile reports for ?profile=1 requests
+app.config['SERVER_TIMING'] = os.environ.get('SERVER_TIMING') == '1'
+app.config['PROFILING'] = os.environ.get('PROFILING') == '1'
+
 # Create uploads folder if it doesn't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-# Initialize data processor without database
-data_processor = DataProcessor()
+# Chunked, resumable uploads deduplicated by content hash
+upload_store = UploadStore(app.config['UPLOAD_FOLDER'])
+
+# Execution backend for filters, stats and chart series ('sqlite' or 'duckdb')
+app.config['ANALYTICS_BACKEND'] = os.environ.get('ANALYTICS_BACKEND', DEFAULT_BACKEND)
+analytics_backend = None
+if app.config['ANALYTICS_BACKEND'] != DEFAULT_BACKEND:
+    analytics_backend = create_backend(app.config['ANALYTICS_BACKEND'], shared_pool)
+
+# Background warm-up work (row counts, profiles, chart pre-rendering) on a bounded worker pool
+job_queue = JobQueue(workers=int(os.environ.get('WARMUP_WORKERS', 2)))
+
+# Table profiles persist next to the uploads so they survive restarts
+app.config['PROFILE_FOLDER'] = app.config['UPLOAD_FOLDER']
+profile_store = ProfileStore(app.config['PROFILE_FOLDER'], job_queue=job_queue)
+
+# Ids the custom query form may submit for cancellation
+QUERY_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+# One data processor per browser session (created on first use)
+def create_processor():
+    return DataProcessor(profile_store=profile_store, backend=analytics_backend)
+
+processor_registry = ProcessorRegistry(processor_factory=create_processor)
+
+def get_data_processor():
+    """Return the data processor for the current session"""
+    if 'data_processor' not in g:
+        if 'sid' not in session:
+            session['sid'] = uuid.uuid4().hex
+        g.data_processor = processor_registry.get(session['sid'], session.get('db_path'))
+    return g.data_processor
+
+@app.after_request
+def compress(response):
+    """gzip/br-compress JSON and HTML responses for clients that accept it"""
+    return compress_response(response, request.accept_encodings)
+
+@app.before_request
+def begin_trace():
+    """Start collecting spans and counters for this request"""
+    g.trace, g.trace_token = start_trace()
+    if app.config['PROFILING'] and request.args.get('profile') == '1':
+        start_profiler(g.trace)
+
+@app.after_request
+def finish_trace(response):
+    """Record the request duration and attach Server-Timing (or the profile report)"""
+    trace = g.get('trace')
+    if trace is None:
+        return response
+    metrics.observe(
+        'http_request_duration_seconds', trace.elapsed(),
+        endpoint=request.endpoint or 'unknown', method=request.method, status=response.status_code
+    )
+    if trace.profiler is not None:
+        response = Response(profile_report(trace), mimetype='text/plain')
+    if app.config['SERVER_TIMING']:
+        response.headers['Server-Timing'] = trace.server_timing()
+    return response
+
+@app.teardown_request
+def close_trace(exc):
+    token = g.pop('trace_token', None)
+    if token is not None:
+        end_trace(token)
+
+def get_orient():
+    """Row layout requested with ?orient= (records, split or columns)"""
+    orient = request.args.get('orient', DEFAULT_ORIENT)
+    if orient not in ORIENTS:
+        raise ValueError(f"Unsupported orient '{orient}' (use one of: {', '.join(ORIENTS)})")
+    return orient
 
 @app.context_processor
 def inject_data_processor():
-    return dict(data_processor=data_processor)
+    return dict(data_processor=get_data_processor())
 
 @app.route('/')
 def index():
     """Home page"""
+    data_processor = get_data_processor()
     # Check if database is connected
     is_connected = hasattr(data_processor, 'db_path') and data_processor.db_path
     
     return render_template('index.html', is_connected=is_connected)
 
+def connect_session(data_processor, db_path):
+    """Connect the session's processor to a database and queue warm-up jobs for its tables.
+
+    Jobs still pending for the database the session used before are cancelled.
+    """
+    if not data_processor.connect_to_database(db_path):
+        return False
+    session['db_path'] = db_path
+    job_queue.cancel_group(session['sid'])
+    
+    # Warm-up gets its own processor so it never swaps the table the session has loaded
+    warmup_processor = create_processor()
+    if warmup_processor.connect_to_database(db_path):
+        schedule_warmup(job_queue, warmup_processor, group=session['sid'])
+    return True
+
 @app.route('/connect', methods=['GET', 'POST'])
 def connect_db():
     """Connect to a database"""
+    data_processor = get_data_processor()
     if request.method == 'POST':
         # Check if database file was uploaded
         if 'database_file' in request.files:
             db_file = request.files['database_file']
             
             if db_file.filename:
-                # Save the uploaded file
-                file_path = os.path.join(app.config['UPLOAD_FOLDER'], db_file.filename)
-                db_file.save(file_path)
+                # Save the uploaded file (an identical database already uploaded is reused)
+                try:
+                    file_path = upload_store.save(db_file.filename, db_file.stream)['db_path']
+                except ValueError as e:
+                    flash(str(e))
+                    return redirect(url_for('connect_db'))
                 
                 # Connect to the database
-                success = data_processor.connect_to_database(file_path)
-                
-                if success:
+                if connect_session(data_processor, file_path):
                     return redirect(url_for('tables'))
                 else:
                     flash("Error connecting to database")
@@ -51,154 +166,431 @@ def connect_db():
         # Alternative: Use existing database path
         db_path = request.form.get('db_path')
         if db_path and os.path.exists(db_path):
-            success = data_processor.connect_to_database(db_path)
-            
-            if success:
+            if connect_session(data_processor, db_path):
                 return redirect(url_for('tables'))
             else:
                 flash("Error connecting to database")
                 
     # GET request: show connection form
-    return render_template('connect.html')
+    return render_template('connect.html', max_chunk_bytes=MAX_CHUNK_BYTES)
+
+@app.route('/disconnect', methods=['POST'])
+def disconnect_db():
+    """Disconnect the session from its database, dropping its processor and pending jobs"""
+    if 'sid' in session:
+        job_queue.cancel_group(session['sid'])
+        processor_registry.remove(session['sid'])
+        g.pop('data_processor', None)
+    session.pop('db_path', None)
+    return redirect(url_for('index'))
+
+@app.route('/api/upload', methods=['POST'])
+def start_upload():
+    """Start a chunked upload; connects right away if a database with the given sha256 is already stored"""
+    data_processor = get_data_processor()
+    params = request.get_json(silent=True) or {}
+    try:
+        upload = upload_store.start(params.get('filename'), params.get('size'), params.get('sha256'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    if 'db_path' in upload:
+        if not connect_session(data_processor, upload['db_path']):
+            return jsonify({"error": "Error connecting to database"}), 400
+        upload['redirect'] = url_for('tables')
+    return jsonify(upload)
+
+@app.route('/api/upload/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    """Bytes received so far, so an interrupted upload can resume"""
+    try:
+        return jsonify(upload_store.status(upload_id))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+
+@app.route('/api/upload/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    """Append the request body to an upload at ?offset="""
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        return jsonify({"error": "offset is required"}), 400
+    try:
+        received = upload_store.append(upload_id, offset, request.stream, request.content_length)
+    except ValueError as e:
+        # 409 tells the client to resume from the offset the server has
+        try:
+            status = upload_store.status(upload_id)
+        except ValueError:
+            return jsonify({"error": str(e)}), 404
+        return jsonify({"error": str(e), "received": status['received']}), 409
+    return jsonify({"upload_id": upload_id, "received": received})
+
+@app.route('/api/upload/<upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    """Finish an upload and connect to the stored database"""
+    data_processor = get_data_processor()
+    try:
+        upload = upload_store.complete(upload_id)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    if not connect_session(data_processor, upload['db_path']):
+        return jsonify({"error": "Error connecting to database"}), 400
+    upload['redirect'] = url_for('tables')
+    return jsonify(upload)
+
+@app.route('/api/upload/<upload_id>', methods=['DELETE'])
+def abort_upload(upload_id):
+    """Discard an unfinished upload"""
+    upload_store.abort(upload_id)
+    return jsonify({"aborted": True})
 
 @app.route('/tables')
 def tables():
     """Show available tables in the database"""
+    data_processor = get_data_processor()
     if not hasattr(data_processor, 'db_path') or not data_processor.db_path:
         flash("Please connect to a database first")
         return redirect(url_for('connect_db'))
     
     tables = data_processor.get_table_list()
 
-    # Add basic stats for the tables page
-    stats = {
-        'total_records': 0,
-    }
-    
+    # Row counts known so far (warm-up jobs fill in the rest, see /api/jobs)
+    row_counts = data_processor.get_table_row_counts()
 
-    return render_template('tables.html', tables=tables, db_path=data_processor.db_path)
+    return render_template('tables.html', tables=tables, row_counts=row_counts, db_path=data_processor.db_path)
 
 @app.route('/view/<table_name>')
 def view_table(table_name):
     """View a specific table and its basic info"""
+    data_processor = get_data_processor()
     if not hasattr(data_processor, 'db_path') or not data_processor.db_path:
         flash("Please connect to a database first")
         return redirect(url_for('connect_db'))
     
-    # Load the table data
-    success = data_processor.load_table_data(table_name)
+    # Get data preview (one page, following the cursor from the previous page)
+    try:
+        page = data_processor.get_page(
+            table_name,
+            limit=request.args.get('limit', 10, type=int),
+            cursor=request.args.get('cursor') or None
+        )
+    except ValueError as e:
+        flash(f"Error loading table {table_name}: {e}")
+        return redirect(url_for('tables'))
     
-    if not success:
+    if 'error' in page:
         flash(f"Error loading table {table_name}")
         return redirect(url_for('tables'))
     
+    # Get basic stats (aggregated in SQLite, cached until the database changes)
+    stats = data_processor.get_basic_stats(table_name)
+    
     # Get column information
     columns = data_processor.get_column_info(table_name)
     
-    # Get data preview
-    preview = data_processor.get_data_preview(10)
-    
-    # Get basic stats
-    stats = data_processor.get_basic_stats()
+    preview = page['rows']
     
     return render_template(
         'table_view.html', 
         table_name=table_name, 
         columns=columns, 
         preview=preview,
+        page=page,
         stats=stats
     )
 
 @app.route('/dashboard/<table_name>')
 def dashboard(table_name):
     """Show dashboard for a specific table"""
+    data_processor = get_data_processor()
     if not hasattr(data_processor, 'db_path') or not data_processor.db_path:
         flash("Please connect to a database first")
         return redirect(url_for('connect_db'))
     
-    # Load the table data if not already loaded
-    if not data_processor.current_table or data_processor.current_table != table_name:
-        success = data_processor.load_table_data(table_name)
-        
-        if not success:
-            flash(f"Error loading table {table_name}")
-            return redirect(url_for('tables'))
+    # Charts are only listed here; the page fetches each one from /api/chart.
+    # A fresh stored profile avoids loading the table at all.
+    charts = data_processor.get_chart_suggestions(table_name)
     
-    # Generate charts for dashboard
-    charts = data_processor.generate_dashboard_charts()
+    if charts is None:
+        flash(f"Error loading table {table_name}")
+        return redirect(url_for('tables'))
     
     # Get basic stats
-    stats = data_processor.get_basic_stats()
+    stats = data_processor.get_basic_stats(table_name)
     
     # Get column info for filter options
     columns = data_processor.get_column_info(table_name)
     
+    # Date columns can serve as the live dashboard's high-water mark instead of the rowid
+    watermark_columns = [col['name'] for col in columns if is_date_type(col['type'])]
+    
     return render_template(
         'dashboard.html',
         table_name=table_name,
         stats=stats,
         charts=charts,
-        columns=columns
+        columns=columns,
+        watermark_columns=watermark_columns
+    )
+
+@app.route('/api/chart/<table_name>/<path:chart_id>')
+def chart_data(table_name, chart_id):
+    """Get a single dashboard chart (supports If-None-Match)"""
+    data_processor = get_data_processor()
+    if not hasattr(data_processor, 'db_path') or not data_processor.db_path:
+        return jsonify({"error": "Not connected to database"})
+    
+    config = data_processor.get_chart_config(table_name, chart_id)
+    if config is None:
+        return jsonify({"error": f"Unknown chart {chart_id} for table {table_name}"}), 404
+    
+    # Unchanged database and settings: let the browser reuse its copy
+    etag = data_processor.get_chart_etag(table_name, config)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        try:
+            chart_json = data_processor.get_table_chart(table_name, config, raise_errors=True)
+        except Exception as e:
+            return jsonify({"error": f"Chart failed: {e}"}), 500
+        
+        if not chart_json:
+            return jsonify({"error": "No data to chart"}), 404
+        
+        # The figure is already JSON, so splice it in rather than re-encoding it
+        body = '{"config": ' + json.dumps(config) + ', "figure": ' + chart_json + '}'
+        response = Response(body, mimetype='application/json')
+    
+    # Weak: the body may be sent gzip- or br-encoded under the same tag
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@app.route('/api/live/<table_name>')
+def live_updates(table_name):
+    """Server-sent events with the dashboard's charts and stats as rows are appended"""
+    data_processor = get_data_processor()
+    if not hasattr(data_processor, 'db_path') or not data_processor.db_path:
+        return jsonify({"error": "Not connected to database"})
+    
+    try:
+        live_table = data_processor.get_live_table(table_name, watermark=request.args.get('watermark') or None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return Response(
+        stream_with_context(live_events(live_table)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
     )
 
 @app.route('/api/data/<table_name>')
 def get_data(table_name):
     """Get JSON data for a table"""
+    data_processor = get_data_processor()
     if not hasattr(data_processor, 'db_path') or not data_processor.db_path:
         return jsonify({"error": "Not connected to database"})
     
-    # Load table data if not already loaded
-    if not data_processor.current_table or data_processor.current_table != table_name:
-        success = data_processor.load_table_data(table_name)
-        
-        if not success:
-            return jsonify({"error": f"Failed to load table {table_name}"})
+    # Read a single page of rows (limit/offset or keyset cursor)
+    try:
+        orient = get_orient()
+        page = data_processor.get_page(
+            table_name,
+            limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int),
+            offset=request.args.get('offset', 0, type=int),
+            cursor=request.args.get('cursor') or None,
+            include_total=True if request.args.get('total') == '1' else None,
+            as_frame=True
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    # Return data as JSON
-    return jsonify(data_processor.get_data_as_dict())
+    if 'error' in page:
+        return jsonify(page)
+    # Rows are encoded straight from the page DataFrame in the requested orient
+    return json_response(page, orient=orient)
+
+@app.route('/api/export/<table_name>')
+def export_data(table_name):
+    """Stream a whole table as NDJSON or CSV"""
+    data_processor = get_data_processor()
+    if not hasattr(data_processor, 'db_path') or not data_processor.db_path:
+        return jsonify({"error": "Not connected to database"})
+    
+    fmt = request.args.get('format', 'ndjson')
+    try:
+        chunks = data_processor.iter_export(table_name, fmt)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{table_name}.{fmt}"'}
+    )
 
 @app.route('/api/filter/<table_name>', methods=['POST'])
 def filter_data(table_name):
     """Filter data based on parameters"""
+    data_processor = get_data_processor()
     if not hasattr(data_processor, 'db_path') or not data_processor.db_path:
         return jsonify({"error": "Not connected to database"})
     
-    # Load table data if not already loaded
-    if not data_processor.current_table or data_processor.current_table != table_name:
-        success = data_processor.load_table_data(table_name)
-        
-        if not success:
-            return jsonify({"error": f"Failed to load table {table_name}"})
-    
     # Get filter parameters
     filter_params = request.json or {}
+    try:
+        orient = get_orient()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    # Apply filters and return results
-    filtered_data = data_processor.filter_data(filter_params)
-    return jsonify(filtered_data)
+    # Apply filters in SQLite and return only the matching rows
+    filtered_data = data_processor.filter_data(filter_params, table_name, as_frame=True)
+    if isinstance(filtered_data, dict):
+        if 'error' in filtered_data:
+            return jsonify(filtered_data), 400
+        return jsonify(filtered_data)
+    return Response(frame_to_json(filtered_data, orient), mimetype='application/json')
+
+@app.route('/api/pool_stats')
+def pool_stats():
+    """Connection pool counters"""
+    data_processor = get_data_processor()
+    return jsonify(data_processor.pool.stats())
+
+@app.route('/api/cache_stats')
+def cache_stats():
+    """Table cache counters"""
+    data_processor = get_data_processor()
+    return jsonify(data_processor.table_cache.stats())
+
+@app.route('/api/memory/<table_name>')
+def memory_footprint(table_name):
+    """Memory used by a loaded table, per column with its compact dtype"""
+    data_processor = get_data_processor()
+    if not data_processor.db_path:
+        return jsonify({"error": "Not connected to a database"}), 400
+    
+    with data_processor.lock:
+        if not data_processor.load_table_data(table_name):
+            return jsonify({"error": f"Error loading table {table_name}"}), 400
+        return jsonify(data_processor.get_memory_footprint())
 
 @app.route('/custom_query', methods=['GET', 'POST'])
 def custom_query():
-    """Run a custom SQL query"""
+    """Run a custom SQL query.
+
+    A query that isn't cached is started in the background and the browser
+    is redirected to ?query_id=..., which shows it running (the page polls
+    /api/query/<id>) and then its results.
+    """
+    data_processor = get_data_processor()
     if not hasattr(data_processor, 'db_path') or not data_processor.db_path:
         flash("Please connect to a database first")
         return redirect(url_for('connect_db'))
     
     results = None
     error = None
+    warnings = None
+    running_query_id = None
+    query = request.form.get('query')
     
     if request.method == 'POST':
-        query = request.form.get('query')
+        # Set by "Run anyway" after a cost warning
+        confirmed = request.form.get('confirm') == '1'
+        # The form carries a client-generated id for the query
+        query_id = request.form.get('query_id') or None
+        if query_id and not QUERY_ID_PATTERN.fullmatch(query_id):
+            query_id = None
         if query:
             try:
-                results = data_processor.run_custom_query(query)
-                if isinstance(results, dict) and 'error' in results:
-                    error = results['error']
-                    results = None
+                results = data_processor.start_custom_query(
+                    query, query_id=query_id, owner=session['sid'], confirmed=confirmed
+                )
             except Exception as e:
-                error = str(e)
+                results = {"error": str(e)}
+    elif request.args.get('query_id'):
+        results = data_processor.get_custom_query(request.args['query_id'], owner=session['sid'])
+        if results is None:
+            results = {"error": "This query's result has expired, please run it again"}
     
-    return render_template('custom_query.html', results=results, error=error)
+    if results is not None:
+        if 'error' in results:
+            error = results['error']
+            results = None
+        elif results.get('needs_confirmation'):
+            warnings = results['warnings']
+            results = None
+        elif results.get('status') == 'running':
+            if request.method == 'POST':
+                return redirect(url_for('custom_query', query_id=results['query_id']))
+            running_query_id = results['query_id']
+            query = results.get('sql', query)
+            results = None
+        else:
+            query = results.get('sql', query)
+    
+    return render_template(
+        'custom_query.html', results=results, error=error, warnings=warnings, query=query or '',
+        running_query_id=running_query_id, query_id=uuid.uuid4().hex
+    )
+
+@app.route('/api/query/<query_id>')
+def query_status(query_id):
+    """Status of a custom query started by this session: running, or its result"""
+    data_processor = get_data_processor()
+    result = data_processor.get_custom_query(query_id, owner=session['sid'])
+    if result is None:
+        return jsonify({"error": "No query with this id"}), 404
+    return jsonify(result)
+
+@app.route('/api/query/<query_id>/cancel', methods=['POST'])
+def cancel_query(query_id):
+    """Cancel a running custom query started by this session"""
+    data_processor = get_data_processor()
+    cancelled = data_processor.cancel_custom_query(query_id, owner=session['sid'])
+    if not cancelled:
+        return jsonify({"error": "No running query with this id"}), 404
+    return jsonify({"cancelled": True})
+
+@app.route('/api/jobs')
+def list_jobs():
+    """Warm-up jobs of this session, with the table row counts known so far"""
+    data_processor = get_data_processor()
+    return jsonify({
+        'jobs': job_queue.jobs(group=session['sid']),
+        'row_counts': data_processor.get_table_row_counts() if data_processor.db_path else {},
+        'chart_cache': data_processor.chart_cache.stats()
+    })
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued or running warm-up job of this session"""
+    get_data_processor()
+    if not job_queue.cancel(job_id, group=session['sid']):
+        return jsonify({"error": "No pending job with this id"}), 404
+    return jsonify({"cancelled": True})
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Request, phase, cache and job metrics in Prometheus text format"""
+    gauges = {'sessions': len(processor_registry)}
+    gauges.update(stats_gauges('connection_pool', shared_pool.stats()))
+    gauges.update(stats_gauges('table_cache', shared_table_cache.stats()))
+    gauges.update(stats_gauges('query_cache', shared_query_cache.stats()))
+    gauges.update(stats_gauges('chart_cache', shared_chart_cache.stats()))
+    gauges.update(stats_gauges('jobs', job_queue.stats()))
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/query_stats')
+def query_stats():
+    """Custom query runner and result cache counters"""
+    data_processor = get_data_processor()
+    return jsonify({
+        'runner': data_processor.query_runner.stats(),
+        'cache': data_processor.query_cache.stats()
+    })
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,380 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from query_compiler import quote_identifier, compile_filters, compile_filter_query
+from chart_engine import ChartEngine, MAX_CATEGORIES, HISTOGRAM_BINS, MAX_BOX_GROUPS, MAX_TIME_BUCKETS, choose_bucket_format
+from stats_engine import StatsEngine, MAX_CATEGORICAL_COLUMNS, TOP_VALUES, _rounded
+from table_cache import database_version
+from table_loader import read_table
+from instrumentation import timed
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+BACKENDS = ('sqlite', 'duckdb')
+DEFAULT_BACKEND = 'sqlite'
+
+# Database errors any backend may raise
+BACKEND_ERRORS = (sqlite3.Error, pd.errors.DatabaseError) + ((duckdb.Error,) if duckdb else ())
+
+# DuckDB column types treated as numeric (everything else is categorical)
+DUCKDB_NUMERIC_TYPES = (
+    'TINYINT', 'SMALLINT', 'INTEGER', 'BIGINT', 'HUGEINT',
+    'UTINYINT', 'USMALLINT', 'UINTEGER', 'UBIGINT', 'UHUGEINT',
+    'FLOAT', 'DOUBLE', 'DECIMAL'
+)
+
+
+def _sqlite_dtypes(df):
+    """Give a result frame the dtypes pandas infers for the same SQLite result.
+
+    That is int64/float64 for numbers (float64 when there are NULLs) and
+    object for everything else, or object throughout for an empty result.
+    DuckDB results (and the compact dtypes of registered tables) otherwise
+    come back as int8, category, nullable Int64 and so on.
+    """
+    if df.empty:
+        return df.astype(object)
+
+    columns = {}
+    for i, dtype in enumerate(df.dtypes):
+        col = df.iloc[:, i]
+        if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+            columns[i] = col.astype('float64' if col.isna().any() else 'int64')
+        elif pd.api.types.is_float_dtype(dtype):
+            columns[i] = col.astype('float64')
+        elif dtype != object:
+            columns[i] = col.astype(object).where(col.notna(), None)
+    if not columns:
+        return df
+
+    df = df.copy()
+    for i, col in columns.items():
+        df.isetitem(i, col)
+    return df
+
+
+class SQLiteBackend:
+    """Default execution backend: filters, stats and chart series run in SQLite.
+
+    Every backend exposes the same three pieces DataProcessor needs:
+    filter_rows(), a stats_engine with table_stats() and a chart_engine
+    with the ChartEngine series methods and build_chart().
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, pool, stats_engine=None):
+        self.pool = pool
+        self.chart_engine = ChartEngine(pool)
+        self.stats_engine = stats_engine or StatsEngine(pool)
+
+    def filter_rows(self, db_path, table_name, filter_params, column_info):
+        """Rows of a table matching filter_params as a DataFrame (ValueError for bad filters)"""
+        query, params = compile_filter_query(table_name, filter_params, column_info)
+        with self.pool.connection(db_path) as conn:
+            return pd.read_sql_query(query, conn, params=params)
+
+    def close(self):
+        pass
+
+
+class DuckDBBackend:
+    """Optional backend running filters, stats and chart series in DuckDB.
+
+    The SQLite file is attached read-only through DuckDB's sqlite extension.
+    If the extension can't be loaded (it is downloaded on first use), each
+    table is read once with the compact loader and registered with DuckDB
+    instead, and re-read when database_version changes. Either way queries
+    run vectorized on all cores. Results match SQLiteBackend, dtypes of
+    filtered rows included, except for the order of tied top values (and
+    of filtered rows); stats are always exact.
+
+    Scatter sampling still runs in SQLite (see DuckDBChartEngine).
+    """
+
+    name = 'duckdb'
+
+    def __init__(self, pool, threads=None):
+        if duckdb is None:
+            raise ImportError("The duckdb backend requires the duckdb package (pip install duckdb)")
+
+        self.pool = pool
+        self.conn = duckdb.connect()
+        if threads:
+            self.conn.execute(f"SET threads = {int(threads)}")
+
+        # One DuckDB connection; each query already uses every core
+        self._lock = threading.RLock()
+        self._attached = {}    # db_path -> schema alias, or None if attaching failed
+        self._registered = {}  # (db_path, table) -> (view name, database_version)
+
+        self.chart_engine = DuckDBChartEngine(self)
+        self.stats_engine = DuckDBStatsEngine(self)
+
+    @staticmethod
+    def _name(prefix, *parts):
+        return prefix + hashlib.sha1('\0'.join(parts).encode('utf-8')).hexdigest()[:12]
+
+    def _attach(self, db_path):
+        """Attach a database file read-only (lock held); returns the alias or None"""
+        if db_path not in self._attached:
+            alias = self._name('src_', db_path)
+            literal = db_path.replace("'", "''")
+            try:
+                self.conn.execute(f"ATTACH '{literal}' AS {alias} (TYPE SQLITE, READ_ONLY)")
+                self._attached[db_path] = alias
+            except duckdb.Error as e:
+                print(f"DuckDB could not attach {db_path}, registering tables instead: {e}")
+                self._attached[db_path] = None
+        return self._attached[db_path]
+
+    def _relation(self, db_path, table_name):
+        """SQL name of a table inside DuckDB (lock held)"""
+        db_path = os.path.abspath(db_path)
+        alias = self._attach(db_path)
+        if alias:
+            return f"{alias}.{quote_identifier(table_name)}"
+
+        key = (db_path, table_name)
+        version = database_version(db_path)
+        registered = self._registered.get(key)
+        if registered is None or registered[1] != version:
+            name = self._name('tbl_', db_path, table_name)
+            with self.pool.connection(db_path) as conn:
+                df = read_table(conn, table_name, parse_date_columns=False)
+            self.conn.register(name, df)
+            self._registered[key] = (name, version)
+        return self._registered[key][0]
+
+    @contextmanager
+    def connection(self, db_path, table_name):
+        """Yield (duckdb connection, relation name for table_name), holding the backend lock"""
+        with self._lock:
+            yield self.conn, self._relation(db_path, table_name)
+
+    def column_types(self, conn, relation):
+        """{column: DuckDB type name} for a relation"""
+        return {row[0]: row[1] for row in conn.execute(f"DESCRIBE SELECT * FROM {relation}").fetchall()}
+
+    def filter_rows(self, db_path, table_name, filter_params, column_info):
+        """Rows of a table matching filter_params as a DataFrame (ValueError for bad filters)"""
+        where_clause, params = compile_filters(table_name, filter_params, column_info)
+        with self.connection(db_path, table_name) as (conn, relation):
+            df = conn.execute(f"SELECT * FROM {relation}{where_clause}", params).df()
+        return _sqlite_dtypes(df)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class DuckDBChartEngine(ChartEngine):
+    """ChartEngine whose aggregate series are computed by a DuckDBBackend.
+
+    build_chart and scatter_points are inherited; scatter sampling relies on
+    SQLite's rowid and random() and keeps using the SQLite pool.
+    """
+
+    def __init__(self, backend):
+        super().__init__(backend.pool)
+        self.backend = backend
+
+    @timed('chart_sql')
+    def category_counts(self, db_path, table_name, column, limit=MAX_CATEGORIES):
+        """Row counts per distinct value (top `limit` values, the rest summed as 'other')"""
+        col = quote_identifier(column)
+        with self.backend.connection(db_path, table_name) as (conn, table):
+            rows = conn.execute(
+                f"SELECT {col}, COUNT(*) AS n FROM {table} WHERE {col} IS NOT NULL "
+                f"GROUP BY {col} ORDER BY n DESC, {col} LIMIT ?",
+                [limit]
+            ).fetchall()
+            total = conn.execute(f"SELECT COUNT({col}) FROM {table}").fetchone()[0]
+
+        counts = [row[1] for row in rows]
+        return {
+            'labels': [row[0] for row in rows],
+            'counts': counts,
+            'other': total - sum(counts)
+        }
+
+    @timed('chart_sql')
+    def category_sums(self, db_path, table_name, column, value_column, limit=MAX_CATEGORIES):
+        """Sum of value_column per distinct value of column (largest `limit` groups)"""
+        col = quote_identifier(column)
+        value = quote_identifier(value_column)
+        with self.backend.connection(db_path, table_name) as (conn, table):
+            rows = conn.execute(
+                f"SELECT {col}, SUM({value}) AS total, COUNT({value}) FROM {table} "
+                f"WHERE {col} IS NOT NULL GROUP BY {col} ORDER BY total DESC NULLS LAST, {col} LIMIT ?",
+                [limit]
+            ).fetchall()
+
+        return {
+            'labels': [row[0] for row in rows],
+            'sums': [row[1] for row in rows],
+            'counts': [row[2] for row in rows]
+        }
+
+    @timed('chart_sql')
+    def histogram(self, db_path, table_name, column, bins=HISTOGRAM_BINS):
+        """Counts of numeric values in `bins` equal-width bins between min and max"""
+        col = quote_identifier(column)
+        with self.backend.connection(db_path, table_name) as (conn, table):
+            if self.backend.column_types(conn, table).get(column, '').split('(')[0] not in DUCKDB_NUMERIC_TYPES:
+                return {'edges': [], 'counts': []}
+
+            low, high, count = conn.execute(
+                f"SELECT MIN({col}), MAX({col}), COUNT({col}) FROM {table}"
+            ).fetchone()
+            if not count:
+                return {'edges': [], 'counts': []}
+
+            width = (high - low) / bins if high > low else 1
+            rows = conn.execute(
+                f"SELECT LEAST(CAST(FLOOR(({col} - ?) / ?) AS BIGINT), ?) AS bin, COUNT(*) "
+                f"FROM {table} WHERE {col} IS NOT NULL GROUP BY bin",
+                [low, width, bins - 1]
+            ).fetchall()
+
+        counts = [0] * bins
+        for bin_index, bin_count in rows:
+            counts[bin_index] = bin_count
+        if high == low:
+            counts = counts[:1]
+        return {
+            'edges': [low + width * i for i in range(len(counts) + 1)],
+            'counts': counts
+        }
+
+    @timed('chart_sql')
+    def box_summary(self, db_path, table_name, group_column, value_column, max_groups=MAX_BOX_GROUPS):
+        """Quartiles (linear interpolation, as pandas), mean, min and max for the largest groups"""
+        group = quote_identifier(group_column)
+        value = quote_identifier(value_column)
+        with self.backend.connection(db_path, table_name) as (conn, table):
+            rows = conn.execute(
+                f"SELECT {group}, COUNT({value}) AS n, MIN({value}), "
+                f"quantile_cont({value}, 0.25), quantile_cont({value}, 0.5), quantile_cont({value}, 0.75), "
+                f"MAX({value}), AVG({value}) "
+                f"FROM {table} WHERE {group} IS NOT NULL AND {value} IS NOT NULL "
+                f"GROUP BY {group} ORDER BY n DESC, {group} LIMIT ?",
+                [max_groups]
+            ).fetchall()
+
+        return [
+            {
+                'group': group_value,
+                'count': count,
+                'min': minimum,
+                'q1': q1,
+                'median': median,
+                'q3': q3,
+                'max': maximum,
+                'mean': mean
+            }
+            for group_value, count, minimum, q1, median, q3, maximum, mean in rows
+        ]
+
+    @timed('chart_sql')
+    def time_series(self, db_path, table_name, date_column, value_column, max_buckets=MAX_TIME_BUCKETS):
+        """Count/sum/min/max of value_column per time bucket (ISO-8601 text or unix epoch dates)"""
+        date = quote_identifier(date_column)
+        value = quote_identifier(value_column)
+        with self.backend.connection(db_path, table_name) as (conn, table):
+            date_type = self.backend.column_types(conn, table).get(date_column, '').split('(')[0]
+            if date_type in DUCKDB_NUMERIC_TYPES:
+                timestamp = f"to_timestamp({date})"
+            else:
+                timestamp = f"TRY_CAST({date} AS TIMESTAMP)"
+
+            start, end = conn.execute(f"SELECT MIN({timestamp}), MAX({timestamp}) FROM {table}").fetchone()
+            if start is None:
+                return {'buckets': [], 'counts': [], 'sums': [], 'mins': [], 'maxs': []}
+
+            bucket_format = choose_bucket_format(pd.Timestamp(start), pd.Timestamp(end), max_buckets)
+            rows = conn.execute(
+                f"SELECT strftime({timestamp}, '{bucket_format}') AS bucket, "
+                f"COUNT({value}), SUM({value}), MIN({value}), MAX({value}) "
+                f"FROM {table} WHERE {timestamp} IS NOT NULL GROUP BY bucket ORDER BY bucket"
+            ).fetchall()
+
+        return {
+            'bucket_format': bucket_format,
+            'buckets': [row[0] for row in rows],
+            'counts': [row[1] for row in rows],
+            'sums': [row[2] for row in rows],
+            'mins': [row[3] for row in rows],
+            'maxs': [row[4] for row in rows]
+        }
+
+
+class DuckDBStatsEngine(StatsEngine):
+    """StatsEngine computing get_basic_stats in DuckDB (always exact, cached the same way)"""
+
+    def __init__(self, backend, max_cached=64):
+        super().__init__(backend.pool, max_cached=max_cached)
+        self.backend = backend
+
+    def _compute(self, db_path, table_name):
+        with self.backend.connection(db_path, table_name) as (conn, table):
+            types = self.backend.column_types(conn, table)
+            numeric_cols = [col for col, col_type in types.items() if col_type.split('(')[0] in DUCKDB_NUMERIC_TYPES]
+            categorical_cols = [col for col in types if col not in numeric_cols][:MAX_CATEGORICAL_COLUMNS]
+
+            aggregates = ['COUNT(*)']
+            for col in numeric_cols:
+                quoted = quote_identifier(col)
+                aggregates.extend([f"AVG({quoted})", f"MEDIAN({quoted})", f"MIN({quoted})", f"MAX({quoted})"])
+            for col in categorical_cols:
+                aggregates.append(f"COUNT(DISTINCT {quote_identifier(col)})")
+            row = conn.execute(f"SELECT {', '.join(aggregates)} FROM {table}").fetchone()
+
+            stats = {
+                'total_records': row[0],
+                'columns': {}
+            }
+
+            position = 1
+            for col in numeric_cols:
+                mean, median, minimum, maximum = row[position:position + 4]
+                position += 4
+                stats['columns'][col] = {
+                    'mean': _rounded(mean),
+                    'median': _rounded(median),
+                    'min': _rounded(minimum),
+                    'max': _rounded(maximum)
+                }
+
+            for col in categorical_cols:
+                unique_values = row[position]
+                position += 1
+                quoted = quote_identifier(col)
+                top = conn.execute(
+                    f"SELECT {quoted}, COUNT(*) AS n FROM {table} WHERE {quoted} IS NOT NULL "
+                    f"GROUP BY {quoted} ORDER BY n DESC, {quoted} LIMIT {TOP_VALUES}"
+                ).fetchall()
+                stats['columns'][col] = {
+                    'type': 'categorical',
+                    'unique_values': unique_values,
+                    'top_values': {value: count for value, count in top}
+                }
+
+        return stats
+
+
+def create_backend(name, pool, stats_engine=None):
+    """Backend instance for a name in BACKENDS"""
+    if name == 'sqlite':
+        return SQLiteBackend(pool, stats_engine=stats_engine)
+    if name == 'duckdb':
+        return DuckDBBackend(pool)
+    raise ValueError(f"Unknown backend '{name}' (expected one of: {', '.join(BACKENDS)})")
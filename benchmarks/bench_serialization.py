@@ -0,0 +1,83 @@
+"""Microbenchmark: DataFrame -> JSON response body.
+
+Compares the old path (to_dict(orient='records') then json encoding, what
+jsonify did) with serialization.frame_to_json in each orient, with and
+without orjson, and reports the gzip ratio.
+
+    python benchmarks/bench_serialization.py [--rows 100000] [--repeat 5]
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serialization  # noqa: E402
+from serialization import ORIENTS, frame_to_json  # noqa: E402
+
+
+def make_frame(rows, seed=0):
+    """Mixed-type frame like a loaded table: ints, floats with NaN, text, category and dates"""
+    rng = np.random.default_rng(seed)
+    values = rng.normal(100, 25, rows)
+    values[rng.random(rows) < 0.05] = np.nan
+    return pd.DataFrame({
+        'id': np.arange(rows, dtype='int64'),
+        'amount': values,
+        'quantity': rng.integers(0, 1000, rows).astype('int32'),
+        'name': [f"item-{i % 5000}" for i in range(rows)],
+        'region': pd.Categorical(rng.choice(['north', 'south', 'east', 'west'], rows)),
+        'created': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 3 * 365 * 86400, rows), unit='s')
+    })
+
+
+def old_path(df):
+    """What the routes did before: records dicts, dates as strings, then json.dumps"""
+    df = df.copy()
+    for col in df.select_dtypes(include=['datetime64']).columns:
+        df[col] = df[col].dt.strftime('%Y-%m-%d')
+    return json.dumps(df.to_dict(orient='records')).encode('utf-8')
+
+
+def best_time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    baseline, body = best_time(lambda: old_path(df), args.repeat)
+    print(f"{args.rows:,} rows, best of {args.repeat}")
+    print(f"{'encoder':<10} {'orient':<8} {'seconds':>8} {'speedup':>8} {'MB':>7} {'gzip MB':>8}")
+    print(f"{'json':<10} {'records':<8} {baseline:8.3f} {1:8.1f} {len(body) / 1e6:7.2f} "
+          f"{len(gzip.compress(body, 6)) / 1e6:8.2f}  (to_dict + json.dumps)")
+
+    orjson = serialization.orjson
+    encoders = [('orjson', orjson)] if orjson is not None else []
+    encoders.append(('pandas', None))
+    for name, module in encoders:
+        serialization.orjson = module
+        for orient in ORIENTS:
+            seconds, body = best_time(lambda: frame_to_json(df, orient), args.repeat)
+            print(f"{name:<10} {orient:<8} {seconds:8.3f} {baseline / seconds:8.1f} {len(body) / 1e6:7.2f} "
+                  f"{len(gzip.compress(body, 6)) / 1e6:8.2f}")
+    serialization.orjson = orjson
+
+
+if __name__ == '__main__':
+    main()
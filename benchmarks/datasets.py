@@ -0,0 +1,111 @@
+"""Synthetic SQLite datasets for the benchmark suite.
+
+Each scale gets one `events` table with mixed column types and
+cardinalities, generated from a fixed seed so every run (and every
+machine) benchmarks the same data:
+
+    id        INTEGER PRIMARY KEY
+    amount    REAL      normal(100, 25), 5% NULL
+    quantity  INTEGER   0-999
+    region    TEXT      8 values (low cardinality)
+    product   TEXT      1,000 values (medium cardinality)
+    user_id   TEXT      rows / 10 values (high cardinality)
+    created   DATETIME  three years of timestamps
+    day       DATE      the date part of created
+
+Databases are built once and reused from the data directory.
+"""
+import os
+import sqlite3
+
+import numpy as np
+
+# Bump when the schema or generator changes so cached databases are rebuilt
+DATASET_VERSION = 1
+
+SCALES = {
+    '10k': 10_000,
+    '1m': 1_000_000,
+    '10m': 10_000_000,
+}
+
+TABLE_NAME = 'events'
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+INSERT_BATCH_ROWS = 100_000
+REGIONS = ['north', 'south', 'east', 'west', 'central', 'coastal', 'mountain', 'island']
+START_EPOCH = 1577836800  # 2020-01-01
+SPAN_SECONDS = 3 * 365 * 86400
+
+SCHEMA = f"""
+CREATE TABLE {TABLE_NAME} (
+    id INTEGER PRIMARY KEY,
+    amount REAL,
+    quantity INTEGER,
+    region TEXT,
+    product TEXT,
+    user_id TEXT,
+    created DATETIME,
+    day DATE
+)
+"""
+
+
+def dataset_path(scale, data_dir=DEFAULT_DATA_DIR):
+    return os.path.join(data_dir, f"synthetic_{scale}_v{DATASET_VERSION}.db")
+
+
+def _batches(rows, seed):
+    """Yield lists of row tuples; dates are epoch seconds turned into text by SQLite"""
+    rng = np.random.default_rng(seed)
+    regions = np.array(REGIONS, dtype=object)
+    products = np.array([f"product-{i:04d}" for i in range(1000)], dtype=object)
+    users = np.array([f"user-{i}" for i in range(max(1, rows // 10))], dtype=object)
+
+    for start in range(0, rows, INSERT_BATCH_ROWS):
+        n = min(INSERT_BATCH_ROWS, rows - start)
+        amount = np.round(rng.normal(100, 25, n), 2).astype(object)
+        amount[rng.random(n) < 0.05] = None
+        created = START_EPOCH + rng.integers(0, SPAN_SECONDS, n)
+        yield list(zip(
+            range(start + 1, start + n + 1),
+            amount.tolist(),
+            rng.integers(0, 1000, n).tolist(),
+            regions[rng.integers(0, len(REGIONS), n)].tolist(),
+            products[rng.zipf(1.3, n) % len(products)].tolist(),
+            users[rng.integers(0, len(users), n)].tolist(),
+            created.tolist(),
+            created.tolist()
+        ))
+
+
+def build_dataset(scale, data_dir=DEFAULT_DATA_DIR, seed=42, force=False):
+    """Create (or reuse) the database for a scale and return its path"""
+    if scale not in SCALES:
+        raise ValueError(f"Unknown scale '{scale}' (use one of: {', '.join(SCALES)})")
+
+    path = dataset_path(scale, data_dir)
+    if os.path.exists(path) and not force:
+        return path
+
+    os.makedirs(data_dir, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute(SCHEMA)
+        for batch in _batches(SCALES[scale], seed):
+            conn.executemany(
+                f"INSERT INTO {TABLE_NAME} VALUES (?, ?, ?, ?, ?, ?, datetime(?, 'unixepoch'), date(?, 'unixepoch'))",
+                batch
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,343 @@
+"""Benchmark DataProcessor methods and Flask routes on synthetic datasets.
+
+    python benchmarks/run.py                              # 10k, 1m and 10m rows
+    python benchmarks/run.py --scales 10k,1m --repeat 10
+    python benchmarks/run.py --output after.json --compare before.json
+
+Methods are timed cold: every run gets a fresh DataProcessor with empty
+table, stats, query and chart caches. Routes are timed through the Flask
+test client after the warm-up jobs queued on connect have finished, i.e.
+the steady state a user sees. Each operation records latency percentiles,
+throughput and (from one extra run under tracemalloc) peak Python memory.
+The JSON report can be compared with an earlier one via --compare.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import time
+import tracemalloc
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+import plotly
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from datasets import SCALES, TABLE_NAME, DEFAULT_DATA_DIR, build_dataset  # noqa: E402
+from backends import SQLiteBackend  # noqa: E402
+from chart_cache import ChartCache  # noqa: E402
+from connection_pool import shared_pool  # noqa: E402
+from data_processor import DataProcessor  # noqa: E402
+from query_cache import QueryCache  # noqa: E402
+from table_cache import TableCache  # noqa: E402
+
+DEFAULT_REPEAT = 5
+DEFAULT_RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Relative change in p50 latency reported as faster/slower by --compare
+DEFAULT_THRESHOLD = 0.10
+
+# Seconds between /api/query/<id> polls while a custom query runs
+QUERY_POLL_INTERVAL = 0.01
+
+# About 0.1% of the rows (1 region of 8, 10 quantities of 1000)
+FILTER_PARAMS = {'region': ['north'], 'quantity': {'min': 0, 'max': 9}}
+CUSTOM_QUERY = (
+    f"SELECT region, COUNT(*) AS n, AVG(amount) AS avg_amount, MAX(created) AS last_created "
+    f"FROM {TABLE_NAME} GROUP BY region ORDER BY n DESC"
+)
+
+
+def fresh_processor(db_path):
+    """A connected DataProcessor that shares no caches with earlier runs"""
+    processor = DataProcessor(
+        table_cache=TableCache(),
+        query_cache=QueryCache(),
+        chart_cache=ChartCache(),
+        backend=SQLiteBackend(shared_pool)
+    )
+    processor.connect_to_database(db_path)
+    return processor
+
+
+def loaded_processor(db_path):
+    processor = fresh_processor(db_path)
+    processor.load_table_data(TABLE_NAME)
+    return processor
+
+
+# name -> (setup(db_path) -> processor, run(processor))
+METHODS = {
+    'load_table_data': (fresh_processor, lambda p: p.load_table_data(TABLE_NAME)),
+    'get_basic_stats': (fresh_processor, lambda p: p.get_basic_stats(TABLE_NAME)),
+    'filter_data': (fresh_processor, lambda p: p.filter_data(FILTER_PARAMS, TABLE_NAME, as_frame=True)),
+    'generate_dashboard_charts': (loaded_processor, lambda p: p.generate_dashboard_charts()),
+    'run_custom_query': (fresh_processor, lambda p: p.run_custom_query(CUSTOM_QUERY, confirmed=True)),
+}
+
+
+def summarize(timings, rows=None, peak_bytes=None):
+    """Latency percentiles (seconds) and throughput for a list of run times"""
+    timings = np.array(timings)
+    p50 = float(np.percentile(timings, 50))
+    summary = {
+        'runs': len(timings),
+        'min': float(timings.min()),
+        'mean': float(timings.mean()),
+        'p50': p50,
+        'p95': float(np.percentile(timings, 95)),
+        'p99': float(np.percentile(timings, 99)),
+        'max': float(timings.max()),
+        'ops_per_second': round(1 / p50, 3) if p50 else None,
+        'peak_memory_bytes': peak_bytes
+    }
+    if rows is not None:
+        summary['rows_per_second'] = round(rows / p50) if p50 else None
+    return summary
+
+
+def measure(func, repeat, setup=None):
+    """Time func(setup()) repeat times, then once more under tracemalloc for peak memory"""
+    timings = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        func(arg)
+        timings.append(time.perf_counter() - start)
+
+    arg = setup() if setup else None
+    tracemalloc.start()
+    try:
+        func(arg)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return timings, peak
+
+
+def bench_methods(db_path, rows, repeat):
+    results = {}
+    for name, (setup, run) in METHODS.items():
+        print(f"  {name}...", flush=True)
+        try:
+            timings, peak = measure(run, repeat, setup=lambda: setup(db_path))
+        except Exception as e:
+            results[name] = {'error': str(e)}
+            continue
+        results[name] = summarize(timings, rows=rows, peak_bytes=peak)
+    return results
+
+
+def wait_for_jobs(job_queue, timeout):
+    """Block until queued warm-up jobs have run (or timeout seconds passed)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = job_queue.stats()
+        if not stats['queued'] and not stats['running']:
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def post_custom_query(client, query=CUSTOM_QUERY):
+    """POST /custom_query like the browser does: follow the redirect to a running
+    query, poll /api/query/<id> until it finishes, then load the results page"""
+    response = client.post('/custom_query', data={'query': query, 'confirm': '1'})
+    if response.status_code != 302:
+        return response  # cached result (or an error) rendered directly
+    location = response.headers['Location']
+    response.close()
+
+    query_id = parse_qs(urlparse(location).query)['query_id'][0]
+    while True:
+        status = client.get(f'/api/query/{query_id}')
+        running = status.status_code == 200 and status.get_json().get('status') == 'running'
+        status.close()
+        if not running:
+            break
+        time.sleep(QUERY_POLL_INTERVAL)
+    return client.get(location)
+
+
+def route_requests(client, db_path):
+    """name -> zero-argument callable issuing the request"""
+    processor = fresh_processor(db_path)
+    chart_ids = list(processor.get_chart_suggestions(TABLE_NAME) or {})
+    processor.close()
+
+    requests = {
+        'GET /tables': lambda: client.get('/tables'),
+        'GET /view': lambda: client.get(f'/view/{TABLE_NAME}'),
+        'GET /dashboard': lambda: client.get(f'/dashboard/{TABLE_NAME}'),
+        'GET /api/data (100 records)': lambda: client.get(f'/api/data/{TABLE_NAME}?limit=100'),
+        'GET /api/data (1000 columns)': lambda: client.get(f'/api/data/{TABLE_NAME}?limit=1000&orient=columns'),
+        'POST /api/filter': lambda: client.post(f'/api/filter/{TABLE_NAME}', json=FILTER_PARAMS),
+        'POST /custom_query': lambda: post_custom_query(client),
+    }
+    for chart_id in chart_ids:
+        requests[f'GET /api/chart/{chart_id}'] = (
+            lambda chart_id=chart_id: client.get(f'/api/chart/{TABLE_NAME}/{chart_id}')
+        )
+    return requests
+
+
+def check_route(request):
+    """Issue a route request once and return its status code"""
+    response = request()
+    response.close()
+    return response.status_code
+
+
+def connect_client(db_path, warmup_timeout):
+    """Flask test client connected to db_path once warm-up jobs are done, or None if connecting failed"""
+    import app as app_module
+
+    client = app_module.app.test_client()
+    response = client.post('/connect', data={'db_path': db_path})
+    if response.status_code != 302:
+        return None
+    if not wait_for_jobs(app_module.job_queue, warmup_timeout):
+        print(f"  warm-up still running after {warmup_timeout}s, timing anyway", flush=True)
+    return client
+
+
+def bench_routes(db_path, repeat, warmup_timeout):
+    client = connect_client(db_path, warmup_timeout)
+    if client is None:
+        return {'POST /connect': {'error': "Connecting failed"}}
+
+    results = {}
+    for name, request in route_requests(client, db_path).items():
+        print(f"  {name}...", flush=True)
+        # Every route must answer 200 before it is timed
+        status = check_route(request)
+        if status != 200:
+            results[name] = {'error': f"status {status}"}
+            continue
+
+        def run(_, request=request):
+            response = request()
+            if response.status_code != 200:
+                raise RuntimeError(f"status {response.status_code}")
+            response.close()
+
+        try:
+            timings, peak = measure(run, repeat)
+        except Exception as e:
+            results[name] = {'error': str(e)}
+            continue
+        results[name] = summarize(timings, peak_bytes=peak)
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'sqlite': sqlite3.sqlite_version,
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plotly': plotly.__version__
+    }
+
+
+def compare(report, baseline, threshold=DEFAULT_THRESHOLD):
+    """Print p50 latency changes between two reports; returns the number of slower operations"""
+    slower = 0
+    print(f"\n{'scale':<6} {'operation':<40} {'before':>9} {'after':>9} {'change':>8}")
+    for scale, result in report['results'].items():
+        before_scale = baseline.get('results', {}).get(scale)
+        if not before_scale:
+            continue
+        for kind in ('methods', 'routes'):
+            for name, after in result.get(kind, {}).items():
+                before = before_scale.get(kind, {}).get(name)
+                if not isinstance(after, dict) or not before or 'p50' not in before or 'p50' not in after:
+                    continue
+                change = after['p50'] / before['p50'] - 1 if before['p50'] else 0
+                flag = ''
+                if change > threshold:
+                    flag = 'slower'
+                    slower += 1
+                elif change < -threshold:
+                    flag = 'faster'
+                print(f"{scale:<6} {name:<40} {before['p50']:9.4f} {after['p50']:9.4f} {change:+8.1%} {flag}")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', default=','.join(SCALES), help=f"comma-separated, from {', '.join(SCALES)}")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--output', help="report path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--compare', help="earlier report to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--skip-methods', action='store_true')
+    parser.add_argument('--skip-routes', action='store_true')
+    parser.add_argument('--warmup-timeout', type=float, default=600)
+    args = parser.parse_args()
+
+    scales = [scale.strip() for scale in args.scales.split(',') if scale.strip()]
+    for scale in scales:
+        if scale not in SCALES:
+            parser.error(f"unknown scale '{scale}'")
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'repeat': args.repeat,
+        'environment': environment(),
+        'results': {}
+    }
+    for scale in scales:
+        print(f"Dataset {scale} ({SCALES[scale]:,} rows)", flush=True)
+        db_path = build_dataset(scale, args.data_dir)
+        result = {'rows': SCALES[scale], 'db_bytes': os.path.getsize(db_path)}
+        if not args.skip_methods:
+            result['methods'] = bench_methods(db_path, SCALES[scale], args.repeat)
+        if not args.skip_routes:
+            result['routes'] = bench_routes(db_path, args.repeat, args.warmup_timeout)
+        report['results'][scale] = result
+
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {output}")
+
+    failed = 0
+    for scale, result in report['results'].items():
+        for kind in ('methods', 'routes'):
+            for name, summary in result.get(kind, {}).items():
+                if 'error' in summary:
+                    failed += 1
+                    print(f"{scale:<6} {name:<40} error: {summary['error']}")
+                else:
+                    print(f"{scale:<6} {name:<40} p50 {summary['p50']:.4f}s  p95 {summary['p95']:.4f}s  "
+                          f"peak {summary['peak_memory_bytes'] / 1e6:.1f} MB")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        compare(report, baseline, args.threshold)
+
+    # A failing operation (e.g. a route not answering 200) fails the run
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+import threading
+from collections import OrderedDict
+
+from instrumentation import cache_lookup
+
+DEFAULT_CHART_CACHE_ENTRIES = 512
+DEFAULT_CHART_CACHE_BYTES = 128 * 1024 * 1024
+
+
+class ChartCache:
+    """LRU cache of rendered chart figure JSON keyed by chart ETag.
+
+    The ETag (DataProcessor.get_chart_etag) already covers the database
+    version, table, chart config and point budget, so a cached figure is
+    valid for as long as its key is reachable.
+    """
+
+    def __init__(self, max_entries=DEFAULT_CHART_CACHE_ENTRIES, max_bytes=DEFAULT_CHART_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # etag -> figure JSON
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, etag):
+        with self._lock:
+            chart_json = self._entries.get(etag)
+            if chart_json is None:
+                self.misses += 1
+                cache_lookup('chart', False)
+                return None
+            self._entries.move_to_end(etag)
+            self.hits += 1
+            cache_lookup('chart', True)
+            return chart_json
+
+    def put(self, etag, chart_json):
+        with self._lock:
+            if etag in self._entries:
+                self._bytes -= len(self._entries.pop(etag))
+            self._entries[etag] = chart_json
+            self._bytes += len(chart_json)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._bytes -= len(self._entries.popitem(last=False)[1])
+
+    def __contains__(self, etag):
+        with self._lock:
+            return etag in self._entries
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self._bytes
+            }
+
+
+# Cache shared by every DataProcessor in the process
+shared_chart_cache = ChartCache()
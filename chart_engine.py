@@ -0,0 +1,448 @@
+import json
+import math
+
+import pandas as pd
+import plotly
+import plotly.graph_objects as go
+
+from query_compiler import quote_identifier
+from instrumentation import span, timed, count
+from downsampling import (
+    DEFAULT_POINT_BUDGET, DENSITY_BINS, lttb, reservoir_sample, sampling_note
+)
+
+# Limits that keep chart payloads independent of the table size
+MAX_CATEGORIES = 50
+MAX_BOX_GROUPS = 20
+HISTOGRAM_BINS = 40
+MAX_TIME_BUCKETS = 500
+
+# Line charts fetch up to point_budget * LINE_BUCKETS_PER_POINT time buckets,
+# then render_chart keeps point_budget of them with LTTB
+LINE_BUCKETS_PER_POINT = 10
+
+# strftime bucket formats, finest first, with their approximate width in days
+TIME_BUCKETS = (
+    ('%Y-%m-%d %H:00', 1 / 24),
+    ('%Y-%m-%d', 1),
+    ('%Y-%m', 30.44),
+    ('%Y', 365.25),
+)
+
+# Scatters above budget * DENSITY_FACTOR rows are drawn as a density heatmap in 'auto' mode
+DENSITY_FACTOR = 20
+SCATTER_STRATA = 50
+SAMPLING_METHODS = ('auto', 'stratified', 'reservoir', 'density')
+
+# Chart types the engine builds from aggregates or bounded samples
+ENGINE_CHART_TYPES = ('bar', 'pie', 'histogram', 'box', 'line', 'scatter')
+
+
+def choose_bucket_format(start, end, max_buckets=MAX_TIME_BUCKETS):
+    """Finest TIME_BUCKETS format that keeps start..end under max_buckets buckets"""
+    span_days = (end - start).total_seconds() / 86400 if pd.notna(start) and pd.notna(end) else 0
+    for bucket_format, days in TIME_BUCKETS:
+        if span_days / days <= max_buckets:
+            return bucket_format
+    return TIME_BUCKETS[-1][0]
+
+
+class ChartEngine:
+    """Build dashboard charts from aggregates computed in SQLite.
+
+    Instead of handing every row to Plotly, each chart type is reduced to a
+    small series with one GROUP BY style query: category counts for bar and
+    pie charts, binned counts for histograms, quartiles for box plots and
+    time-bucketed aggregates for line charts. Scatters are downsampled to a
+    point budget. Only those arrays end up in the figure JSON, so payload size
+    and render time don't grow with the table.
+
+    Series are plain dicts of counts and sums so they can be cached or merged.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    @timed('chart_sql')
+    def category_counts(self, db_path, table_name, column, limit=MAX_CATEGORIES):
+        """Row counts per distinct value (top `limit` values, the rest summed as 'other')"""
+        col = quote_identifier(column)
+        table = quote_identifier(table_name)
+        with self.pool.connection(db_path) as conn:
+            rows = conn.execute(
+                f"SELECT {col}, COUNT(*) AS n FROM {table} WHERE {col} IS NOT NULL "
+                f"GROUP BY {col} ORDER BY n DESC, {col} LIMIT ?",
+                (limit,)
+            ).fetchall()
+            total = conn.execute(f"SELECT COUNT({col}) FROM {table}").fetchone()[0]
+
+        counts = [row[1] for row in rows]
+        return {
+            'labels': [row[0] for row in rows],
+            'counts': counts,
+            'other': total - sum(counts)
+        }
+
+    @timed('chart_sql')
+    def category_sums(self, db_path, table_name, column, value_column, limit=MAX_CATEGORIES):
+        """Sum of value_column per distinct value of column (largest `limit` groups)"""
+        col = quote_identifier(column)
+        value = quote_identifier(value_column)
+        with self.pool.connection(db_path) as conn:
+            rows = conn.execute(
+                f"SELECT {col}, SUM({value}) AS total, COUNT({value}) FROM {quote_identifier(table_name)} "
+                f"WHERE {col} IS NOT NULL GROUP BY {col} ORDER BY total DESC, {col} LIMIT ?",
+                (limit,)
+            ).fetchall()
+
+        return {
+            'labels': [row[0] for row in rows],
+            'sums': [row[1] for row in rows],
+            'counts': [row[2] for row in rows]
+        }
+
+    @timed('chart_sql')
+    def histogram(self, db_path, table_name, column, bins=HISTOGRAM_BINS):
+        """Counts of numeric values in `bins` equal-width bins between min and max"""
+        col = quote_identifier(column)
+        table = quote_identifier(table_name)
+        numeric = f"typeof({col}) IN ('integer', 'real')"
+        with self.pool.connection(db_path) as conn:
+            low, high, count = conn.execute(
+                f"SELECT MIN({col}), MAX({col}), COUNT(*) FROM {table} WHERE {numeric}"
+            ).fetchone()
+            if not count:
+                return {'edges': [], 'counts': []}
+
+            width = (high - low) / bins if high > low else 1
+            rows = conn.execute(
+                f"SELECT MIN(CAST(({col} - ?) / ? AS INTEGER), ?) AS bin, COUNT(*) "
+                f"FROM {table} WHERE {numeric} GROUP BY bin",
+                (low, width, bins - 1)
+            ).fetchall()
+
+        counts = [0] * bins
+        for bin_index, bin_count in rows:
+            counts[bin_index] = bin_count
+        if high == low:
+            counts = counts[:1]
+        return {
+            'edges': [low + width * i for i in range(len(counts) + 1)],
+            'counts': counts
+        }
+
+    @timed('chart_sql')
+    def box_summary(self, db_path, table_name, group_column, value_column, max_groups=MAX_BOX_GROUPS):
+        """Quartiles, mean, min and max of value_column for the largest groups.
+
+        Quartiles use linear interpolation between ranks (same as pandas/numpy),
+        with the ranks found by a window function so only a handful of rows per
+        group leave SQLite.
+        """
+        group = quote_identifier(group_column)
+        value = quote_identifier(value_column)
+        table = quote_identifier(table_name)
+
+        with self.pool.connection(db_path) as conn:
+            groups = conn.execute(
+                f"SELECT {group}, COUNT({value}) AS n, MIN({value}), MAX({value}), AVG({value}) "
+                f"FROM {table} WHERE {group} IS NOT NULL AND {value} IS NOT NULL "
+                f"GROUP BY {group} ORDER BY n DESC, {group} LIMIT ?",
+                (max_groups,)
+            ).fetchall()
+            if not groups:
+                return []
+
+            placeholders = ', '.join('?' for _ in groups)
+            rank_window = ' OR '.join(
+                f"(rn - 1) BETWEEN CAST((n - 1) * {q} AS INTEGER) AND CAST((n - 1) * {q} AS INTEGER) + 1"
+                for q in (0.25, 0.5, 0.75)
+            )
+            ranked = conn.execute(
+                f"SELECT g, rn, v FROM ("
+                f"SELECT {group} AS g, {value} AS v, "
+                f"ROW_NUMBER() OVER (PARTITION BY {group} ORDER BY {value}) AS rn, "
+                f"COUNT(*) OVER (PARTITION BY {group}) AS n "
+                f"FROM {table} WHERE {value} IS NOT NULL AND {group} IN ({placeholders})"
+                f") WHERE {rank_window}",
+                [row[0] for row in groups]
+            ).fetchall()
+
+        ranks = {}
+        for group_value, rank, value_at_rank in ranked:
+            ranks.setdefault(group_value, {})[rank] = value_at_rank
+
+        summaries = []
+        for group_value, count, minimum, maximum, mean in groups:
+            group_ranks = ranks.get(group_value, {})
+            quartiles = []
+            for q in (0.25, 0.5, 0.75):
+                position = (count - 1) * q
+                lower = math.floor(position)
+                lower_value = group_ranks[lower + 1]
+                upper_value = group_ranks.get(lower + 2, lower_value)
+                quartiles.append(lower_value + (position - lower) * (upper_value - lower_value))
+
+            summaries.append({
+                'group': group_value,
+                'count': count,
+                'min': minimum,
+                'q1': quartiles[0],
+                'median': quartiles[1],
+                'q3': quartiles[2],
+                'max': maximum,
+                'mean': mean
+            })
+        return summaries
+
+    @timed('chart_sql')
+    def time_series(self, db_path, table_name, date_column, value_column, max_buckets=MAX_TIME_BUCKETS):
+        """Count/sum/min/max of value_column per time bucket.
+
+        The bucket (hour, day, month or year) is the finest one that keeps the
+        series under max_buckets points. Dates may be stored as ISO-8601 text
+        or as unix epoch numbers.
+        """
+        date = quote_identifier(date_column)
+        value = quote_identifier(value_column)
+        table = quote_identifier(table_name)
+
+        with self.pool.connection(db_path) as conn:
+            first = conn.execute(
+                f"SELECT typeof({date}), MIN({date}), MAX({date}) FROM {table} WHERE {date} IS NOT NULL"
+            ).fetchone()
+            if first is None or first[1] is None:
+                return {'buckets': [], 'counts': [], 'sums': [], 'mins': [], 'maxs': []}
+
+            epoch = first[0] in ('integer', 'real')
+            start = pd.to_datetime(first[1], unit='s' if epoch else None, errors='coerce')
+            end = pd.to_datetime(first[2], unit='s' if epoch else None, errors='coerce')
+            bucket_format = choose_bucket_format(start, end, max_buckets)
+
+            date_expr = f"strftime('{bucket_format}', {date}, 'unixepoch')" if epoch else f"strftime('{bucket_format}', {date})"
+            rows = conn.execute(
+                f"SELECT {date_expr} AS bucket, COUNT({value}), SUM({value}), MIN({value}), MAX({value}) "
+                f"FROM {table} WHERE {date} IS NOT NULL GROUP BY bucket HAVING bucket IS NOT NULL ORDER BY bucket"
+            ).fetchall()
+
+        return {
+            'bucket_format': bucket_format,
+            'buckets': [row[0] for row in rows],
+            'counts': [row[1] for row in rows],
+            'sums': [row[2] for row in rows],
+            'mins': [row[3] for row in rows],
+            'maxs': [row[4] for row in rows]
+        }
+
+    @timed('chart_sql')
+    def scatter_points(self, db_path, table_name, x_column, y_column,
+                       point_budget=DEFAULT_POINT_BUDGET, method='auto', seed=None):
+        """Points for a scatter chart, downsampled to at most point_budget.
+
+        Methods:
+            stratified - proportional random sample per x-bin, computed in SQLite
+                         (every populated bin keeps at least one point)
+            reservoir  - uniform sample streamed through fetchmany in O(budget) memory
+            density    - 2D binned counts for a heatmap
+            auto       - all rows when they fit, stratified up to
+                         point_budget * DENSITY_FACTOR rows, density above that
+        """
+        if method not in SAMPLING_METHODS:
+            raise ValueError(f"Unknown sampling method '{method}'")
+
+        x = quote_identifier(x_column)
+        y = quote_identifier(y_column)
+        table = quote_identifier(table_name)
+        numeric = f"typeof({x}) IN ('integer', 'real') AND typeof({y}) IN ('integer', 'real')"
+
+        with self.pool.connection(db_path) as conn:
+            rows, x_low, x_high, y_low, y_high = conn.execute(
+                f"SELECT COUNT(*), MIN({x}), MAX({x}), MIN({y}), MAX({y}) FROM {table} WHERE {numeric}"
+            ).fetchone()
+
+            if method == 'auto':
+                if rows <= point_budget:
+                    method = 'all'
+                elif rows <= point_budget * DENSITY_FACTOR:
+                    method = 'stratified'
+                else:
+                    method = 'density'
+
+            if method == 'all' or (method in ('stratified', 'reservoir') and rows <= point_budget):
+                points = conn.execute(f"SELECT {x}, {y} FROM {table} WHERE {numeric}").fetchall()
+                method = 'all'
+
+            elif method == 'stratified':
+                width = (x_high - x_low) / SCATTER_STRATA if x_high > x_low else 1
+                stratum = f"MIN(CAST(({x} - ?) / ? AS INTEGER), {SCATTER_STRATA - 1})"
+                points = conn.execute(
+                    f"SELECT x, y FROM ("
+                    f"SELECT {x} AS x, {y} AS y, "
+                    f"ROW_NUMBER() OVER (PARTITION BY {stratum} ORDER BY random()) AS rn, "
+                    f"COUNT(*) OVER (PARTITION BY {stratum}) AS n "
+                    f"FROM {table} WHERE {numeric}"
+                    f") WHERE rn <= MAX(1, CAST(n * ? AS INTEGER))",
+                    (x_low, width, x_low, width, point_budget / rows)
+                ).fetchall()
+
+            elif method == 'reservoir':
+                cursor = conn.execute(f"SELECT {x}, {y} FROM {table} WHERE {numeric}")
+                batches = iter(lambda: cursor.fetchmany(10000), [])
+                points, _ = reservoir_sample(batches, point_budget, seed=seed)
+                cursor.close()
+
+            else:
+                x_width = (x_high - x_low) / DENSITY_BINS if x_high > x_low else 1
+                y_width = (y_high - y_low) / DENSITY_BINS if y_high > y_low else 1
+                cells = conn.execute(
+                    f"SELECT MIN(CAST(({x} - ?) / ? AS INTEGER), ?) AS bx, "
+                    f"MIN(CAST(({y} - ?) / ? AS INTEGER), ?) AS by, COUNT(*) "
+                    f"FROM {table} WHERE {numeric} GROUP BY bx, by",
+                    (x_low, x_width, DENSITY_BINS - 1, y_low, y_width, DENSITY_BINS - 1)
+                ).fetchall()
+                z = [[0] * DENSITY_BINS for _ in range(DENSITY_BINS)]
+                for bx, by, count in cells:
+                    z[by][bx] = count
+                return {
+                    'method': 'density',
+                    'rows': rows,
+                    'x': [x_low + x_width * (i + 0.5) for i in range(DENSITY_BINS)],
+                    'y': [y_low + y_width * (i + 0.5) for i in range(DENSITY_BINS)],
+                    'z': z
+                }
+
+        return {
+            'method': method,
+            'rows': rows,
+            'x': [point[0] for point in points],
+            'y': [point[1] for point in points]
+        }
+
+    def chart_series(self, db_path, table_name, chart_config, point_budget=DEFAULT_POINT_BUDGET):
+        """The aggregated (or sampled) series behind a chart, or None if it has nothing to draw.
+
+        Bar and pie charts get category counts (or sums when there is a
+        y_col), histograms binned counts, line charts time buckets (finer than
+        the point budget, for render_chart to downsample), box plots
+        {'summaries': [...]} and scatters downsampled points.
+        """
+        chart_type = chart_config.get('type', 'bar')
+        x_col = chart_config.get('x_col')
+        y_col = chart_config.get('y_col')
+        point_budget = chart_config.get('point_budget', point_budget)
+
+        if chart_type == 'bar' and y_col:
+            return self.category_sums(db_path, table_name, x_col, y_col)
+        if chart_type in ('bar', 'pie'):
+            return self.category_counts(db_path, table_name, x_col)
+        if chart_type == 'histogram':
+            series = self.histogram(db_path, table_name, x_col)
+            return series if series['counts'] else None
+        if not y_col:
+            return None
+        if chart_type == 'box':
+            summaries = self.box_summary(db_path, table_name, x_col, y_col)
+            return {'summaries': summaries} if summaries else None
+        if chart_type == 'line':
+            return self.time_series(db_path, table_name, x_col, y_col,
+                                    max_buckets=point_budget * LINE_BUCKETS_PER_POINT)
+        if chart_type == 'scatter':
+            return self.scatter_points(
+                db_path, table_name, x_col, y_col,
+                point_budget=point_budget,
+                method=chart_config.get('sampling', 'auto')
+            )
+        return None
+
+    def render_chart(self, chart_config, series, point_budget=DEFAULT_POINT_BUDGET):
+        """Figure JSON for a chart from its series (as returned by chart_series, or merged ones)"""
+        chart_type = chart_config.get('type', 'bar')
+        title = chart_config.get('title', 'Chart')
+        x_col = chart_config.get('x_col')
+        y_col = chart_config.get('y_col')
+        point_budget = chart_config.get('point_budget', point_budget)
+        sampling = None
+
+        if chart_type == 'bar' and y_col:
+            fig = go.Figure(go.Bar(x=series['labels'], y=series['sums'], name=y_col))
+            fig.update_layout(xaxis_title=x_col, yaxis_title=f'sum of {y_col}')
+
+        elif chart_type in ('bar', 'pie'):
+            labels = [str(label) for label in series['labels']]
+            counts = list(series['counts'])
+            if series['other']:
+                labels.append('(other)')
+                counts.append(series['other'])
+            if chart_type == 'pie':
+                fig = go.Figure(go.Pie(labels=labels, values=counts))
+            else:
+                fig = go.Figure(go.Bar(x=labels, y=counts))
+                fig.update_layout(xaxis_title=x_col, yaxis_title='count')
+
+        elif chart_type == 'histogram':
+            edges = series['edges']
+            centers = [(edges[i] + edges[i + 1]) / 2 for i in range(len(series['counts']))]
+            fig = go.Figure(go.Bar(x=centers, y=series['counts'], width=edges[1] - edges[0]))
+            fig.update_layout(bargap=0, xaxis_title=x_col, yaxis_title='count')
+
+        elif chart_type == 'box':
+            summaries = series['summaries']
+            fig = go.Figure(go.Box(
+                x=[str(s['group']) for s in summaries],
+                q1=[s['q1'] for s in summaries],
+                median=[s['median'] for s in summaries],
+                q3=[s['q3'] for s in summaries],
+                lowerfence=[s['min'] for s in summaries],
+                upperfence=[s['max'] for s in summaries],
+                mean=[s['mean'] for s in summaries],
+                name=y_col
+            ))
+            fig.update_layout(xaxis_title=x_col, yaxis_title=y_col)
+
+        elif chart_type == 'line':
+            buckets = series['buckets']
+            means = [s / c if c else None for s, c in zip(series['sums'], series['counts'])]
+            if len(buckets) > point_budget:
+                keep = lttb(range(len(buckets)), [m if m is not None else float('nan') for m in means], point_budget)
+                sampling = {'method': 'lttb', 'rows': sum(series['counts']), 'points': len(keep)}
+                buckets = [buckets[i] for i in keep]
+                means = [means[i] for i in keep]
+            fig = go.Figure(go.Scatter(x=buckets, y=means, mode='lines', name=y_col))
+            fig.update_layout(xaxis_title=x_col, yaxis_title=f'mean of {y_col}')
+
+        elif chart_type == 'scatter':
+            if series['method'] == 'density':
+                fig = go.Figure(go.Heatmap(x=series['x'], y=series['y'], z=series['z'], colorscale='Blues'))
+                sampling = {'method': 'density', 'rows': series['rows'], 'points': DENSITY_BINS * DENSITY_BINS}
+            else:
+                fig = go.Figure(go.Scattergl(x=series['x'], y=series['y'], mode='markers'))
+                if series['method'] != 'all':
+                    sampling = {'method': series['method'], 'rows': series['rows'], 'points': len(series['x'])}
+            fig.update_layout(xaxis_title=x_col, yaxis_title=y_col)
+
+        else:
+            return None
+
+        if sampling:
+            # Tag the chart with how many rows the drawn points stand for
+            title = f"{title}<br><sup>{sampling_note(sampling['points'], sampling['rows'], sampling['method'])}</sup>"
+            fig.update_layout(meta={'sampling': sampling})
+        fig.update_layout(title=title)
+        with span('serialize'):
+            chart_json = json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+        count('bytes_serialized', len(chart_json), source='chart')
+        return chart_json
+
+    @timed('build_chart')
+    def build_chart(self, db_path, table_name, chart_config, point_budget=DEFAULT_POINT_BUDGET):
+        """Create a chart JSON string for chart_config from SQL aggregates.
+
+        Scatter and line charts are downsampled to chart_config['point_budget']
+        (default point_budget) points; chart_config['sampling'] picks the
+        scatter method. Downsampled charts carry a subtitle and layout.meta
+        describing how many rows they represent.
+        """
+        series = self.chart_series(db_path, table_name, chart_config, point_budget=point_budget)
+        if series is None:
+            return None
+        return self.render_chart(chart_config, series, point_budget=point_budget)
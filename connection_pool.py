@@ -0,0 +1,180 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# PRAGMAs applied once to every pooled connection
+DEFAULT_PRAGMAS = (
+    ('query_only', 'ON'),
+    ('mmap_size', 256 * 1024 * 1024),
+    ('cache_size', -64 * 1024),  # negative values are KiB, so 64 MiB
+    ('temp_store', 'MEMORY'),
+)
+
+# Seconds between sweeps for idle connections past idle_timeout (run on release)
+REAP_INTERVAL = 30
+
+
+class ConnectionPool:
+    """Pool of read-only SQLite connections keyed by database path.
+
+    Connections are checked out for the duration of a `with pool.connection(path)`
+    block and returned to a per-database idle list afterwards, so repeated
+    DataProcessor calls reuse the same handful of connections instead of
+    opening and closing one per call. Idle connections older than
+    idle_timeout seconds are closed: releasing a connection sweeps every
+    database's idle list at most once per REAP_INTERVAL seconds.
+    """
+
+    def __init__(self, max_idle_per_db=4, idle_timeout=300, pragmas=DEFAULT_PRAGMAS):
+        self.max_idle_per_db = max_idle_per_db
+        self.idle_timeout = idle_timeout
+        self.pragmas = pragmas
+
+        self._lock = threading.Lock()
+        self._idle = {}         # db_path -> list of (connection, returned_at)
+        self._generation = {}   # db_path -> int, bumped by close_all to retire checked-out connections
+        self._checked_out = {}  # id(connection) -> (db_path, generation)
+        self._last_reap = time.monotonic()
+
+        self.hits = 0
+        self.misses = 0
+        self.opened = 0
+        self.closed = 0
+
+    @staticmethod
+    def _key(db_path):
+        return os.path.abspath(db_path)
+
+    def _open(self, db_path):
+        """Open a new connection and apply the pool PRAGMAs"""
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        for name, value in self.pragmas:
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self.closed += 1
+
+    def acquire(self, db_path):
+        """Check out a connection for db_path"""
+        key = self._key(db_path)
+        conn = None
+        stale = []
+        now = time.monotonic()
+
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                candidate, returned_at = idle.pop()
+                if now - returned_at > self.idle_timeout:
+                    stale.append(candidate)
+                    continue
+                conn = candidate
+                break
+
+            if conn is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            generation = self._generation.get(key, 0)
+
+        for candidate in stale:
+            self._close(candidate)
+
+        if conn is None:
+            conn = self._open(key)
+            with self._lock:
+                self.opened += 1
+
+        with self._lock:
+            self._checked_out[id(conn)] = (key, generation)
+        return conn
+
+    def release(self, conn):
+        """Return a connection to its idle list (or close it if the pool is full or retired)"""
+        now = time.monotonic()
+        with self._lock:
+            reap = now - self._last_reap >= REAP_INTERVAL
+            if reap:
+                self._last_reap = now
+            key, generation = self._checked_out.pop(id(conn), (None, None))
+            keep = (
+                key is not None
+                and generation == self._generation.get(key, 0)
+                and len(self._idle.get(key, [])) < self.max_idle_per_db
+            )
+            if keep:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.setdefault(key, []).append((conn, now))
+
+        if not keep:
+            self._close(conn)
+        if reap:
+            self.close_idle()
+
+    @contextmanager
+    def connection(self, db_path):
+        """Context manager that checks a connection out and returns it afterwards"""
+        conn = self.acquire(db_path)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_idle(self, max_age=None):
+        """Close idle connections that have not been used for max_age seconds"""
+        max_age = self.idle_timeout if max_age is None else max_age
+        now = time.monotonic()
+        stale = []
+
+        with self._lock:
+            for key, idle in self._idle.items():
+                fresh = []
+                for conn, returned_at in idle:
+                    if now - returned_at > max_age:
+                        stale.append(conn)
+                    else:
+                        fresh.append((conn, returned_at))
+                self._idle[key] = fresh
+
+        for conn in stale:
+            self._close(conn)
+        return len(stale)
+
+    def close_all(self, db_path=None):
+        """Close idle connections and retire checked-out ones (for one database or all)"""
+        with self._lock:
+            keys = [self._key(db_path)] if db_path else list(self._idle)
+            stale = []
+            for key in keys:
+                stale.extend(conn for conn, _ in self._idle.pop(key, []))
+                self._generation[key] = self._generation.get(key, 0) + 1
+
+        for conn in stale:
+            self._close(conn)
+
+    def stats(self):
+        """Return pool counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'opened': self.opened,
+                'closed': self.closed,
+                'checked_out': len(self._checked_out),
+                'idle': {key: len(idle) for key, idle in self._idle.items() if idle}
+            }
+
+
+# Pool shared by every DataProcessor in the process
+shared_pool = ConnectionPool()
@@ -4,16 +4,101 @@ import plotly
 import plotly.express as px
 import plotly.graph_objects as go
 import json
+import base64
+import hashlib
+import csv
+import io
 import sqlite3
 from sqlite3 import Error
 import os
+import threading
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from query_compiler import quote_identifier
+from connection_pool import shared_pool
+from table_cache import shared_table_cache, database_version
+from chart_engine import ENGINE_CHART_TYPES
+from stats_engine import StatsEngine
+from backends import SQLiteBackend, BACKEND_ERRORS
+from query_runner import shared_query_runner
+from query_cache import shared_query_cache
+from chart_cache import shared_chart_cache
+from downsampling import DEFAULT_POINT_BUDGET, lttb, sample_indices, sampling_note
+from table_loader import read_table, memory_footprint
+from instrumentation import span, timed, count
+from live_dashboard import LiveTable, LIVE_CHART_TYPES, ROWID, shared_live_registry
+
+# Stats cache shared by every DataProcessor using the shared pool
+shared_stats_engine = StatsEngine(shared_pool)
+shared_backend = SQLiteBackend(shared_pool, stats_engine=shared_stats_engine)
+
+# Row counts shared by every DataProcessor: (db_path, table) -> (database_version, count)
+row_count_cache = {}
+row_count_lock = threading.Lock()
+
+# Page size limits for get_page
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Rows fetched per cursor.fetchmany call when streaming exports
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+# Dashboard chart generation: worker threads and per-chart timeout in seconds
+DEFAULT_CHART_WORKERS = 4
+DEFAULT_CHART_TIMEOUT = 20
+
+
+def encode_cursor(value):
+    """Encode a keyset position as an opaque URL-safe cursor"""
+    return base64.urlsafe_b64encode(json.dumps(value).encode('utf-8')).decode('ascii')
+
+
+def _json_default(value):
+    """Serialize SQLite values that json does not handle natively"""
+    if isinstance(value, bytes):
+        return value.hex()
+    return str(value)
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor (a single key value)"""
+    try:
+        value = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor")
+    # Only scalars can be bound as the key parameter
+    if isinstance(value, bool) or not isinstance(value, (str, int, float, type(None))):
+        raise ValueError("Invalid cursor")
+    return value
+
 
 class DataProcessor:
-    def __init__(self, db_path=None):
-        """Initialize with optional database path"""
+    def __init__(self, db_path=None, pool=None, table_cache=None, profile_store=None, backend=None,
+                 query_runner=None, query_cache=None, chart_cache=None):
+        """Initialize with optional database path, connection pool, table cache, profile store,
+        execution backend (SQLite by default, see backends.py), custom query runner and cache,
+        and rendered chart cache"""
+        self.pool = pool or shared_pool
+        self.table_cache = table_cache or shared_table_cache
+        self.query_runner = query_runner or shared_query_runner
+        self.query_cache = query_cache or shared_query_cache
+        self.chart_cache = chart_cache or shared_chart_cache
+        if backend is None:
+            backend = shared_backend if self.pool is shared_pool else SQLiteBackend(self.pool)
+        self.backend = backend
+        self.chart_engine = backend.chart_engine
+        self.stats_engine = backend.stats_engine
+        self.profile_store = profile_store
+        self.point_budget = DEFAULT_POINT_BUDGET
+        self.chart_workers = DEFAULT_CHART_WORKERS
+        self.chart_timeout = DEFAULT_CHART_TIMEOUT
+        self.lock = threading.RLock()
         self.db_path = db_path
         self.tables = []
         self.current_table = None
+        self.current_columns = None
         self.df = None
         
         # If database provided, connect and load tables
@@ -22,52 +107,137 @@ class DataProcessor:
     
     def connect_to_database(self, db_path=None):
         """Connect to SQLite database and get table names"""
-        if db_path:
-            self.db_path = db_path
-            
-        if not self.db_path or not os.path.exists(self.db_path):
-            raise ValueError("Valid database path required")
-            
-        try:
-            # Connect to database
-            conn = sqlite3.connect(self.db_path)
-            
-            # Get list of tables
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-            self.tables = [table[0] for table in cursor.fetchall()]
-            
-            conn.close()
-            return True
-        except Error as e:
-            print(f"Database connection error: {e}")
-            return False
+        with self.lock:
+            if db_path and db_path != self.db_path:
+                # Switching databases: drop the table loaded from the old one
+                self._release_table()
+                self.current_table = None
+                self.current_columns = None
+                self.df = None
+                self.db_path = db_path
+                
+            if not self.db_path or not os.path.exists(self.db_path):
+                raise ValueError("Valid database path required")
+                
+            try:
+                # Get list of tables over a pooled connection
+                with self.pool.connection(self.db_path) as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+                    self.tables = [table[0] for table in cursor.fetchall()]
+                
+                return True
+            except Error as e:
+                print(f"Database connection error: {e}")
+                return False
     
-    def load_table_data(self, table_name=None, query=None):
-        """Load data from specified table or custom query"""
+    @timed('load_table')
+    def load_table_data(self, table_name=None, query=None, columns=None):
+        """Load data from specified table or custom query.
+
+        Tables are read in chunks with compact dtypes (see table_loader);
+        pass columns to load only the ones a view or chart needs. Table data
+        comes from the shared table cache, so sessions viewing the same table
+        share one DataFrame; it must not be modified in place. Reloading an
+        unchanged table is a cache hit and does no I/O.
+        """
         if not self.db_path:
             raise ValueError("Database not connected")
             
-        if table_name:
-            self.current_table = table_name
-            query = f"SELECT * FROM {table_name}"
-        elif not query:
+        if not table_name and not query:
             raise ValueError("Either table_name or query must be provided")
+        
+        columns = list(dict.fromkeys(columns)) if columns else None
             
-        try:
-            # Connect and load data into pandas DataFrame
-            conn = sqlite3.connect(self.db_path)
-            self.df = pd.read_sql_query(query, conn)
-            conn.close()
+        with self.lock:
+            try:
+                if table_name:
+                    df = self.table_cache.acquire(
+                        self.db_path, table_name, lambda: self._read_table(table_name, columns), columns=columns
+                    )
+                else:
+                    df = self._read_query(query)
+            except (Error, pd.errors.DatabaseError, ValueError) as e:
+                print(f"Error loading data: {e}")
+                return False
+            
+            self._release_table()
+            self.current_table = table_name
+            self.current_columns = columns
+            self.df = df
             return True
-        except Error as e:
-            print(f"Error loading data: {e}")
-            return False
+    
+    def _read_table(self, table_name, columns=None):
+        """Load a table (or some of its columns) into a compact DataFrame over a pooled connection"""
+        with self.pool.connection(self.db_path) as conn:
+            df = read_table(conn, table_name, columns)
+        count('rows_read', len(df), source='table')
+        return df
+    
+    def _read_query(self, query):
+        """Load data into pandas DataFrame over a pooled connection"""
+        with self.pool.connection(self.db_path) as conn:
+            df = pd.read_sql_query(query, conn)
+        count('rows_read', len(df), source='query')
+        return df
+    
+    def _release_table(self):
+        """Release the cached table held by this processor"""
+        if self.current_table and self.db_path:
+            self.table_cache.release(self.db_path, self.current_table, self.df, columns=self.current_columns)
+    
+    def close(self):
+        """Release the loaded table (called when the session goes away)"""
+        with self.lock:
+            self._release_table()
+            self.current_table = None
+            self.current_columns = None
+            self.df = None
+    
+    def get_memory_footprint(self):
+        """Memory used by the loaded DataFrame, in total and per column"""
+        if self.df is None:
+            return None
+        footprint = memory_footprint(self.df)
+        footprint['table'] = self.current_table
+        return footprint
     
     def get_table_list(self):
         """Return list of tables in the database"""
         return self.tables
     
+    def count_table_rows(self, table_name):
+        """Count a table's rows and remember the count until the database changes"""
+        with self.pool.connection(self.db_path) as conn:
+            count = conn.execute(f"SELECT COUNT(*) FROM {quote_identifier(table_name)}").fetchone()[0]
+        with row_count_lock:
+            row_count_cache[(os.path.abspath(self.db_path), table_name)] = (database_version(self.db_path), count)
+        return count
+    
+    def get_table_row_counts(self):
+        """Known row counts per table ({table: count or None}) without querying the database.
+
+        Counts come from count_table_rows or an up-to-date stored profile.
+        """
+        version = database_version(self.db_path)
+        return {table_name: self._known_row_count(table_name, version) for table_name in self.tables}
+    
+    def get_row_count(self, table_name):
+        """A table's row count, counted (and remembered) only if no up-to-date count is known"""
+        known = self._known_row_count(table_name, database_version(self.db_path))
+        return known if known is not None else self.count_table_rows(table_name)
+    
+    def _known_row_count(self, table_name, version):
+        """Row count remembered for this database version (or from a fresh profile), or None"""
+        with row_count_lock:
+            cached = row_count_cache.get((os.path.abspath(self.db_path), table_name))
+        if cached and cached[0] == version:
+            return cached[1]
+        if self.profile_store:
+            profile = self.profile_store.get_profile(self.db_path, table_name)
+            return profile['row_count'] if profile else None
+        return None
+    
     def get_column_info(self, table_name=None):
         """Get column names and data types for a table"""
         if not table_name and self.current_table:
@@ -77,11 +247,10 @@ class DataProcessor:
             raise ValueError("Table name required")
             
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute(f"PRAGMA table_info({table_name})")
-            columns = cursor.fetchall()
-            conn.close()
+            with self.pool.connection(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"PRAGMA table_info({quote_identifier(table_name)})")
+                columns = cursor.fetchall()
             
             # Format column info
             column_info = [{'name': col[1], 'type': col[2]} for col in columns]
@@ -98,6 +267,167 @@ class DataProcessor:
         preview_df = self.df.head(rows)
         return preview_df.to_dict(orient='records')
     
+    def get_page_key(self, table_name):
+        """Return the column used for keyset paging, or None if only offsets work.
+
+        Uses a single-column primary key when there is one, otherwise the
+        implicit rowid (unless the table is WITHOUT ROWID or shadows it).
+        """
+        try:
+            with self.pool.connection(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"PRAGMA table_info({quote_identifier(table_name)})")
+                columns = cursor.fetchall()
+
+                pk_columns = [col[1] for col in columns if col[5]]
+                if len(pk_columns) == 1:
+                    return pk_columns[0]
+
+                column_names = {col[1].lower() for col in columns}
+                if 'rowid' in column_names:
+                    return None
+
+                try:
+                    cursor.execute(f"SELECT rowid FROM {quote_identifier(table_name)} LIMIT 0")
+                    return 'rowid'
+                except Error:
+                    # WITHOUT ROWID table with a composite key
+                    return None
+        except Error as e:
+            print(f"Error detecting page key: {e}")
+            return None
+
+    @timed('read_page')
+    def get_page(self, table_name, limit=DEFAULT_PAGE_SIZE, offset=0, cursor=None, include_total=None,
+                 as_frame=False):
+        """Read one page of rows from a table.
+
+        Pages are read with keyset pagination (WHERE key > cursor ORDER BY key)
+        when the table has a usable key, so each page costs O(limit) no matter
+        how deep it is. Plain LIMIT/OFFSET is used otherwise. The total row
+        count is included on the first page, or whenever include_total is True;
+        it is only counted when the tables listing hasn't already done so for
+        this version of the database.
+        With as_frame, 'rows' is the page DataFrame (for serialization.json_response).
+        """
+        if not self.db_path:
+            raise ValueError("Database not connected")
+        if table_name not in self.tables:
+            raise ValueError(f"Unknown table '{table_name}'")
+
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        offset = max(0, int(offset or 0))
+        if include_total is None:
+            include_total = cursor is None and offset == 0
+
+        key = self.get_page_key(table_name)
+        if cursor is not None and key is None:
+            raise ValueError(f"Table '{table_name}' does not support cursor paging")
+
+        table = quote_identifier(table_name)
+        params = []
+        if key == 'rowid':
+            # Select the implicit rowid explicitly so the cursor can be built from it
+            select_list = 'rowid AS "__rowid__", *'
+            key_expr = 'rowid'
+            key_field = '__rowid__'
+        else:
+            select_list = '*'
+            key_expr = quote_identifier(key) if key else None
+            key_field = key
+
+        query = f"SELECT {select_list} FROM {table}"
+        if cursor is not None:
+            query += f" WHERE {key_expr} > ?"
+            params.append(decode_cursor(cursor))
+        if key_expr:
+            query += f" ORDER BY {key_expr}"
+        # Read one extra row to know whether another page follows
+        query += " LIMIT ?"
+        params.append(limit + 1)
+        if cursor is None and offset:
+            query += " OFFSET ?"
+            params.append(offset)
+
+        try:
+            with self.pool.connection(self.db_path) as conn:
+                page_df = pd.read_sql_query(query, conn, params=params)
+            total = self.get_row_count(table_name) if include_total else None
+        except (Error, pd.errors.DatabaseError) as e:
+            print(f"Error reading page: {e}")
+            return {"error": str(e)}
+
+        count('rows_read', len(page_df), source='page')
+        has_more = len(page_df) > limit
+        page_df = page_df.head(limit)
+
+        next_cursor = None
+        if has_more and key_field:
+            last_key = page_df[key_field].iloc[-1]
+            next_cursor = encode_cursor(last_key.item() if hasattr(last_key, 'item') else last_key)
+        if key == 'rowid':
+            page_df = page_df.drop(columns=['__rowid__'])
+
+        return {
+            'rows': page_df if as_frame else page_df.to_dict(orient='records'),
+            'limit': limit,
+            'offset': offset if cursor is None else None,
+            'next_cursor': next_cursor,
+            'next_offset': (offset + limit) if has_more and cursor is None else None,
+            'total': total
+        }
+
+    def iter_export(self, table_name, fmt='ndjson', batch_size=EXPORT_BATCH_SIZE):
+        """Yield a table as NDJSON or CSV text chunks, one chunk per fetchmany batch.
+
+        Rows go straight from the sqlite cursor to text without building a
+        DataFrame, so memory stays bounded by batch_size whatever the table size.
+        """
+        if not self.db_path:
+            raise ValueError("Database not connected")
+        if table_name not in self.tables:
+            raise ValueError(f"Unknown table '{table_name}'")
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format '{fmt}'")
+
+        return self._export_rows(table_name, fmt, batch_size)
+
+    def _export_rows(self, table_name, fmt, batch_size):
+        """Generator behind iter_export (validation happens before the first chunk)"""
+        conn = self.pool.acquire(self.db_path)
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SELECT * FROM {quote_identifier(table_name)}")
+            columns = [col[0] for col in cursor.description]
+
+            buffer = io.StringIO()
+            writer = csv.writer(buffer) if fmt == 'csv' else None
+            if writer:
+                # Send the header immediately so the client gets its first byte
+                writer.writerow(columns)
+                yield buffer.getvalue()
+
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+
+                buffer.seek(0)
+                buffer.truncate()
+                if writer:
+                    writer.writerows(rows)
+                else:
+                    for row in rows:
+                        buffer.write(json.dumps(dict(zip(columns, row)), default=_json_default))
+                        buffer.write('\n')
+                yield buffer.getvalue()
+        except Error as e:
+            print(f"Export error: {e}")
+        finally:
+            # Finalize the statement before the connection goes back to the pool
+            cursor.close()
+            self.pool.release(conn)
+
     def get_data_as_dict(self):
         """Return the DataFrame as a dictionary suitable for JSON"""
         if self.df is None:
@@ -110,8 +440,38 @@ class DataProcessor:
             
         return df_copy.to_dict(orient='records')
     
-    def get_basic_stats(self):
-        """Get basic statistics about numeric columns"""
+    def _get_profile(self, table_name):
+        """Up-to-date stored profile for a table, or None (scheduling a refresh in the background)"""
+        if not self.profile_store or not self.db_path:
+            return None
+        
+        profile = self.profile_store.get_profile(self.db_path, table_name)
+        if profile is None:
+            self.profile_store.refresh_in_background(self.db_path, [table_name])
+        return profile
+    
+    @timed('stats')
+    def get_basic_stats(self, table_name=None):
+        """Get basic statistics about numeric and categorical columns.
+
+        Stats for a table (table_name or the current table) come from its
+        stored profile when that is up to date, otherwise they are computed in
+        SQLite by the stats engine and cached until the database changes.
+        A DataFrame loaded from a query is summarised in one vectorized pass.
+        """
+        if not table_name:
+            table_name = self.current_table
+        
+        if table_name and self.db_path:
+            profile = self._get_profile(table_name)
+            if profile:
+                return profile['stats']
+            try:
+                return self.stats_engine.table_stats(self.db_path, table_name)
+            except BACKEND_ERRORS as e:
+                print(f"Error computing stats: {e}")
+                return {}
+        
         if self.df is None:
             return {}
             
@@ -120,33 +480,46 @@ class DataProcessor:
             'columns': {}
         }
         
-        # Get stats for numeric columns
-        numeric_cols = self.df.select_dtypes(include=['number']).columns
-        for col in numeric_cols:
-            stats['columns'][col] = {
-                'mean': round(self.df[col].mean(), 2) if not pd.isna(self.df[col].mean()) else 'N/A',
-                'median': round(self.df[col].median(), 2) if not pd.isna(self.df[col].median()) else 'N/A',
-                'min': round(self.df[col].min(), 2) if not pd.isna(self.df[col].min()) else 'N/A',
-                'max': round(self.df[col].max(), 2) if not pd.isna(self.df[col].max()) else 'N/A'
-            }
+        # Get stats for numeric columns (all four aggregates in one call)
+        numeric_df = self.df.select_dtypes(include=['number'])
+        if len(numeric_df.columns):
+            summary = numeric_df.agg(['mean', 'median', 'min', 'max'])
+            for col in numeric_df.columns:
+                stats['columns'][col] = {
+                    name: round(value, 2) if not pd.isna(value) else 'N/A'
+                    for name, value in summary[col].items()
+                }
             
         # Get value counts for categorical columns
-        categorical_cols = self.df.select_dtypes(include=['object']).columns
+        categorical_cols = self.df.select_dtypes(include=['object', 'category']).columns
         for col in categorical_cols[:5]:  # Limit to first 5 categorical columns
-            value_counts = self.df[col].value_counts().head(10).to_dict()  # Top 10 values
+            value_counts = self.df[col].value_counts()
             stats['columns'][col] = {
                 'type': 'categorical',
-                'unique_values': self.df[col].nunique(),
-                'top_values': value_counts
+                'unique_values': len(value_counts),
+                'top_values': value_counts.head(10).to_dict()  # Top 10 values
             }
             
         return stats
     
-    def filter_data(self, filter_params):
-        """Filter data based on provided parameters"""
+    @timed('filter')
+    def filter_data(self, filter_params, table_name=None, as_frame=False):
+        """Filter data based on provided parameters.
+
+        When a table is known (table_name or the current table) the filters are
+        compiled to a parameterized WHERE clause and only matching rows are read
+        from SQLite. Otherwise the in-memory DataFrame is filtered. Returns
+        records, or the filtered DataFrame with as_frame.
+        """
+        if not table_name:
+            table_name = self.current_table
+
+        if table_name and self.db_path:
+            return self._filter_table(table_name, filter_params, as_frame=as_frame)
+
         if self.df is None:
             return {}
-            
+
         filtered_df = self.df.copy()
         
         # Apply filters from filter_params dict
@@ -165,24 +538,94 @@ class DataProcessor:
                     # Exact match
                     filtered_df = filtered_df[filtered_df[column] == condition]
         
+        if as_frame:
+            return filtered_df
+        
         # Convert dates to strings if present
         for col in filtered_df.select_dtypes(include=['datetime64']).columns:
             filtered_df[col] = filtered_df[col].dt.strftime('%Y-%m-%d')
             
         return filtered_df.to_dict(orient='records')
+
+    def _filter_table(self, table_name, filter_params, as_frame=False):
+        """Push filters down to the backend and read only the matching rows"""
+        column_info = self.get_column_info(table_name)
+        if not column_info:
+            return {"error": f"Unknown table '{table_name}'"}
+
+        try:
+            filtered_df = self.backend.filter_rows(self.db_path, table_name, filter_params, column_info)
+        except ValueError as e:
+            return {"error": str(e)}
+        except BACKEND_ERRORS as e:
+            print(f"Filter query error: {e}")
+            return {"error": str(e)}
+        
+        count('rows_read', len(filtered_df), source='filter')
+        if as_frame:
+            return filtered_df
+        return filtered_df.to_dict(orient='records')
     
     def detect_chart_types(self):
-        """Automatically detect appropriate chart types for the data"""
+        """Automatically detect appropriate chart types for the data.
+
+        A loaded table is classified like get_chart_suggestions does, so both
+        agree on chart ids; a DataFrame loaded from a query is typed by dtype.
+        """
         if self.df is None:
             return {}
-            
-        chart_suggestions = {}
+        
+        if self.current_table:
+            kinds = self._chart_kinds(self.current_table)
+            if kinds:
+                return self._suggest_charts(*self._split_kinds(kinds, self.df.columns))
         
         # Get numeric and categorical columns
         numeric_cols = self.df.select_dtypes(include=['number']).columns.tolist()
-        categorical_cols = self.df.select_dtypes(include=['object']).columns.tolist()
+        categorical_cols = self.df.select_dtypes(include=['object', 'category']).columns.tolist()
         date_cols = self.df.select_dtypes(include=['datetime64']).columns.tolist()
         
+        return self._suggest_charts(numeric_cols, categorical_cols, date_cols)
+    
+    @timed('chart_suggestions')
+    def get_chart_suggestions(self, table_name):
+        """Chart suggestions for a table, from the column kinds of its stored profile.
+
+        Without a fresh profile the kinds are classified on a sample in SQLite
+        (the same way the profile does). Returns None if the table does not exist.
+        """
+        kinds = self._chart_kinds(table_name)
+        if not kinds:
+            return None
+        return self._suggest_charts(*self._split_kinds(kinds))
+    
+    def _chart_kinds(self, table_name):
+        """Column kinds from the stored profile or StatsEngine.chart_kinds, or None on error"""
+        if not self.db_path:
+            return None
+        profile = self._get_profile(table_name)
+        if profile:
+            return profile['kinds']
+        try:
+            with self.pool.connection(self.db_path) as conn:
+                return self.stats_engine.chart_kinds(conn, table_name)
+        except Error as e:
+            print(f"Error classifying columns: {e}")
+            return None
+    
+    def _split_kinds(self, kinds, columns=None):
+        """Numeric, categorical and date column lists (restricted to columns if given)"""
+        if columns is not None:
+            kinds = {col: kind for col, kind in kinds.items() if col in columns}
+        return tuple(
+            [col for col, kind in kinds.items() if kind == name]
+            for name in ('numeric', 'categorical', 'date')
+        )
+    
+    def _suggest_charts(self, numeric_cols, categorical_cols, date_cols):
+        """Build chart configs from lists of numeric, categorical and date columns"""
+        chart_suggestions = {}
+        
         # Bar charts for categorical columns
         for col in categorical_cols[:5]:  # Limit to first 5
             chart_suggestions[f'bar_{col}'] = {
@@ -232,7 +675,8 @@ class DataProcessor:
             
         return chart_suggestions
     
-    def create_chart(self, chart_config):
+    @timed('create_chart')
+    def create_chart(self, chart_config, raise_errors=False):
         """Create a chart based on configuration"""
         if self.df is None:
             return None
@@ -245,8 +689,22 @@ class DataProcessor:
         
         if not x_col or x_col not in self.df.columns:
             return None
+        if y_col and y_col not in self.df.columns:
+            y_col = None
             
         try:
+            # Charts of a table are aggregated (or sampled) in SQLite so only the summary is shipped
+            if (self.current_table and chart_type in ENGINE_CHART_TYPES
+                    and not color_col and not chart_config.get('size_col')):
+                return self.chart_engine.build_chart(
+                    self.db_path,
+                    self.current_table,
+                    dict(chart_config, y_col=y_col),
+                    point_budget=self.point_budget
+                )
+            
+            point_budget = chart_config.get('point_budget', self.point_budget)
+            
             if chart_type == 'bar':
                 if y_col and y_col in self.df.columns:
                     # Grouped bar chart
@@ -277,6 +735,18 @@ class DataProcessor:
                     plot_df = self.df.sort_values(by=x_col)
                 else:
                     plot_df = self.df
+                
+                # Downsample long lines with LTTB to keep their shape within the point budget
+                if len(plot_df) > point_budget and not color_col:
+                    if pd.api.types.is_datetime64_any_dtype(plot_df[x_col]):
+                        x_values = plot_df[x_col].astype('int64')
+                    elif pd.api.types.is_numeric_dtype(plot_df[x_col]):
+                        x_values = plot_df[x_col]
+                    else:
+                        x_values = np.arange(len(plot_df))
+                    keep = lttb(x_values, plot_df[y_col], point_budget)
+                    title = f"{title}<br><sup>{sampling_note(len(keep), len(plot_df), 'lttb')}</sup>"
+                    plot_df = plot_df.iloc[keep]
                     
                 fig = px.line(
                     plot_df,
@@ -289,9 +759,15 @@ class DataProcessor:
             elif chart_type == 'scatter':
                 if not y_col or y_col not in self.df.columns:
                     return None
+                
+                # Uniform sample of rows when there are more than the point budget
+                plot_df = self.df
+                if len(plot_df) > point_budget:
+                    plot_df = plot_df.iloc[sample_indices(len(plot_df), point_budget)]
+                    title = f"{title}<br><sup>{sampling_note(len(plot_df), len(self.df), 'sample')}</sup>"
                     
                 fig = px.scatter(
-                    self.df,
+                    plot_df,
                     x=x_col,
                     y=y_col,
                     color=color_col,
@@ -330,42 +806,288 @@ class DataProcessor:
                 )
             else:
                 return None
-                
-            return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+            
+            with span('serialize'):
+                chart_json = json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+            count('bytes_serialized', len(chart_json), source='chart')
+            return chart_json
             
         except Exception as e:
             print(f"Error creating chart: {e}")
+            if raise_errors:
+                raise
             return None
     
-    def generate_dashboard_charts(self):
-        """Generate charts for dashboard based on data types"""
+    def get_chart_config(self, table_name, chart_id):
+        """Return the suggested chart config for chart_id on a table (None if there is none)"""
+        chart_suggestions = self.get_chart_suggestions(table_name)
+        if chart_suggestions is None:
+            return None
+        return chart_suggestions.get(chart_id)
+    
+    def get_chart_etag(self, table_name, chart_config):
+        """ETag for a chart; changes when the database file or the chart settings change"""
+        key = json.dumps(
+            [os.path.abspath(self.db_path), database_version(self.db_path), table_name, chart_config, self.point_budget],
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+    
+    def create_table_chart(self, table_name, chart_config, raise_errors=False):
+        """Create a chart for a table without holding the session lock while it renders.
+
+        Engine charts only need the table name, so parallel chart requests from
+        one session don't queue behind each other. Other charts fall back to
+        create_chart on a load of just the columns the chart uses.
+        """
+        if chart_config.get('type') in ENGINE_CHART_TYPES and not chart_config.get('color_col') \
+                and not chart_config.get('size_col'):
+            try:
+                return self.chart_engine.build_chart(
+                    self.db_path, table_name, chart_config, point_budget=self.point_budget
+                )
+            except Exception as e:
+                print(f"Error creating chart: {e}")
+                if raise_errors:
+                    raise
+                return None
+        
+        known = {col['name'] for col in self.get_column_info(table_name)}
+        columns = [
+            chart_config.get(key) for key in ('x_col', 'y_col', 'color_col', 'size_col')
+            if chart_config.get(key) in known
+        ]
+        
+        with self.lock:
+            if not self.load_table_data(table_name, columns=columns or None):
+                return None
+            return self.create_chart(chart_config, raise_errors=raise_errors)
+    
+    def get_table_chart(self, table_name, chart_config, raise_errors=False):
+        """create_table_chart through the chart cache (keyed by the chart's ETag)"""
+        etag = self.get_chart_etag(table_name, chart_config)
+        chart_json = self.chart_cache.get(etag)
+        if chart_json is None:
+            chart_json = self.create_table_chart(table_name, chart_config, raise_errors=raise_errors)
+            if chart_json:
+                self.chart_cache.put(etag, chart_json)
+        return chart_json
+    
+    def prerender_charts(self, table_name, job=None):
+        """Render a table's suggested dashboard charts into the chart cache.
+
+        With a background job, progress is reported and rendering stops early
+        once the job is cancelled. Returns the number of charts rendered.
+        """
+        chart_suggestions = self.get_chart_suggestions(table_name) or {}
+        rendered = 0
+        for i, config in enumerate(chart_suggestions.values()):
+            if job is not None:
+                if job.cancelled:
+                    break
+                job.progress(i, len(chart_suggestions))
+            if self.get_table_chart(table_name, config):
+                rendered += 1
+        if job is not None and not job.cancelled:
+            job.progress(len(chart_suggestions), len(chart_suggestions))
+        return rendered
+    
+    def get_live_table(self, table_name, watermark=None):
+        """Shared LiveTable keeping a table's dashboard charts current as rows are appended.
+
+        New rows are those above watermark: the rowid by default, or a column
+        whose values only grow (e.g. an insertion timestamp). Only charts the
+        live table can update incrementally are included. Raises ValueError
+        for an unknown table or watermark column.
+        """
+        if table_name not in self.get_table_list():
+            raise ValueError(f"Unknown table: {table_name}")
+        watermark = watermark or ROWID
+        if watermark == ROWID:
+            try:
+                with self.pool.connection(self.db_path) as conn:
+                    conn.execute(f"SELECT rowid FROM {quote_identifier(table_name)} LIMIT 0")
+            except Error:
+                raise ValueError(f"Table {table_name} has no rowid; choose a timestamp column as watermark")
+        elif watermark not in {col['name'] for col in self.get_column_info(table_name)}:
+            raise ValueError(f"Unknown watermark column: {watermark}")
+        
+        def create():
+            charts = {
+                chart_id: config for chart_id, config in (self.get_chart_suggestions(table_name) or {}).items()
+                if config.get('type') in LIVE_CHART_TYPES and not config.get('color_col')
+                and not config.get('size_col')
+            }
+            return LiveTable(
+                self.pool, self.chart_engine, self.db_path, table_name, charts,
+                watermark=watermark, profile_store=self.profile_store, point_budget=self.point_budget
+            )
+        
+        return shared_live_registry.get(self.db_path, table_name, watermark, create)
+    
+    def generate_dashboard_charts(self, workers=None, timeout=None):
+        """Generate charts for dashboard based on data types.
+
+        Charts are built concurrently on `workers` threads (chart_workers by
+        default; 1 builds them one after another). A chart that fails or runs
+        longer than `timeout` seconds gets a placeholder entry with an 'error'
+        instead of holding up the rest. Charts keep the order of
+        detect_chart_types. The lock is held throughout, so the loaded table
+        can't be swapped while its charts are built.
+        """
+        with self.lock:
+            return self._generate_dashboard_charts(workers, timeout)
+    
+    def _generate_dashboard_charts(self, workers, timeout):
+        """generate_dashboard_charts with the lock held"""
         if self.df is None:
             return {}
-            
-        charts = {}
+        
+        workers = workers or self.chart_workers
+        timeout = timeout or self.chart_timeout
         chart_suggestions = self.detect_chart_types()
         
-        # Create each suggested chart
+        if workers <= 1:
+            # Create each suggested chart
+            results = {}
+            for chart_id, config in chart_suggestions.items():
+                try:
+                    results[chart_id] = (self.create_chart(config, raise_errors=True), None)
+                except Exception as e:
+                    results[chart_id] = (None, f"Chart failed: {e}")
+        else:
+            results = self._build_charts_concurrently(chart_suggestions, workers, timeout)
+        
+        charts = {}
         for chart_id, config in chart_suggestions.items():
-            chart_json = self.create_chart(config)
+            chart_json, error = results[chart_id]
             if chart_json:
                 charts[chart_id] = {
                     'config': config,
                     'json': chart_json
                 }
+            elif error:
+                # Placeholder so the dashboard still shows where the chart would be
+                charts[chart_id] = {
+                    'config': config,
+                    'json': None,
+                    'error': error
+                }
                 
         return charts
     
-    def run_custom_query(self, query):
-        """Run a custom SQL query on the database"""
+    def _build_charts_concurrently(self, chart_suggestions, workers, timeout):
+        """Run create_chart on a thread pool; returns {chart_id: (json, error)}"""
+        started = {}
+        
+        def build(chart_id, config):
+            started[chart_id] = time.monotonic()
+            return self.create_chart(config, raise_errors=True)
+        
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='chart')
+        # Each chart runs in a copy of the caller's context so its spans land in the request trace
+        pending = {
+            executor.submit(contextvars.copy_context().run, build, chart_id, config): chart_id
+            for chart_id, config in chart_suggestions.items()
+        }
+        results = {}
+        
+        try:
+            while pending:
+                # Wake up when a chart finishes or the oldest running chart hits its timeout
+                now = time.monotonic()
+                deadlines = [started[chart_id] + timeout for chart_id in pending.values() if chart_id in started]
+                wait_for = max(0.0, min(deadlines) - now) if deadlines else timeout
+                done, _ = wait(pending, timeout=min(wait_for, 0.5), return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    chart_id = pending.pop(future)
+                    try:
+                        results[chart_id] = (future.result(), None)
+                    except Exception as e:
+                        results[chart_id] = (None, f"Chart failed: {e}")
+                
+                now = time.monotonic()
+                for future, chart_id in list(pending.items()):
+                    if chart_id in started and now - started[chart_id] > timeout:
+                        print(f"Chart {chart_id} timed out after {timeout}s")
+                        results[chart_id] = (None, f"Chart timed out after {timeout}s")
+                        del pending[future]
+        finally:
+            # Don't wait for timed-out charts; their results are discarded
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        return results
+    
+    @timed('custom_query')
+    def start_custom_query(self, query, query_id=None, owner=None, confirmed=False):
+        """Start a custom SQL query on the database without waiting for it.
+
+        Results are served from the query cache while the database is
+        unchanged, returned at once with 'cached': True. Otherwise the query
+        is submitted to the query runner (read-only, with a timeout and a
+        row cap) and {'query_id', 'status': 'running'} is returned; poll
+        get_custom_query for the result. {'error': ...} if it can't start.
+
+        Unless confirmed, a query whose plan fully scans a large table is not
+        run; {'needs_confirmation': True, 'warnings': [...]} is returned instead.
+        """
         if not self.db_path:
             raise ValueError("Database not connected")
-            
-        try:
-            conn = sqlite3.connect(self.db_path)
-            result_df = pd.read_sql_query(query, conn)
-            conn.close()
-            return result_df.to_dict(orient='records')
-        except Error as e:
-            print(f"Query error: {e}")
-            return {"error": str(e)}
\ No newline at end of file
+        
+        db_path = self.db_path
+        max_rows = self.query_runner.max_rows
+        result = self.query_cache.get(db_path, query, max_rows)
+        if result is not None:
+            # Cached results are shared, so flag a copy (rows stay as fetched, split orient)
+            return dict(result, cached=True, sql=query)
+        
+        if not confirmed:
+            warnings = self.query_runner.plan_warnings(db_path, query)
+            if warnings:
+                return {'needs_confirmation': True, 'warnings': warnings}
+        
+        # Cache under the version the query started from, not the one it finished at
+        version = database_version(db_path)
+        
+        def on_done(result):
+            count('rows_read', len(result['rows']), source='custom_query')
+            self.query_cache.put(db_path, query, max_rows, result, version=version)
+        
+        query_id = self.query_runner.submit(db_path, query, query_id=query_id, owner=owner, on_done=on_done)
+        if isinstance(query_id, dict):
+            return query_id
+        return {'query_id': query_id, 'status': 'running', 'elapsed': 0}
+    
+    def get_custom_query(self, query_id, owner=None, wait=0):
+        """Status of a query from start_custom_query: {'status': 'running', ...} until it
+        finishes, then its result ({'columns', 'rows', ...} or {'error': ...}) with
+        'cached': False. None if the id is unknown or expired."""
+        result = self.query_runner.result(query_id, owner=owner, wait=wait)
+        if result is None or result.get('status') == 'running':
+            return result
+        return dict(result, cached=False)
+    
+    def run_custom_query(self, query, query_id=None, owner=None, confirmed=False):
+        """start_custom_query, then wait for the result (at most the runner's timeout).
+
+        Returns the result as get_custom_query does, the cached result, or
+        the needs_confirmation/error dict from start_custom_query.
+        """
+        result = self.start_custom_query(query, query_id=query_id, owner=owner, confirmed=confirmed)
+        if result.get('status') != 'running':
+            return result
+        
+        timeout = self.query_runner.timeout
+        result = self.get_custom_query(result['query_id'], owner=owner, wait=timeout)
+        if result is None:
+            return {"error": "Query result expired"}
+        if result.get('status') == 'running':
+            self.cancel_custom_query(result['query_id'], owner=owner)
+            return {"error": f"Query did not finish within {timeout} seconds"}
+        return result
+    
+    def cancel_custom_query(self, query_id, owner=None):
+        """Cancel a running custom query started by the same owner"""
+        return self.query_runner.cancel(query_id, owner=owner)
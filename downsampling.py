@@ -0,0 +1,99 @@
+import numpy as np
+
+# Default number of points a scatter or line chart may send to the browser
+DEFAULT_POINT_BUDGET = 5000
+
+# Grid used when a scatter is replaced by a 2D density heatmap (binned in SQL)
+DENSITY_BINS = 100
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets downsampling of a line to `threshold` points.
+
+    x must be sorted and numeric (convert datetimes to int64 first). Returns the
+    indices of the points to keep, always including the first and last point,
+    so the caller can pick the matching x labels. Points with a NaN y (gaps)
+    are never preferred; a bucket of nothing but gaps keeps its first index.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    valid = ~np.isnan(y)
+
+    # Interior points are split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    anchor = 0  # last picked point with a y value
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # Average of the next bucket (or the last point for the final bucket), ignoring gaps
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+        else:
+            next_start, next_end = n - 1, n
+        next_valid = valid[next_start:next_end]
+        if next_valid.any():
+            avg_x = x[next_start:next_end][next_valid].mean()
+            avg_y = y[next_start:next_end][next_valid].mean()
+        else:
+            avg_x, avg_y = x[next_start:next_end].mean(), y[anchor]
+
+        # Pick the point forming the largest triangle with the previous pick and that average
+        ax, ay = x[anchor], y[anchor]
+        areas = np.abs((ax - avg_x) * (y[start:end] - ay) - (ax - x[start:end]) * (avg_y - ay))
+        candidates = np.nonzero(~np.isnan(areas))[0]
+        if len(candidates):
+            selected = start + int(candidates[np.argmax(areas[candidates])])
+        else:
+            # No usable area (all gaps, or no y value picked yet): first point with a y value, else the first
+            present = np.nonzero(valid[start:end])[0]
+            selected = start + int(present[0]) if len(present) else start
+        keep[i + 1] = selected
+        if valid[selected]:
+            anchor = selected
+
+    return keep
+
+
+def reservoir_sample(batches, k, seed=None):
+    """Uniform sample of k rows from an iterable of row batches (Algorithm R).
+
+    Each batch is a list of tuples, e.g. from cursor.fetchmany. Memory is
+    O(k) regardless of how many rows stream through. Returns (sample, seen).
+    """
+    rng = np.random.default_rng(seed)
+    reservoir = []
+    seen = 0
+    for batch in batches:
+        start = 0
+        if len(reservoir) < k:
+            start = min(k - len(reservoir), len(batch))
+            reservoir.extend(batch[:start])
+
+        if start < len(batch):
+            # Row number j (0-based, across all batches) replaces slot randint(0, j) if it is < k
+            positions = np.arange(seen + start, seen + len(batch))
+            slots = rng.integers(0, positions + 1)
+            for offset in np.nonzero(slots < k)[0]:
+                reservoir[slots[offset]] = batch[start + offset]
+        seen += len(batch)
+    return reservoir, seen
+
+
+def sample_indices(n, k, seed=None):
+    """Sorted indices of a uniform sample of k out of n rows (all rows if n <= k)"""
+    if n <= k:
+        return np.arange(n)
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(n, size=k, replace=False))
+
+
+def sampling_note(points, rows, method):
+    """Subtitle telling the viewer how many rows a downsampled chart represents"""
+    return f"{points:,} points representing {rows:,} rows ({method})"
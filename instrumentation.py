@@ -0,0 +1,213 @@
+import contextvars
+import cProfile
+import functools
+import io
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+METRIC_PREFIX = 'dbviz_'
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Functions listed in a per-request profile report
+PROFILE_LIMIT = 40
+
+METRIC_HELP = {
+    'http_request_duration_seconds': 'Time to handle a request, by endpoint',
+    'span_duration_seconds': 'Time spent in an instrumented phase (SQLite reads, stats, charts, serialization)',
+    'rows_read_total': 'Rows read from databases into Python',
+    'bytes_serialized_total': 'Bytes of JSON produced',
+    'cache_requests_total': 'Cache lookups by cache and result (hit or miss)',
+}
+
+# Trace of the request being handled (None outside requests and in background jobs)
+_current_trace = contextvars.ContextVar('request_trace', default=None)
+
+
+class RequestTrace:
+    """Timing spans and counters recorded while handling one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}     # span name -> [total seconds, count], in first-seen order
+        self.counters = {}  # counter name -> total
+        self.profiler = None
+        self._lock = threading.Lock()
+
+    def add_span(self, name, seconds):
+        with self._lock:
+            entry = self.spans.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def add(self, name, amount):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Server-Timing header value: one entry per span name, the counters, then the total"""
+        with self._lock:
+            parts = [f'{name};dur={seconds * 1000:.1f}' for name, (seconds, _) in self.spans.items()]
+            parts.extend(f'{name};desc="{value}"' for name, value in self.counters.items())
+        parts.append(f'total;dur={self.elapsed() * 1000:.1f}')
+        return ', '.join(parts)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + (list(extra.items()) if extra else [])
+    if not items:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in items)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(items, escaped)) + '}'
+
+
+class Metrics:
+    """Process-wide counters and latency histograms rendered in Prometheus text format"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = {}    # name -> {label key: value}
+        self._histograms = {}  # name -> {label key: [bucket counts..., sum, count]}
+
+    def inc(self, name, amount=1, **labels):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            values = series.setdefault(_label_key(labels), [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    values[i] += 1
+            values[-2] += seconds
+            values[-1] += 1
+
+    def render(self, gauges=None):
+        """Prometheus exposition text; gauges is {name: value} read at scrape time"""
+        lines = []
+
+        def header(name, kind):
+            if name in METRIC_HELP:
+                lines.append(f'# HELP {METRIC_PREFIX}{name} {METRIC_HELP[name]}')
+            lines.append(f'# TYPE {METRIC_PREFIX}{name} {kind}')
+
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                header(name, 'counter')
+                for key, value in series.items():
+                    lines.append(f'{METRIC_PREFIX}{name}{_format_labels(key)} {value}')
+
+            for name, series in sorted(self._histograms.items()):
+                header(name, 'histogram')
+                for key, values in series.items():
+                    # Buckets are cumulative: each observation counted in every bucket it fits
+                    for bound, count in zip(self.buckets, values):
+                        lines.append(f'{METRIC_PREFIX}{name}_bucket{_format_labels(key, {"le": bound})} {count}')
+                    lines.append(f'{METRIC_PREFIX}{name}_bucket{_format_labels(key, {"le": "+Inf"})} {values[-1]}')
+                    lines.append(f'{METRIC_PREFIX}{name}_sum{_format_labels(key)} {values[-2]:.6f}')
+                    lines.append(f'{METRIC_PREFIX}{name}_count{_format_labels(key)} {values[-1]}')
+
+        for name, value in sorted((gauges or {}).items()):
+            lines.append(f'# TYPE {METRIC_PREFIX}{name} gauge')
+            lines.append(f'{METRIC_PREFIX}{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+# Metrics shared by the whole process
+metrics = Metrics()
+
+
+def start_trace():
+    """Begin tracing the current request; returns (trace, token for end_trace)"""
+    trace = RequestTrace()
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token):
+    try:
+        _current_trace.reset(token)
+    except ValueError:
+        # Streamed responses can finish in another context; just stop tracing there
+        _current_trace.set(None)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name):
+    """Time a block into the span histogram and the current request's trace"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        metrics.observe('span_duration_seconds', seconds, span=name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span(name, seconds)
+
+
+def timed(name):
+    """Decorator form of span()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, amount, **labels):
+    """Add to a counter (e.g. rows_read) and to the current request's trace"""
+    metrics.inc(f'{name}_total', amount, **labels)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, amount)
+
+
+def cache_lookup(cache, hit):
+    """Record a hit or miss of one of the caches"""
+    result = 'hit' if hit else 'miss'
+    metrics.inc('cache_requests_total', cache=cache, result=result)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(f'{cache}_cache_{result}', 1)
+
+
+def stats_gauges(prefix, stats):
+    """Numeric entries of a component's stats() dict as gauges named prefix_key"""
+    return {
+        f'{prefix}_{key}': value for key, value in stats.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+
+
+def start_profiler(trace):
+    """Run cProfile for the rest of the request on this thread"""
+    trace.profiler = cProfile.Profile()
+    trace.profiler.enable()
+
+
+def profile_report(trace, limit=PROFILE_LIMIT):
+    """Stop the request's profiler and return its top functions by cumulative time"""
+    trace.profiler.disable()
+    output = io.StringIO()
+    pstats.Stats(trace.profiler, stream=output).sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
@@ -0,0 +1,178 @@
+import heapq
+import itertools
+import threading
+import time
+import uuid
+
+# Job priorities (lower runs first)
+PRIORITY_ROW_COUNT = 0
+PRIORITY_PROFILE = 10
+PRIORITY_CHARTS = 20
+
+DEFAULT_JOB_WORKERS = 2
+
+# Finished jobs kept for the progress UI
+MAX_FINISHED_JOBS = 200
+
+JOB_STATES = ('queued', 'running', 'done', 'failed', 'cancelled')
+
+
+class Job:
+    """A unit of background work. The function receives the job to report progress and check cancellation."""
+
+    def __init__(self, func, name, group=None, priority=PRIORITY_PROFILE, key=None):
+        self.id = uuid.uuid4().hex
+        self.func = func
+        self.name = name
+        self.group = group
+        self.priority = priority
+        self.key = key
+
+        self.state = 'queued'
+        self.done = 0
+        self.total = None
+        self.error = None
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def progress(self, done, total=None):
+        """Report progress (e.g. charts rendered out of total)"""
+        self.done = done
+        if total is not None:
+            self.total = total
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'group': self.group,
+            'priority': self.priority,
+            'state': self.state,
+            'done': self.done,
+            'total': self.total,
+            'error': self.error,
+            'elapsed': round((self.finished_at or time.time()) - self.started_at, 3) if self.started_at else None
+        }
+
+
+class JobQueue:
+    """Prioritized background jobs on a bounded pool of worker threads.
+
+    Jobs are run lowest priority first (then in submission order). A job
+    submitted with a key while another job with the same key is queued or
+    running is not added again. Jobs are grouped (e.g. per session) so
+    everything a session scheduled can be cancelled at once: queued jobs are
+    dropped and running ones see job.cancelled and should stop early.
+    """
+
+    def __init__(self, workers=DEFAULT_JOB_WORKERS, max_finished=MAX_FINISHED_JOBS):
+        self.workers = workers
+        self.max_finished = max_finished
+
+        self._lock = threading.Condition()
+        self._heap = []             # (priority, sequence, job)
+        self._sequence = itertools.count()
+        self._jobs = {}             # job_id -> Job, in submission order
+        self._active_keys = {}      # key -> job_id for queued/running jobs
+        self._threads = []
+
+    def _start_workers(self):
+        """Start worker threads on first use (lock held)"""
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f'job-worker-{len(self._threads)}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, func, name, group=None, priority=PRIORITY_PROFILE, key=None):
+        """Queue func(job) and return the job id (the existing one if key is already active)"""
+        with self._lock:
+            if key is not None and key in self._active_keys:
+                return self._active_keys[key]
+
+            job = Job(func, name, group=group, priority=priority, key=key)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._active_keys[key] = job.id
+            heapq.heappush(self._heap, (priority, next(self._sequence), job))
+            self._start_workers()
+            self._lock.notify()
+            return job.id
+
+    def _work(self):
+        while True:
+            with self._lock:
+                while not self._heap:
+                    self._lock.wait()
+                job = heapq.heappop(self._heap)[2]
+                if job.state != 'queued':
+                    continue  # cancelled while queued
+                job.state = 'running'
+                job.started_at = time.time()
+
+            try:
+                job.result = job.func(job)
+                state = 'cancelled' if job.cancelled else 'done'
+            except Exception as e:
+                print(f"Error in background job {job.name}: {e}")
+                job.error = str(e)
+                state = 'failed'
+
+            with self._lock:
+                job.state = state
+                job.finished_at = time.time()
+                self._release_key(job)
+                self._trim()
+
+    def _release_key(self, job):
+        if job.key is not None and self._active_keys.get(job.key) == job.id:
+            del self._active_keys[job.key]
+
+    def _trim(self):
+        """Forget the oldest finished jobs beyond max_finished (lock held)"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.state in ('done', 'failed', 'cancelled')]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def cancel(self, job_id, group=None):
+        """Cancel a job (only within `group` if given). Returns True if it was queued or running."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or (group is not None and job.group != group):
+                return False
+            return self._cancel(job)
+
+    def _cancel(self, job):
+        if job.state not in ('queued', 'running'):
+            return False
+        job.cancel_event.set()
+        if job.state == 'queued':
+            job.state = 'cancelled'
+            job.finished_at = time.time()
+            self._release_key(job)
+        return True
+
+    def cancel_group(self, group):
+        """Cancel every queued or running job of a group; returns how many were cancelled"""
+        with self._lock:
+            return sum(self._cancel(job) for job in list(self._jobs.values()) if job.group == group)
+
+    def jobs(self, group=None):
+        """Snapshots of known jobs (optionally of one group), oldest first"""
+        with self._lock:
+            return [job.to_dict() for job in self._jobs.values() if group is None or job.group == group]
+
+    def stats(self):
+        """Number of jobs per state"""
+        with self._lock:
+            counts = {state: 0 for state in JOB_STATES}
+            for job in self._jobs.values():
+                counts[job.state] += 1
+            counts['workers'] = self.workers
+            return counts
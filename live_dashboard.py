@@ -0,0 +1,393 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from chart_engine import MAX_CATEGORIES, HISTOGRAM_BINS
+from downsampling import DEFAULT_POINT_BUDGET
+from query_compiler import quote_identifier
+from table_cache import database_version
+from sketches import histogram_add
+from instrumentation import span, count
+
+# Chart types whose series can absorb appended rows (box quartiles and scatter samples can't)
+LIVE_CHART_TYPES = ('bar', 'pie', 'histogram', 'line')
+
+# The default high-water mark
+ROWID = 'rowid'
+
+# Seconds between checks for appended rows, between keep-alive comments, and before a stream ends
+# (the browser's EventSource reconnects on its own)
+LIVE_POLL_SECONDS = 2
+LIVE_KEEPALIVE_SECONDS = 15
+LIVE_MAX_SECONDS = 3600
+
+# Appended rows read per batch
+LIVE_BATCH_SIZE = 50000
+
+# Times the initial build is retried when the table changes while it runs
+LIVE_BUILD_ATTEMPTS = 3
+
+MAX_LIVE_TABLES = 32
+
+
+def _top(items, key, limit):
+    """Largest `limit` (label, value) items by key, ties broken by label"""
+    return sorted(items, key=lambda item: (-key(item[1]), str(item[0])))[:limit]
+
+
+def merge_counts(series, values):
+    """Add a column of appended values to category_counts series.
+
+    Counts of labels outside the top MAX_CATEGORIES are already folded into
+    'other', so a label that later climbs into the top only shows its newer
+    rows; totals stay exact.
+    """
+    counts = dict(zip(series['labels'], series['counts']))
+    for label, n in values.dropna().value_counts().items():
+        label = label.item() if hasattr(label, 'item') else label
+        counts[label] = counts.get(label, 0) + int(n)
+    top = _top(counts.items(), lambda n: n, MAX_CATEGORIES)
+    return {
+        'labels': [label for label, _ in top],
+        'counts': [n for _, n in top],
+        'other': series['other'] + sum(counts.values()) - sum(n for _, n in top)
+    }
+
+
+def merge_sums(series, labels, values):
+    """Add appended (label, value) pairs to category_sums series"""
+    groups = {label: [total, n] for label, total, n in zip(series['labels'], series['sums'], series['counts'])}
+    frame = pd.DataFrame({'label': labels, 'value': pd.to_numeric(values, errors='coerce')}).dropna(subset=['label'])
+    for label, row in frame.groupby('label', observed=True)['value'].agg(['sum', 'count']).iterrows():
+        label = label.item() if hasattr(label, 'item') else label
+        group = groups.setdefault(label, [None, 0])
+        if row['count']:
+            group[0] = (group[0] or 0) + float(row['sum'])
+            group[1] += int(row['count'])
+    top = _top(groups.items(), lambda group: group[0] or 0, MAX_CATEGORIES)
+    return {
+        'labels': [label for label, _ in top],
+        'sums': [group[0] for _, group in top],
+        'counts': [group[1] for _, group in top]
+    }
+
+
+def merge_histogram(series, values):
+    """Add appended values to histogram series, widening bins to stay near HISTOGRAM_BINS"""
+    numbers = pd.to_numeric(values, errors='coerce').dropna()
+    if numbers.empty:
+        return series
+    if series['counts']:
+        edges = series['edges']
+        sketch = {'low': edges[0], 'width': edges[1] - edges[0], 'counts': series['counts']}
+    else:
+        sketch = {'low': float(numbers.min()), 'width': 1, 'counts': []}
+    # One spare bin: histogram_add reserves one for values on the top edge, which
+    # would otherwise halve the resolution on the first append
+    sketch = histogram_add(sketch, numbers, max_bins=HISTOGRAM_BINS + 1)
+    return {
+        'edges': [sketch['low'] + sketch['width'] * i for i in range(len(sketch['counts']) + 1)],
+        'counts': sketch['counts']
+    }
+
+
+def merge_time_series(series, dates, values):
+    """Add appended rows to time_series buckets (keeping the series' bucket format)"""
+    bucket_format = series.get('bucket_format')
+    if bucket_format is None:
+        return None  # empty when built: rebuild to choose a format
+
+    if pd.api.types.is_numeric_dtype(dates):
+        parsed = pd.to_datetime(dates, unit='s', errors='coerce')
+    else:
+        parsed = pd.to_datetime(dates, errors='coerce', format='mixed')
+    frame = pd.DataFrame({'bucket': parsed.dt.strftime(bucket_format), 'value': pd.to_numeric(values, errors='coerce')})
+    frame = frame.dropna(subset=['bucket'])
+
+    buckets = {
+        bucket: [n, total, low, high]
+        for bucket, n, total, low, high in zip(
+            series['buckets'], series['counts'], series['sums'], series['mins'], series['maxs']
+        )
+    }
+    for bucket, row in frame.groupby('bucket')['value'].agg(['count', 'sum', 'min', 'max']).iterrows():
+        entry = buckets.setdefault(bucket, [0, None, None, None])
+        if not row['count']:
+            continue
+        entry[0] += int(row['count'])
+        entry[1] = (entry[1] or 0) + float(row['sum'])
+        entry[2] = float(row['min']) if entry[2] is None else min(entry[2], float(row['min']))
+        entry[3] = float(row['max']) if entry[3] is None else max(entry[3], float(row['max']))
+
+    ordered = sorted(buckets.items())
+    return {
+        'bucket_format': bucket_format,
+        'buckets': [bucket for bucket, _ in ordered],
+        'counts': [entry[0] for _, entry in ordered],
+        'sums': [entry[1] for _, entry in ordered],
+        'mins': [entry[2] for _, entry in ordered],
+        'maxs': [entry[3] for _, entry in ordered]
+    }
+
+
+class LiveTable:
+    """Dashboard charts and stats of an append-only table, kept current from appended rows.
+
+    The charts' series are built once with the chart engine, together with
+    a high-water mark: the largest rowid, or the largest value of a chosen
+    timestamp column. After that, each poll() that finds the database file
+    changed reads only the rows above the mark and merges them into the
+    series (category counts and sums, histogram bins, time buckets). Stats
+    come from the profile store, which absorbs appended rows the same way.
+
+    The table is assumed to be append-only: updated or deleted rows are not
+    noticed. A timestamp mark also assumes new rows never carry an older (or
+    equal) timestamp than the newest row already seen. A changed schema, or
+    a mark that went backwards, rebuilds everything.
+    """
+
+    def __init__(self, pool, chart_engine, db_path, table_name, charts, watermark=ROWID,
+                 profile_store=None, point_budget=DEFAULT_POINT_BUDGET):
+        self.pool = pool
+        self.chart_engine = chart_engine
+        self.db_path = db_path
+        self.table_name = table_name
+        self.charts = charts  # chart_id -> config, LIVE_CHART_TYPES only
+        self.watermark = watermark
+        self.profile_store = profile_store
+        self.point_budget = point_budget
+
+        self.revision = 0
+        self.high_water = None
+        self.row_count = 0
+        self.stats = None
+        self.updated_at = None
+
+        self._lock = threading.Lock()
+        self._version = None
+        self._schema = None
+        self._series = {}
+        self._payload = None
+        self._payload_revision = None
+
+    def _watermark_expr(self):
+        return ROWID if self.watermark == ROWID else quote_identifier(self.watermark)
+
+    def _table_schema(self, conn):
+        return conn.execute(f"PRAGMA table_info({quote_identifier(self.table_name)})").fetchall()
+
+    def _build(self):
+        """Compute every chart's series from scratch (retried if the table changes meanwhile)"""
+        mark = self._watermark_expr()
+        table = quote_identifier(self.table_name)
+        for _ in range(LIVE_BUILD_ATTEMPTS):
+            version = database_version(self.db_path)
+            with self.pool.connection(self.db_path) as conn:
+                schema = self._table_schema(conn)
+                high_water, row_count = conn.execute(f"SELECT MAX({mark}), COUNT(*) FROM {table}").fetchone()
+            series = {
+                chart_id: self.chart_engine.chart_series(self.db_path, self.table_name, config, self.point_budget)
+                for chart_id, config in self.charts.items()
+            }
+            if database_version(self.db_path) == version:
+                break
+
+        self._version = version
+        self._schema = schema
+        self._series = series
+        self.high_water = high_water
+        self.row_count = row_count
+        self._refresh_stats()
+
+    def _needs_rebuild(self):
+        """True if the schema changed or the high-water mark went backwards (table replaced)"""
+        with self.pool.connection(self.db_path) as conn:
+            if self._table_schema(conn) != self._schema:
+                return True
+            high_water = conn.execute(
+                f"SELECT MAX({self._watermark_expr()}) FROM {quote_identifier(self.table_name)}"
+            ).fetchone()[0]
+        if self.high_water is None:
+            return False
+        return high_water is None or high_water < self.high_water
+
+    def _merge_appended(self):
+        """Read rows above the high-water mark and merge them into the series.
+
+        Returns how many rows were merged, or None if a chart has to be built
+        from scratch instead (it had nothing to draw before these rows).
+        """
+        columns = []
+        for config in self.charts.values():
+            for key in ('x_col', 'y_col'):
+                if config.get(key) and config[key] not in columns:
+                    columns.append(config[key])
+        select_list = ', '.join(quote_identifier(col) for col in columns) or 'NULL'
+        mark = self._watermark_expr()
+
+        query = f'SELECT {mark} AS "__mark__", {select_list} FROM {quote_identifier(self.table_name)}'
+        params = ()
+        if self.high_water is not None:
+            query += f" WHERE {mark} > ?"
+            params = (self.high_water,)
+        else:
+            query += f" WHERE {mark} IS NOT NULL"
+        query += f" ORDER BY {mark}"
+
+        appended = 0
+        with self.pool.connection(self.db_path) as conn:
+            for chunk in pd.read_sql_query(query, conn, params=params, chunksize=LIVE_BATCH_SIZE):
+                if chunk.empty:
+                    continue
+                appended += len(chunk)
+                last = chunk['__mark__'].iloc[-1]
+                self.high_water = last.item() if hasattr(last, 'item') else last
+                for chart_id, config in self.charts.items():
+                    merged = self._merge_chart(config, self._series.get(chart_id), chunk)
+                    if merged is None:
+                        # A rebuild reads every row, so merging the remaining chunks would count them twice
+                        count('rows_read', appended, source='live')
+                        return None
+                    self._series[chart_id] = merged
+        count('rows_read', appended, source='live')
+        return appended
+
+    def _merge_chart(self, config, series, chunk):
+        """Series with a chunk of appended rows merged in, or None if the chart must be rebuilt"""
+        chart_type = config.get('type', 'bar')
+        x_col = config.get('x_col')
+        y_col = config.get('y_col')
+        if series is None:
+            # Nothing to draw when built; start over now that there are rows
+            return None
+        if chart_type == 'bar' and y_col:
+            return merge_sums(series, chunk[x_col], chunk[y_col])
+        if chart_type in ('bar', 'pie'):
+            return merge_counts(series, chunk[x_col])
+        if chart_type == 'histogram':
+            return merge_histogram(series, chunk[x_col])
+        if chart_type == 'line':
+            return merge_time_series(series, chunk[x_col], chunk[y_col])
+        return series
+
+    def _refresh_stats(self):
+        """Stats from the profile store (updated incrementally), else just the row count"""
+        stats = {'columns': {}}
+        if self.profile_store is not None:
+            self.profile_store.refresh(self.db_path, self.table_name)
+            profile = self.profile_store.get_profile(self.db_path, self.table_name, fresh_only=False)
+            if profile:
+                stats = profile['stats']
+                if profile['version'] == json.dumps(database_version(self.db_path)):
+                    self.stats = stats
+                    stats = None
+        if stats is not None:
+            # No profile, or another thread is still updating it: at least keep the count current
+            self.stats = dict(stats, total_records=self.row_count)
+        self.updated_at = time.time()
+        self.revision += 1
+
+    def poll(self):
+        """Absorb rows appended since the last poll. Returns True if the charts changed."""
+        with self._lock:
+            if self._version is None:
+                with span('live_build'):
+                    self._build()
+                return True
+
+            version = database_version(self.db_path)
+            if version == self._version:
+                return False
+
+            with span('live_update'):
+                if self._needs_rebuild():
+                    self._build()
+                    return True
+                self._version = version
+                appended = self._merge_appended()
+                if appended is None:
+                    self._build()
+                    return True
+                if not appended:
+                    return False
+                self.row_count += appended
+                self._refresh_stats()
+                return True
+
+    def payload(self):
+        """(revision, JSON text) of the current charts and stats, rendered once per revision"""
+        with self._lock:
+            if self._payload_revision != self.revision:
+                charts = {}
+                for chart_id, config in self.charts.items():
+                    series = self._series.get(chart_id)
+                    if series is not None:
+                        chart_json = self.chart_engine.render_chart(config, series, self.point_budget)
+                        if chart_json:
+                            charts[chart_id] = chart_json
+                # Figures are already JSON, so splice them in rather than re-encoding them
+                chart_parts = ', '.join(f'{json.dumps(chart_id)}: {chart_json}' for chart_id, chart_json in charts.items())
+                head = json.dumps({
+                    'revision': self.revision,
+                    'high_water': self.high_water,
+                    'row_count': self.row_count,
+                    'updated_at': self.updated_at,
+                    'stats': self.stats
+                }, default=str)
+                self._payload = head[:-1] + ', "charts": {' + chart_parts + '}}'
+                self._payload_revision = self.revision
+            return self._payload_revision, self._payload
+
+
+class LiveRegistry:
+    """One LiveTable per (database, table, high-water mark), shared by every open dashboard"""
+
+    def __init__(self, max_tables=MAX_LIVE_TABLES):
+        self.max_tables = max_tables
+        self._lock = threading.Lock()
+        self._tables = OrderedDict()
+
+    def get(self, db_path, table_name, watermark, create):
+        """Return the LiveTable for a key, calling create() the first time"""
+        key = (os.path.abspath(db_path), table_name, watermark)
+        with self._lock:
+            live_table = self._tables.pop(key, None) or create()
+            self._tables[key] = live_table
+            while len(self._tables) > self.max_tables:
+                self._tables.popitem(last=False)
+            return live_table
+
+
+def live_events(live_table, poll_seconds=LIVE_POLL_SECONDS, keepalive_seconds=LIVE_KEEPALIVE_SECONDS,
+                max_seconds=LIVE_MAX_SECONDS):
+    """Server-sent events: an 'update' with the charts and stats whenever appended rows change them"""
+    started = last_sent = time.monotonic()
+    sent_revision = None
+    yield f"retry: {poll_seconds * 1000 * 2}\n\n"
+
+    while time.monotonic() - started < max_seconds:
+        try:
+            live_table.poll()
+        except Exception as e:
+            print(f"Error updating live dashboard: {e}")
+            yield f"event: failed\ndata: {json.dumps({'error': str(e)})}\n\n"
+            return
+
+        now = time.monotonic()
+        if live_table.revision != sent_revision:
+            sent_revision, payload = live_table.payload()
+            yield f"event: update\nid: {sent_revision}\ndata: {payload}\n\n"
+            last_sent = now
+        elif now - last_sent >= keepalive_seconds:
+            # Comment line: keeps proxies from closing the stream and notices closed clients
+            yield ": keepalive\n\n"
+            last_sent = now
+        time.sleep(poll_seconds)
+
+
+# Live tables shared by every DataProcessor in the process
+shared_live_registry = LiveRegistry()
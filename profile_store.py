@@ -0,0 +1,379 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from connection_pool import shared_pool
+from chart_engine import ChartEngine
+from stats_engine import StatsEngine, _numeric_only
+from query_compiler import quote_identifier
+from table_cache import database_version
+from job_queue import PRIORITY_PROFILE
+from sketches import HyperLogLog, merge_top_counts, histogram_add, histogram_quantile, TOP_K_CAPACITY
+
+# Rows read per batch when sketching columns or absorbing appended rows
+PROFILE_BATCH_SIZE = 50000
+
+# Stored in the sidecar's user_version; sidecars in an older format are emptied and rebuilt
+PROFILE_FORMAT = 2
+
+PROFILE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS table_profile (
+    table_name TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    schema TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    high_water INTEGER,
+    stats TEXT NOT NULL,
+    kinds TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS column_profile (
+    table_name TEXT NOT NULL,
+    column_name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    non_null INTEGER,
+    total REAL,
+    min_value,
+    max_value,
+    histogram TEXT,
+    hll BLOB,
+    top_values TEXT,
+    PRIMARY KEY (table_name, column_name)
+);
+"""
+
+
+class ProfileStore:
+    """Per-database table profiles persisted in a sidecar SQLite file.
+
+    A profile holds a table's row count, its get_basic_stats result, column
+    kinds (StatsEngine.chart_kinds, used for chart suggestions) and
+    per-column sketches: equal-width histograms and sums for numeric
+    columns, and HyperLogLog distinct counters and top-k counts for the
+    others. A profile is valid while the database file's version signature
+    is unchanged, so dashboards can skip loading and aggregating the table,
+    even after a restart.
+
+    When the database changes and rows have only been appended (rowid
+    high-water mark moved, no rows lost), just the new rows are read and
+    merged into the sketches. Any other change triggers a full rebuild.
+    """
+
+    def __init__(self, profile_dir, pool=None, job_queue=None):
+        self.profile_dir = profile_dir
+        self.pool = pool or shared_pool
+        self.job_queue = job_queue
+        self.stats_engine = StatsEngine(self.pool)
+        self.chart_engine = ChartEngine(self.pool)
+
+        self._lock = threading.Lock()
+        self._building = set()  # (db_path, table) currently being profiled
+
+        os.makedirs(profile_dir, exist_ok=True)
+
+    def profile_path(self, db_path):
+        """Sidecar file for a database: <name>.<hash of full path>.profile.sqlite"""
+        db_path = os.path.abspath(db_path)
+        digest = hashlib.sha1(db_path.encode('utf-8')).hexdigest()[:8]
+        return os.path.join(self.profile_dir, f"{os.path.basename(db_path)}.{digest}.profile.sqlite")
+
+    def _connect(self, db_path):
+        conn = sqlite3.connect(self.profile_path(db_path), timeout=30)
+        if conn.execute("PRAGMA user_version").fetchone()[0] != PROFILE_FORMAT:
+            conn.executescript("DROP TABLE IF EXISTS table_profile; DROP TABLE IF EXISTS column_profile;")
+            conn.execute(f"PRAGMA user_version = {PROFILE_FORMAT}")
+        conn.executescript(PROFILE_SCHEMA)
+        return conn
+
+    def get_profile(self, db_path, table_name, fresh_only=True):
+        """Return the stored profile for a table, or None if missing (or stale when fresh_only)"""
+        if not os.path.exists(self.profile_path(db_path)):
+            return None
+
+        try:
+            conn = self._connect(db_path)
+            row = conn.execute(
+                "SELECT version, row_count, high_water, stats, kinds, updated_at, schema "
+                "FROM table_profile WHERE table_name = ?",
+                (table_name,)
+            ).fetchone()
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Error reading profile: {e}")
+            return None
+
+        if row is None:
+            return None
+        if fresh_only and row[0] != json.dumps(database_version(db_path)):
+            return None
+
+        return {
+            'version': row[0],
+            'row_count': row[1],
+            'high_water': row[2],
+            'stats': json.loads(row[3]),
+            'kinds': json.loads(row[4]),
+            'updated_at': row[5],
+            'schema': json.loads(row[6])
+        }
+
+    def refresh(self, db_path, table_name):
+        """Bring a table's profile up to date (incrementally when rows were only appended)"""
+        key = (os.path.abspath(db_path), table_name)
+        with self._lock:
+            if key in self._building:
+                return False
+            self._building.add(key)
+
+        try:
+            stored = self.get_profile(db_path, table_name, fresh_only=False)
+            version = database_version(db_path)
+            if stored and stored['version'] == json.dumps(version):
+                return True
+
+            if stored and self._append_only(db_path, table_name, stored):
+                self._update_incremental(db_path, table_name, stored, version)
+            else:
+                self._build_full(db_path, table_name, version)
+            return True
+        except (sqlite3.Error, pd.errors.DatabaseError) as e:
+            print(f"Error profiling table {table_name}: {e}")
+            return False
+        finally:
+            with self._lock:
+                self._building.discard(key)
+
+    def refresh_in_background(self, db_path, tables, group=None):
+        """Refresh profiles for several tables as background jobs (one per table).
+
+        Jobs are keyed per group, so cancelling one session's jobs leaves
+        another session's refresh of the same table queued; refresh() skips
+        a table that is already being profiled. Without a job queue the
+        tables are refreshed on a daemon thread. Returns the job ids, or the
+        thread.
+        """
+        if self.job_queue is not None:
+            return [
+                self.job_queue.submit(
+                    lambda job, table_name=table_name: self.refresh(db_path, table_name),
+                    f"Profile {table_name}",
+                    group=group,
+                    priority=PRIORITY_PROFILE,
+                    key=('profile', os.path.abspath(db_path), table_name, group)
+                )
+                for table_name in tables
+            ]
+
+        def run():
+            for table_name in tables:
+                self.refresh(db_path, table_name)
+
+        thread = threading.Thread(target=run, name='profile-refresh', daemon=True)
+        thread.start()
+        return thread
+
+    def _table_schema(self, conn, table_name):
+        return [list(col) for col in conn.execute(f"PRAGMA table_info({quote_identifier(table_name)})").fetchall()]
+
+    def _high_water(self, conn, table_name):
+        """Largest rowid in the table, or None for WITHOUT ROWID tables"""
+        try:
+            return conn.execute(f"SELECT MAX(rowid) FROM {quote_identifier(table_name)}").fetchone()[0]
+        except sqlite3.Error:
+            return None
+
+    def _append_only(self, db_path, table_name, stored):
+        """True if the only change since the stored profile is rows appended above the high-water mark"""
+        if stored['high_water'] is None:
+            return False
+
+        table = quote_identifier(table_name)
+        with self.pool.connection(db_path) as conn:
+            if self._table_schema(conn, table_name) != stored['schema']:
+                return False
+            row_count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            appended = conn.execute(
+                f"SELECT COUNT(*) FROM {table} WHERE rowid > ?", (stored['high_water'],)
+            ).fetchone()[0]
+
+        # No new rows means existing rows were updated or deleted: rebuild instead
+        return appended > 0 and row_count == stored['row_count'] + appended
+
+    def _build_full(self, db_path, table_name, version):
+        """Profile a table from scratch"""
+        table = quote_identifier(table_name)
+        stats = self.stats_engine.table_stats(db_path, table_name)
+        categorical_cols = [col for col, col_stats in stats['columns'].items() if col_stats.get('type') == 'categorical']
+
+        columns = {}
+        with self.pool.connection(db_path) as conn:
+            schema = self._table_schema(conn, table_name)
+            high_water = self._high_water(conn, table_name)
+            kinds = self.stats_engine.chart_kinds(conn, table_name)
+
+            for col, kind in kinds.items():
+                quoted = quote_identifier(col)
+                if kind == 'numeric':
+                    # Text further down a numeric column is skipped, as appended rows are
+                    value = _numeric_only(quoted)
+                    non_null, total, minimum, maximum = conn.execute(
+                        f"SELECT COUNT({value}), SUM({value}), MIN({value}), MAX({value}) FROM {table}"
+                    ).fetchone()
+                    columns[col] = {
+                        'kind': kind,
+                        'non_null': non_null,
+                        'total': total,
+                        'min': minimum,
+                        'max': maximum,
+                        'histogram': None,
+                        'hll': None,
+                        'top': None
+                    }
+                elif col in categorical_cols:
+                    top = conn.execute(
+                        f"SELECT {quoted}, COUNT(*) AS n FROM {table} WHERE {quoted} IS NOT NULL "
+                        f"GROUP BY {quoted} ORDER BY n DESC LIMIT ?",
+                        (TOP_K_CAPACITY,)
+                    ).fetchall()
+                    hll = HyperLogLog()
+                    cursor = conn.execute(f"SELECT {quoted} FROM {table}")
+                    for batch in iter(lambda: cursor.fetchmany(PROFILE_BATCH_SIZE), []):
+                        hll.add([value for (value,) in batch])
+                    cursor.close()
+                    columns[col] = {
+                        'kind': kind,
+                        'non_null': None,
+                        'total': None,
+                        'min': None,
+                        'max': None,
+                        'histogram': None,
+                        'hll': hll,
+                        'top': dict(top)
+                    }
+
+        for col, column in columns.items():
+            if column['kind'] == 'numeric':
+                series = self.chart_engine.histogram(db_path, table_name, col)
+                if series['counts']:
+                    edges = series['edges']
+                    column['histogram'] = {
+                        'low': edges[0],
+                        'width': edges[1] - edges[0],
+                        'counts': series['counts']
+                    }
+
+        self._save(db_path, table_name, version, schema, stats['total_records'], high_water, stats, kinds, columns)
+
+    def _load_columns(self, conn, table_name):
+        columns = {}
+        rows = conn.execute(
+            "SELECT column_name, kind, non_null, total, min_value, max_value, histogram, hll, top_values "
+            "FROM column_profile WHERE table_name = ?",
+            (table_name,)
+        ).fetchall()
+        for name, kind, non_null, total, minimum, maximum, histogram, hll, top in rows:
+            columns[name] = {
+                'kind': kind,
+                'non_null': non_null,
+                'total': total,
+                'min': minimum,
+                'max': maximum,
+                'histogram': json.loads(histogram) if histogram else None,
+                'hll': HyperLogLog(registers=hll) if hll else None,
+                'top': {value: count for value, count in json.loads(top)} if top else None
+            }
+        return columns
+
+    def _update_incremental(self, db_path, table_name, stored, version):
+        """Merge rows appended above the high-water mark into the stored sketches"""
+        conn = self._connect(db_path)
+        columns = self._load_columns(conn, table_name)
+        conn.close()
+
+        names = list(columns)
+        select_list = ', '.join(quote_identifier(col) for col in names)
+        appended = 0
+        high_water = stored['high_water']
+
+        with self.pool.connection(db_path) as source:
+            chunks = pd.read_sql_query(
+                f"SELECT rowid AS \"__rowid__\", {select_list} FROM {quote_identifier(table_name)} "
+                f"WHERE rowid > ? ORDER BY rowid",
+                source,
+                params=(stored['high_water'],),
+                chunksize=PROFILE_BATCH_SIZE
+            )
+            for chunk in chunks:
+                appended += len(chunk)
+                high_water = int(chunk['__rowid__'].iloc[-1])
+                for col, column in columns.items():
+                    values = chunk[col]
+                    if column['kind'] == 'numeric':
+                        numbers = pd.to_numeric(values, errors='coerce').dropna()
+                        if numbers.empty:
+                            continue
+                        column['non_null'] = (column['non_null'] or 0) + len(numbers)
+                        column['total'] = (column['total'] or 0) + float(numbers.sum())
+                        column['min'] = min(v for v in (column['min'], numbers.min().item()) if v is not None)
+                        column['max'] = max(v for v in (column['max'], numbers.max().item()) if v is not None)
+                        if column['histogram']:
+                            column['histogram'] = histogram_add(column['histogram'], numbers)
+                        else:
+                            column['histogram'] = histogram_add({'low': float(numbers.min()), 'width': 1, 'counts': []}, numbers)
+                    else:
+                        column['hll'].add(values)
+                        column['top'] = merge_top_counts(column['top'], values.value_counts().to_dict())
+
+        stats = json.loads(json.dumps(stored['stats']))
+        stats['total_records'] = stored['row_count'] + appended
+        for col, col_stats in stats['columns'].items():
+            column = columns.get(col)
+            if column is None:
+                continue
+            if col_stats.get('type') == 'categorical':
+                col_stats['unique_values'] = column['hll'].count()
+                col_stats['top_values'] = dict(list(column['top'].items())[:10])
+            else:
+                col_stats['mean'] = round(column['total'] / column['non_null'], 2) if column['non_null'] else 'N/A'
+                median = histogram_quantile(column['histogram'], 0.5) if column['histogram'] else None
+                col_stats['median'] = round(median, 2) if median is not None else 'N/A'
+                col_stats['min'] = round(column['min'], 2) if column['min'] is not None else 'N/A'
+                col_stats['max'] = round(column['max'], 2) if column['max'] is not None else 'N/A'
+            # Medians, distinct counts and top values now come from sketches
+            col_stats['approximate'] = True
+
+        self._save(db_path, table_name, version, stored['schema'], stats['total_records'],
+                   high_water, stats, stored['kinds'], columns)
+
+    def _save(self, db_path, table_name, version, schema, row_count, high_water, stats, kinds, columns):
+        conn = self._connect(db_path)
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO table_profile "
+                "(table_name, version, schema, row_count, high_water, stats, kinds, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (table_name, json.dumps(version), json.dumps(schema), row_count, high_water,
+                 json.dumps(stats, default=str), json.dumps(kinds), time.time())
+            )
+            conn.execute("DELETE FROM column_profile WHERE table_name = ?", (table_name,))
+            conn.executemany(
+                "INSERT INTO column_profile "
+                "(table_name, column_name, kind, non_null, total, min_value, max_value, histogram, hll, top_values) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        table_name, col, column['kind'], column['non_null'], column['total'],
+                        column['min'], column['max'],
+                        json.dumps(column['histogram']) if column['histogram'] else None,
+                        column['hll'].to_bytes() if column['hll'] else None,
+                        json.dumps(list(column['top'].items()), default=str) if column['top'] is not None else None
+                    )
+                    for col, column in columns.items()
+                ]
+            )
+        conn.close()
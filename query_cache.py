@@ -0,0 +1,228 @@
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from query_compiler import quote_identifier
+from table_cache import database_version
+from instrumentation import cache_lookup
+
+# Cache limits for custom query results
+DEFAULT_QUERY_CACHE_ENTRIES = 128
+DEFAULT_QUERY_CACHE_BYTES = 64 * 1024 * 1024
+DEFAULT_QUERY_CACHE_TTL = 600  # seconds
+
+# Full scans of tables with at least this many rows are flagged before running
+LARGE_SCAN_ROWS = 100_000
+
+# EXPLAIN QUERY PLAN detail of a table scan, e.g. "SCAN t" or "SCAN TABLE t AS x" (full unless "USING ... INDEX")
+SCAN_PATTERN = re.compile(r'^SCAN (?:TABLE )?(\S+)')
+
+# "FROM table [AS] alias" / "JOIN table [AS] alias" in normalized SQL, to resolve aliases in the plan
+ALIAS_PATTERN = re.compile(r'\b(?:from|join)\s+"?(\w+)"?\s+(?:as\s+)?"?(\w+)"?')
+
+# An outer LIMIT lets a plain scan stop early
+LIMIT_PATTERN = re.compile(r'\blimit\s+\d+(?:\s*(?:,|offset)\s*\d+)?$')
+
+# Opening quote -> closing quote for SQL string literals and quoted identifiers
+QUOTES = {"'": "'", '"': '"', '`': '`', '[': ']'}
+
+
+def normalize_sql(sql):
+    """Canonical form of a statement for cache keys.
+
+    Comments are dropped, runs of whitespace collapse to one space, text
+    outside quotes is lowercased (SQLite keywords and bare identifiers are
+    case-insensitive) and trailing semicolons are removed. Literals and
+    quoted identifiers are kept exactly.
+    """
+    out = []
+    space = False  # whitespace or a comment seen since the last token
+    i = 0
+    n = len(sql)
+    while i < n:
+        char = sql[i]
+        is_token = char in QUOTES or not (char.isspace() or sql.startswith('--', i) or sql.startswith('/*', i))
+        if is_token and space:
+            if out:
+                out.append(' ')
+            space = False
+
+        if char in QUOTES:
+            close = QUOTES[char]
+            end = i + 1
+            while end < n:
+                if sql[end] == close:
+                    # A doubled quote is an escaped quote inside the literal
+                    if close != ']' and end + 1 < n and sql[end + 1] == close:
+                        end += 2
+                        continue
+                    break
+                end += 1
+            out.append(sql[i:end + 1])
+            i = end + 1
+        elif sql.startswith('--', i):
+            end = sql.find('\n', i)
+            i = n if end == -1 else end
+            space = True
+        elif sql.startswith('/*', i):
+            end = sql.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            space = True
+        elif char.isspace():
+            space = True
+            i += 1
+        else:
+            out.append(char.lower())
+            i += 1
+
+    return ''.join(out).rstrip(' ;')
+
+
+def _result_bytes(result):
+    """Rough in-memory size of a query result"""
+    size = sys.getsizeof(result['rows'])
+    for row in result['rows']:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+    return size
+
+
+class QueryCache:
+    """LRU cache of custom query results with a TTL.
+
+    Results are keyed on the database path, the normalized SQL, the row cap
+    they were fetched with and database_version() of the file, so any
+    write to the database makes earlier results unreachable. Entries expire
+    after ttl seconds and the least recently used ones are evicted beyond
+    max_entries or max_bytes.
+    """
+
+    def __init__(self, max_entries=DEFAULT_QUERY_CACHE_ENTRIES, max_bytes=DEFAULT_QUERY_CACHE_BYTES,
+                 ttl=DEFAULT_QUERY_CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> {'result', 'bytes', 'stored_at'}
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(db_path, sql, max_rows, version=None):
+        if version is None:
+            version = database_version(db_path)
+        return (os.path.abspath(db_path), normalize_sql(sql), max_rows, version)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry['bytes']
+
+    def get(self, db_path, sql, max_rows):
+        """Return the cached result for a query, or None"""
+        key = self._key(db_path, sql, max_rows)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry['stored_at'] > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                cache_lookup('query', False)
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            cache_lookup('query', True)
+            return entry['result']
+
+    def put(self, db_path, sql, max_rows, result, version=None):
+        """Store a query result (treated as immutable once cached).
+
+        version is the database_version() read before the query ran (the
+        current one by default), so a result computed while the database
+        changed is never stored under the newer version.
+        """
+        key = self._key(db_path, sql, max_rows, version)
+        size = _result_bytes(result)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {'result': result, 'bytes': size, 'stored_at': time.monotonic()}
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return hit/miss counters and occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'expirations': self.expirations,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'ttl': self.ttl
+            }
+
+
+def full_scan_warnings(conn, sql, min_rows=LARGE_SCAN_ROWS):
+    """Warnings for tables the query would scan in full that have at least min_rows rows.
+
+    Uses EXPLAIN QUERY PLAN, so nothing is executed. Row counts are
+    estimated from MAX(rowid). A statement that fails to plan yields no
+    warnings; running it reports the error.
+    """
+    try:
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+        tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    except sqlite3.Error:
+        return []
+
+    normalized = normalize_sql(sql)
+    # Unless rows must be sorted or grouped first, a LIMIT stops the scan early
+    if LIMIT_PATTERN.search(normalized) and not any('TEMP B-TREE' in row[-1] for row in plan):
+        return []
+    aliases = {alias: table for table, alias in ALIAS_PATTERN.findall(normalized)}
+    tables_lower = {name.lower(): name for name in tables}
+
+    warnings = []
+    for row in plan:
+        detail = row[-1]
+        match = SCAN_PATTERN.match(detail)
+        if not match or 'INDEX' in detail:
+            continue
+        name = match.group(1)
+        table_name = tables_lower.get(name.lower()) or tables_lower.get(aliases.get(name.lower(), ''))
+        if table_name is None:
+            continue  # subquery, CTE or view step
+        try:
+            rows = conn.execute(f"SELECT MAX(rowid) FROM {quote_identifier(table_name)}").fetchone()[0] or 0
+        except sqlite3.Error:
+            continue  # WITHOUT ROWID table
+        if rows >= min_rows:
+            warnings.append(f"Full scan of table '{table_name}' (about {rows:,} rows)")
+    return warnings
+
+
+# Cache shared by every DataProcessor in the process
+shared_query_cache = QueryCache()
@@ -0,0 +1,140 @@
+import math
+
+# Upper bound on values in a single IN (...) filter (SQLite variable limit is 999 on old builds)
+MAX_IN_VALUES = 900
+
+
+def quote_identifier(name):
+    """Quote a table or column name for use in SQLite statements"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def column_affinity(declared_type):
+    """Return the SQLite type affinity for a declared column type"""
+    declared = (declared_type or '').upper()
+
+    # Rules from https://www.sqlite.org/datatype3.html#determination_of_column_affinity
+    if 'INT' in declared:
+        return 'INTEGER'
+    if 'CHAR' in declared or 'CLOB' in declared or 'TEXT' in declared:
+        return 'TEXT'
+    if not declared or 'BLOB' in declared:
+        return 'BLOB'
+    if 'REAL' in declared or 'FLOA' in declared or 'DOUB' in declared:
+        return 'REAL'
+    return 'NUMERIC'
+
+
+def coerce_value(column, affinity, value):
+    """Validate a filter value against the column affinity and convert it for binding"""
+    if value is None:
+        return None
+
+    if isinstance(value, (list, dict)):
+        raise ValueError(f"Invalid value for column '{column}': nested values are not allowed")
+
+    if affinity in ('INTEGER', 'REAL', 'NUMERIC'):
+        if isinstance(value, bool):
+            return int(value)
+        if isinstance(value, (int, float)):
+            if isinstance(value, float) and not math.isfinite(value):
+                raise ValueError(f"Invalid value for column '{column}': {value}")
+            return value
+        if isinstance(value, str):
+            try:
+                number = float(value.strip())
+            except ValueError:
+                raise ValueError(f"Invalid value for column '{column}': expected a number, got '{value}'")
+            if not math.isfinite(number):
+                raise ValueError(f"Invalid value for column '{column}': {value}")
+            return int(number) if number.is_integer() and affinity == 'INTEGER' else number
+        raise ValueError(f"Invalid value for column '{column}': expected a number")
+
+    if affinity == 'TEXT':
+        if isinstance(value, bool):
+            return str(int(value))
+        if isinstance(value, (str, int, float)):
+            return str(value)
+        raise ValueError(f"Invalid value for column '{column}': expected text")
+
+    # BLOB / untyped columns compare with the value as given
+    if isinstance(value, (str, int, float)):
+        return value
+    raise ValueError(f"Invalid value for column '{column}'")
+
+
+def compile_filters(table_name, filter_params, column_info):
+    """Compile filter_params into a parameterized SELECT statement.
+
+    Supports the same shapes as DataProcessor.filter_data:
+        list            -> column IN (...)
+        {'min', 'max'}  -> column BETWEEN min AND max (or >= / <= if one side is missing)
+        scalar          -> column = value (None -> IS NULL)
+
+    Column names and values are validated against column_info (as returned by
+    get_column_info). Returns a (where_clause, params) tuple; where_clause is an
+    empty string when there is nothing to filter on.
+    """
+    if not isinstance(filter_params, dict):
+        raise ValueError("Filter parameters must be an object")
+
+    affinities = {col['name']: column_affinity(col['type']) for col in column_info}
+
+    clauses = []
+    params = []
+    for column, condition in filter_params.items():
+        if column not in affinities:
+            raise ValueError(f"Unknown column '{column}' in table '{table_name}'")
+
+        affinity = affinities[column]
+        quoted = quote_identifier(column)
+
+        if isinstance(condition, list):
+            # Multiple values for inclusion
+            if len(condition) > MAX_IN_VALUES:
+                raise ValueError(f"Too many values for column '{column}' (max {MAX_IN_VALUES})")
+            values = [coerce_value(column, affinity, value) for value in condition]
+            non_null = [value for value in values if value is not None]
+            parts = []
+            if non_null:
+                parts.append(f"{quoted} IN ({', '.join('?' for _ in non_null)})")
+                params.extend(non_null)
+            if len(non_null) != len(values):
+                parts.append(f"{quoted} IS NULL")
+            clauses.append(f"({' OR '.join(parts)})" if parts else "0")
+
+        elif isinstance(condition, dict):
+            # Range condition with min/max
+            unknown = set(condition) - {'min', 'max'}
+            if unknown:
+                raise ValueError(f"Unsupported range keys for column '{column}': {', '.join(sorted(unknown))}")
+            low = coerce_value(column, affinity, condition.get('min'))
+            high = coerce_value(column, affinity, condition.get('max'))
+            if low is not None and high is not None:
+                clauses.append(f"{quoted} BETWEEN ? AND ?")
+                params.extend([low, high])
+            elif low is not None:
+                clauses.append(f"{quoted} >= ?")
+                params.append(low)
+            elif high is not None:
+                clauses.append(f"{quoted} <= ?")
+                params.append(high)
+
+        else:
+            # Exact match
+            value = coerce_value(column, affinity, condition)
+            if value is None:
+                clauses.append(f"{quoted} IS NULL")
+            else:
+                clauses.append(f"{quoted} = ?")
+                params.append(value)
+
+    where_clause = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where_clause, params
+
+
+def compile_filter_query(table_name, filter_params, column_info, columns=None):
+    """Build a full parameterized SELECT for a table and filter_params"""
+    where_clause, params = compile_filters(table_name, filter_params, column_info)
+    select_list = ', '.join(quote_identifier(col) for col in columns) if columns else '*'
+    return f"SELECT {select_list} FROM {quote_identifier(table_name)}{where_clause}", params
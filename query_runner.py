@@ -0,0 +1,249 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from query_cache import full_scan_warnings
+
+# Limits for user-supplied SQL
+DEFAULT_QUERY_TIMEOUT = 30   # seconds of wall-clock time per query
+DEFAULT_MAX_ROWS = 10000     # rows returned before the result is truncated
+DEFAULT_QUERY_WORKERS = 2    # queries executing at once
+MAX_QUEUED_QUERIES = 8       # queries waiting for a worker before new ones are refused
+
+# Finished queries whose results are kept for their owner to fetch, and for how long
+MAX_FINISHED_QUERIES = 32
+RESULT_TTL = 600
+
+# SQLite VM instructions between progress-handler checks
+PROGRESS_STEPS = 10000
+
+# Pragmas that take an argument but only read (anything else with an argument sets a value)
+READ_PRAGMAS = (
+    'table_info', 'table_xinfo', 'table_list', 'index_list', 'index_info', 'index_xinfo',
+    'foreign_key_list', 'foreign_key_check', 'integrity_check', 'quick_check'
+)
+
+
+def _authorize(action, arg1, arg2, db_name, trigger):
+    """Deny statements that could escape the read-only connection"""
+    if action in (sqlite3.SQLITE_ATTACH, sqlite3.SQLITE_DETACH):
+        return sqlite3.SQLITE_DENY
+    # Reading a pragma is fine, setting one (e.g. query_only = OFF) is not
+    if action == sqlite3.SQLITE_PRAGMA and arg2 is not None and arg1.lower() not in READ_PRAGMAS:
+        return sqlite3.SQLITE_DENY
+    return sqlite3.SQLITE_OK
+
+
+class QueryRunner:
+    """Run user-supplied SQL safely on a bounded thread pool.
+
+    Each query gets its own read-only connection (mode=ro plus query_only and
+    an authorizer refusing ATTACH and pragma writes). A progress handler
+    aborts it once it runs longer than `timeout` seconds or is cancelled, and
+    at most `max_rows` rows are fetched.
+
+    submit() returns at once with a query id; the query runs on one of
+    `workers` threads, so a runaway query never ties up a web thread. Its
+    owner polls result() (which reports it running until it finishes) and
+    can cancel() it by id. Finished results are kept for a while
+    (RESULT_TTL seconds, at most MAX_FINISHED_QUERIES of them).
+    """
+
+    def __init__(self, workers=DEFAULT_QUERY_WORKERS, timeout=DEFAULT_QUERY_TIMEOUT,
+                 max_rows=DEFAULT_MAX_ROWS, max_queued=MAX_QUEUED_QUERIES):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_rows = max_rows
+        self.max_queued = max_queued
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='query')
+        self._lock = threading.Lock()
+        # query_id -> {'owner', 'sql', 'cancelled', 'done', 'submitted', 'result', 'finished'}
+        self._queries = {}
+
+        self.completed = 0
+        self.timed_out = 0
+        self.cancelled = 0
+        self.rejected = 0
+
+    def submit(self, db_path, sql, query_id=None, owner=None, on_done=None):
+        """Start a query without waiting for it.
+
+        Returns the query id, or {'error': ...} when the id is taken or too
+        many queries are already queued. on_done(result) is called on the
+        worker thread once the query succeeds (e.g. to cache the result).
+        """
+        query_id = query_id or uuid.uuid4().hex
+        query = {
+            'owner': owner,
+            'sql': sql,
+            'cancelled': threading.Event(),
+            'done': threading.Event(),
+            'submitted': time.monotonic(),
+            'result': None,
+            'finished': None
+        }
+
+        with self._lock:
+            self._expire()
+            if query_id in self._queries:
+                return {"error": "A query with this id already exists"}
+            if self._running() >= self.workers + self.max_queued:
+                self.rejected += 1
+                return {"error": "Too many queries are running, please try again shortly"}
+            self._queries[query_id] = query
+
+        self._executor.submit(self._run, db_path, sql, query_id, query, on_done)
+        return query_id
+
+    def result(self, query_id, owner=None, wait=0):
+        """Result of a submitted query, waiting up to `wait` seconds for it.
+
+        Returns {'query_id', 'status': 'running', 'elapsed'} while it runs,
+        then the result of _execute plus 'query_id' and 'sql'. None if the
+        id is unknown, expired or belongs to another owner.
+        """
+        with self._lock:
+            query = self._queries.get(query_id)
+        if query is None or query['owner'] != owner:
+            return None
+        if wait:
+            query['done'].wait(wait)
+
+        if query['result'] is None:
+            return {
+                'query_id': query_id,
+                'status': 'running',
+                'elapsed': round(time.monotonic() - query['submitted'], 3)
+            }
+        return dict(query['result'], query_id=query_id, sql=query['sql'])
+
+    def cancel(self, query_id, owner=None):
+        """Cancel a running query; only its owner may cancel it. Returns True if found."""
+        with self._lock:
+            query = self._queries.get(query_id)
+            if query is None or query['owner'] != owner or query['result'] is not None:
+                return False
+            query['cancelled'].set()
+            return True
+
+    def _running(self):
+        """Queries queued or executing (lock held)"""
+        return sum(1 for query in self._queries.values() if query['result'] is None)
+
+    def _expire(self):
+        """Forget finished queries past RESULT_TTL, and the oldest beyond MAX_FINISHED_QUERIES (lock held)"""
+        now = time.monotonic()
+        finished = sorted(
+            (query['finished'], query_id) for query_id, query in self._queries.items()
+            if query['finished'] is not None
+        )
+        for i, (finished_at, query_id) in enumerate(finished):
+            if now - finished_at > RESULT_TTL or len(finished) - i > MAX_FINISHED_QUERIES:
+                del self._queries[query_id]
+
+    def _run(self, db_path, sql, query_id, query, on_done):
+        """Worker: execute, hand a successful result to on_done, then publish it"""
+        try:
+            result = self._execute(db_path, sql, query)
+        except Exception as e:
+            print(f"Query error: {e}")
+            result = {"error": str(e)}
+
+        if on_done is not None and 'error' not in result:
+            try:
+                on_done(result)
+            except Exception as e:
+                print(f"Error handling query result: {e}")
+
+        with self._lock:
+            query['result'] = result
+            query['finished'] = time.monotonic()
+            self._expire()
+        query['done'].set()
+
+    def plan_warnings(self, db_path, sql):
+        """Cost warnings (full scans of large tables) from the query plan, without running it"""
+        try:
+            conn = self._connect(db_path)
+        except sqlite3.Error as e:
+            print(f"Query plan error: {e}")
+            return []
+        try:
+            return full_scan_warnings(conn, sql)
+        finally:
+            conn.close()
+
+    def _connect(self, db_path):
+        """Open a read-only connection for one query"""
+        conn = sqlite3.connect(f"file:{quote(os.path.abspath(db_path))}?mode=ro", uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        conn.set_authorizer(_authorize)
+        return conn
+
+    def _execute(self, db_path, sql, query):
+        """Execute on a worker thread with the timeout/cancel progress handler installed"""
+        if query['cancelled'].is_set():
+            return {"error": "Query cancelled"}
+
+        start = time.monotonic()
+        deadline = start + self.timeout
+
+        def progress():
+            # A non-zero return makes SQLite interrupt the statement
+            return 1 if query['cancelled'].is_set() or time.monotonic() > deadline else 0
+
+        try:
+            conn = self._connect(db_path)
+        except sqlite3.Error as e:
+            return {"error": str(e)}
+
+        try:
+            conn.set_progress_handler(progress, PROGRESS_STEPS)
+            cursor = conn.execute(sql)
+            columns = [description[0] for description in cursor.description or []]
+            rows = cursor.fetchmany(self.max_rows + 1) if columns else []
+        except sqlite3.Error as e:
+            if query['cancelled'].is_set():
+                with self._lock:
+                    self.cancelled += 1
+                return {"error": "Query cancelled"}
+            if time.monotonic() > deadline:
+                with self._lock:
+                    self.timed_out += 1
+                return {"error": f"Query timed out after {self.timeout} seconds"}
+            print(f"Query error: {e}")
+            return {"error": str(e)}
+        finally:
+            conn.close()
+
+        with self._lock:
+            self.completed += 1
+        return {
+            'columns': columns,
+            'rows': rows[:self.max_rows],
+            'truncated': len(rows) > self.max_rows,
+            'max_rows': self.max_rows,
+            'elapsed': round(time.monotonic() - start, 3)
+        }
+
+    def stats(self):
+        """Return counters and the number of queries in flight"""
+        with self._lock:
+            return {
+                'running': self._running(),
+                'completed': self.completed,
+                'timed_out': self.timed_out,
+                'cancelled': self.cancelled,
+                'rejected': self.rejected,
+                'timeout': self.timeout,
+                'max_rows': self.max_rows
+            }
+
+
+# Runner shared by every DataProcessor in the process
+shared_query_runner = QueryRunner()
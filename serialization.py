@@ -0,0 +1,199 @@
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+
+from instrumentation import span, count
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Row layouts for DataFrames:
+#   records  [{"col": value, ...}, ...]          (what to_dict(orient='records') gave)
+#   split    {"columns": [...], "data": [[...], ...]}
+#   columns  {"col": [values...], ...}
+ORIENTS = ('records', 'split', 'columns')
+DEFAULT_ORIENT = 'records'
+
+# Significant digits pandas' encoder keeps for floats (its maximum; the default is 10)
+PANDAS_DOUBLE_PRECISION = 15
+
+# Responses smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/csv', 'text/plain')
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value):
+    """Serialize values the JSON encoders do not handle natively"""
+    if isinstance(value, bytes):
+        return value.hex()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps(obj):
+    """Encode an object as JSON bytes (orjson when installed)"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+    return json.dumps(obj, default=_default).encode('utf-8')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes jsonify() payloads with orjson when installed"""
+
+    def dumps(self, obj, **kwargs):
+        with span('serialize'):
+            if orjson is None:
+                body = super().dumps(obj, **kwargs)
+            else:
+                body = orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS).decode('utf-8')
+        count('bytes_serialized', len(body), source='json')
+        return body
+
+    def loads(self, s, **kwargs):
+        if orjson is None:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+def _column_values(series):
+    """A column as something the encoder takes in one call.
+
+    Plain numeric and bool columns stay NumPy arrays (orjson reads their
+    buffers directly), dates become ISO strings with None for NaT and other
+    columns become lists of the existing objects; NaN is written as null.
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        series = series.dt.tz_convert('UTC').dt.tz_localize(None)
+        dtype = series.dtype
+    if dtype.kind == 'M':
+        values = series.to_numpy()
+        strings = np.datetime_as_string(values, unit='s').astype(object)
+        strings[np.isnat(values)] = None
+        return strings.tolist()
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biuf':
+        return np.ascontiguousarray(series.to_numpy())
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype) and not isinstance(dtype, pd.CategoricalDtype):
+        # Nullable Int64/boolean/string columns
+        return series.to_numpy(dtype=object, na_value=None).tolist()
+    return series.to_numpy(dtype=object).tolist()
+
+
+def frame_to_json(df, orient=DEFAULT_ORIENT):
+    """Encode a DataFrame's rows as JSON bytes in one of ORIENTS (the index is not included)"""
+    if orient not in ORIENTS:
+        raise ValueError(f"Unsupported orient '{orient}' (use one of: {', '.join(ORIENTS)})")
+
+    with span('serialize'):
+        body = _frame_to_json(df, orient)
+    count('bytes_serialized', len(body), source='frame')
+    return body
+
+
+def _frame_to_json(df, orient):
+    columns = [str(col) for col in df.columns]
+    if orjson is None:
+        return _frame_to_json_pandas(df, columns, orient)
+
+    values = [_column_values(df.iloc[:, i]) for i in range(len(columns))]
+    if orient == 'columns':
+        return dumps(dict(zip(columns, values)))
+
+    if len(columns) and all(isinstance(v, np.ndarray) for v in values) and len({v.dtype for v in values}) == 1:
+        # Homogeneous numeric frame: orjson writes the 2-D array straight from its buffer
+        data = np.ascontiguousarray(np.column_stack(values))
+    else:
+        data = list(zip(*[v.tolist() if isinstance(v, np.ndarray) else v for v in values]))
+
+    if orient == 'split':
+        return dumps({'columns': columns, 'data': data})
+    if isinstance(data, np.ndarray):
+        data = data.tolist()
+    return dumps([dict(zip(columns, row)) for row in data])
+
+
+def _frame_to_json_pandas(df, columns, orient):
+    """frame_to_json without orjson, using pandas' C encoder"""
+    df = df.set_axis(columns, axis=1)
+    # Dates and nullable extension columns are converted the same way as for orjson
+    converted = [
+        col for col, dtype in zip(columns, df.dtypes)
+        if not isinstance(dtype, pd.CategoricalDtype) and not (isinstance(dtype, np.dtype) and dtype.kind in 'biufO')
+    ]
+    if converted:
+        df = df.assign(**{col: pd.Series(_column_values(df[col]), index=df.index, dtype=object) for col in converted})
+
+    if orient == 'columns':
+        parts = [
+            json.dumps(col) + ':' + df[col].to_json(orient='values', default_handler=str, double_precision=PANDAS_DOUBLE_PRECISION)
+            for col in df.columns
+        ]
+        return ('{' + ','.join(parts) + '}').encode('utf-8')
+    if orient == 'split':
+        return df.to_json(orient='split', index=False, default_handler=str, double_precision=PANDAS_DOUBLE_PRECISION).encode('utf-8')
+    return df.to_json(orient='records', default_handler=str, double_precision=PANDAS_DOUBLE_PRECISION).encode('utf-8')
+
+
+def json_response(payload, frame_key='rows', orient=DEFAULT_ORIENT, status=200):
+    """JSON response for a dict whose frame_key entry is a DataFrame.
+
+    The frame is encoded with frame_to_json and spliced into the rest of
+    the payload, so its rows never become Python dicts.
+    """
+    payload = dict(payload)
+    frame = payload.pop(frame_key)
+    rest = dumps(payload)
+    body = b'{' + dumps(frame_key) + b':' + frame_to_json(frame, orient)
+    body += (b',' + rest[1:]) if len(rest) > 2 else b'}'
+    return Response(body, status=status, mimetype='application/json')
+
+
+def compress_response(response, accept_encodings):
+    """Compress a response body with br or gzip when the client accepts it.
+
+    Streamed, small, already encoded and non-text responses are returned
+    unchanged. A strong ETag on a compressed response is made weak.
+    accept_encodings is request.accept_encodings.
+    """
+    if response.direct_passthrough or response.is_streamed or response.status_code != 200 \
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = accept_encodings.best_match(['br', 'gzip'] if brotli is not None else ['gzip'])
+    if encoding is None:
+        return response
+
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_BYTES:
+        return response
+    if encoding == 'br':
+        response.set_data(brotli.compress(body, quality=BROTLI_QUALITY))
+    else:
+        response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL))
+    response.headers['Content-Encoding'] = encoding
+    # A strong ETag must not be shared between encodings of a response
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from data_processor import DataProcessor
+
+
+class ProcessorRegistry:
+    """One DataProcessor per user session.
+
+    Each session gets its own db_path / current_table state, so concurrent
+    users no longer overwrite each other's loaded table. Loaded DataFrames
+    themselves live in the shared TableCache, so sessions looking at the same
+    table share one copy. Sessions idle for longer than idle_timeout seconds,
+    or beyond max_sessions, are dropped least-recently-used first.
+    """
+
+    def __init__(self, max_sessions=200, idle_timeout=3600, processor_factory=DataProcessor):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.processor_factory = processor_factory
+
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # session_id -> (DataProcessor, last_used)
+
+    def get(self, session_id, db_path=None):
+        """Return the processor for a session, creating it if needed.
+
+        db_path is the database the session was last connected to. It lets a
+        session that was evicted, or that lands on another worker process,
+        reconnect transparently.
+        """
+        now = time.monotonic()
+        expired = []
+
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            processor = entry[0] if entry else self.processor_factory()
+            self._sessions[session_id] = (processor, now)
+
+            # Drop idle sessions, then the least recently used beyond the limit
+            for sid, (other, last_used) in list(self._sessions.items()):
+                if now - last_used > self.idle_timeout or len(self._sessions) > self.max_sessions:
+                    del self._sessions[sid]
+                    expired.append(other)
+                else:
+                    break
+
+        for other in expired:
+            other.close()
+
+        if db_path and not processor.db_path and os.path.exists(db_path):
+            try:
+                processor.connect_to_database(db_path)
+            except ValueError as e:
+                print(f"Error restoring session database: {e}")
+
+        return processor
+
+    def remove(self, session_id):
+        """Forget a session and release its loaded table"""
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+        if entry:
+            entry[0].close()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
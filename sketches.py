@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+# HyperLogLog precision: 2**12 registers, ~1.6% standard error, 4 KiB per column
+HLL_PRECISION = 12
+
+# Number of counters kept for approximate top-k values
+TOP_K_CAPACITY = 100
+
+# Histograms are coarsened (bin width doubled) to stay within this many bins
+MAX_HISTOGRAM_BINS = 1000
+
+
+class HyperLogLog:
+    """HyperLogLog distinct-value sketch with vectorized updates.
+
+    Values are hashed with pandas.util.hash_array, which is stable across
+    processes, so a sketch saved to disk can keep absorbing new values
+    after a restart.
+    """
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.size = 1 << precision
+        if registers is None:
+            self.registers = np.zeros(self.size, dtype=np.uint8)
+        else:
+            self.registers = np.frombuffer(registers, dtype=np.uint8).copy()
+
+    def add(self, values):
+        """Add an array-like of values (NULLs are ignored)"""
+        values = pd.Series(values).dropna()
+        if values.empty:
+            return
+        hashes = pd.util.hash_array(values.astype(str).to_numpy(dtype=object))
+
+        # The top `precision` bits pick the register, the next 32 bits give the rank
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        remainder = ((hashes >> np.uint64(32 - self.precision)) & np.uint64(0xFFFFFFFF)).astype(np.float64)
+        rank = np.full(len(remainder), 33, dtype=np.uint8)
+        nonzero = remainder > 0
+        rank[nonzero] = (32 - np.floor(np.log2(remainder[nonzero]))).astype(np.uint8)
+
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        """Fold another sketch of the same precision into this one"""
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self):
+        """Estimated number of distinct values"""
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+
+        # Small-range correction (linear counting)
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self):
+        return self.registers.tobytes()
+
+
+def merge_top_counts(counts, new_counts, capacity=TOP_K_CAPACITY):
+    """Add new_counts into counts and keep the `capacity` largest (approximate top-k)"""
+    merged = dict(counts)
+    for value, count in new_counts.items():
+        merged[value] = merged.get(value, 0) + count
+    top = sorted(merged.items(), key=lambda item: item[1], reverse=True)[:capacity]
+    return dict(top)
+
+
+def histogram_add(histogram, values, max_bins=MAX_HISTOGRAM_BINS):
+    """Add numeric values to an equal-width histogram {'low', 'width', 'counts'}.
+
+    Bins are appended (or prepended) at the same width when values fall
+    outside the current range, so existing counts never need rebinning.
+    If that would exceed max_bins, the width is doubled (merging adjacent
+    bins) until the range fits.
+    """
+    values = pd.to_numeric(pd.Series(values), errors='coerce').dropna().to_numpy(dtype=float)
+    if not len(values):
+        return histogram
+
+    low = histogram['low']
+    width = histogram['width'] or 1
+    counts = list(histogram['counts'])
+    high = low + width * len(counts)
+
+    # Upper edge of the last bin is inclusive, hence the + 1 for values on it
+    while (max(high, values.max()) - min(low, values.min())) / width + 1 > max_bins:
+        if len(counts) % 2:
+            counts.append(0)
+        counts = [counts[i] + counts[i + 1] for i in range(0, len(counts), 2)]
+        width *= 2
+        high = low + width * len(counts)
+
+    bins = np.floor((values - low) / width).astype(np.int64)
+    if len(counts):
+        bins[(bins == len(counts)) & (values == high)] = len(counts) - 1
+
+    below = int(max(0, -bins.min()))
+    if below:
+        counts = [0] * below + counts
+        low -= below * width
+        bins += below
+    above = int(bins.max()) + 1 - len(counts)
+    if above > 0:
+        counts.extend([0] * above)
+
+    for index, count in zip(*np.unique(bins, return_counts=True)):
+        counts[index] += int(count)
+
+    return {'low': low, 'width': width, 'counts': counts}
+
+
+def histogram_quantile(histogram, q):
+    """Approximate quantile from a histogram by interpolating within the bin"""
+    counts = histogram['counts']
+    total = sum(counts)
+    if not total:
+        return None
+
+    target = q * total
+    cumulative = 0
+    for index, count in enumerate(counts):
+        if count and cumulative + count >= target:
+            fraction = (target - cumulative) / count
+            return histogram['low'] + histogram['width'] * (index + fraction)
+        cumulative += count
+    return histogram['low'] + histogram['width'] * len(counts)
@@ -0,0 +1,225 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from query_compiler import quote_identifier
+from table_cache import database_version
+from table_loader import is_date_type
+from instrumentation import cache_lookup
+
+# Number of categorical columns and top values reported (same as get_basic_stats)
+MAX_CATEGORICAL_COLUMNS = 5
+TOP_VALUES = 10
+
+# Rows sampled to decide whether a column is numeric or categorical
+TYPE_SAMPLE_ROWS = 1000
+
+# Tables above LARGE_TABLE_ROWS get medians and top values from a ~SAMPLE_ROWS random sample
+LARGE_TABLE_ROWS = 1_000_000
+SAMPLE_ROWS = 100_000
+
+
+def _numeric_only(quoted):
+    """SQL for a column's value where it is stored as a number, NULL otherwise.
+
+    Columns are classified from a sample, so a numeric column can still hold
+    text further down; those values are left out of its statistics.
+    """
+    return f"(CASE WHEN typeof({quoted}) IN ('integer', 'real') THEN {quoted} END)"
+
+
+def _rounded(value):
+    """Round a statistic the way get_basic_stats does ('N/A' for missing)"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return 'N/A'
+    return round(value, 2)
+
+
+class StatsEngine:
+    """Compute get_basic_stats for a table in SQLite instead of over a DataFrame.
+
+    COUNT/MIN/MAX/AVG for every numeric column and COUNT(DISTINCT) for the
+    categorical ones come from a single aggregate query. Medians and top
+    values need one more query per column: exact on ordinary tables, and
+    estimated from a random sample (flagged 'approximate') on tables with
+    more than LARGE_TABLE_ROWS rows. Results are cached per
+    (db_path, table, database_version).
+    """
+
+    def __init__(self, pool, max_cached=64):
+        self.pool = pool
+        self.max_cached = max_cached
+
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # (db_path, table, version) -> stats
+
+        self.hits = 0
+        self.misses = 0
+
+    def column_kinds(self, conn, table_name):
+        """Classify columns as 'numeric' or 'categorical' from the storage classes of a sample.
+
+        Mirrors how pandas types columns read from SQLite: a column holding only
+        integers/reals is numeric; anything else (text, blobs, all NULL) is object.
+        """
+        table = quote_identifier(table_name)
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+        if not columns:
+            return {}
+
+        counts = ', '.join(
+            f"SUM(typeof({quote_identifier(col)}) IN ('integer', 'real')), "
+            f"SUM(typeof({quote_identifier(col)}) IN ('text', 'blob'))"
+            for col in columns
+        )
+        row = conn.execute(
+            f"SELECT {counts} FROM (SELECT * FROM {table} LIMIT {TYPE_SAMPLE_ROWS})"
+        ).fetchone()
+
+        kinds = {}
+        for i, col in enumerate(columns):
+            numeric, other = row[2 * i] or 0, row[2 * i + 1] or 0
+            kinds[col] = 'numeric' if numeric and not other else 'categorical'
+        return kinds
+
+    def chart_kinds(self, conn, table_name):
+        """Classify columns as 'numeric', 'categorical' or 'date' for chart suggestions.
+
+        Builds on column_kinds: a column declared as a date (DATE, DATETIME,
+        TIMESTAMP...) is a 'date' only if it is not numeric and every sampled
+        value is text SQLite can parse as a date, the same values the chart
+        engine buckets with strftime. Numeric or unparseable date columns keep
+        their column_kinds kind.
+        """
+        table = quote_identifier(table_name)
+        declared = {row[1]: row[2] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+        kinds = self.column_kinds(conn, table_name)
+
+        candidates = [col for col, kind in kinds.items() if kind == 'categorical' and is_date_type(declared[col])]
+        if candidates:
+            checks = ', '.join(
+                f"SUM({quote_identifier(col)} IS NOT NULL AND "
+                f"(typeof({quote_identifier(col)}) != 'text' OR julianday({quote_identifier(col)}) IS NULL)), "
+                f"COUNT({quote_identifier(col)})"
+                for col in candidates
+            )
+            row = conn.execute(
+                f"SELECT {checks} FROM (SELECT * FROM {table} LIMIT {TYPE_SAMPLE_ROWS})"
+            ).fetchone()
+            for i, col in enumerate(candidates):
+                unparsed, non_null = row[2 * i] or 0, row[2 * i + 1] or 0
+                if non_null and not unparsed:
+                    kinds[col] = 'date'
+        return kinds
+
+    def table_stats(self, db_path, table_name):
+        """Return stats for a table in the same shape as DataProcessor.get_basic_stats"""
+        key = (os.path.abspath(db_path), table_name, database_version(db_path))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                cache_lookup('stats', True)
+                return self._cache[key]
+            self.misses += 1
+            cache_lookup('stats', False)
+
+        stats = self._compute(db_path, table_name)
+
+        with self._lock:
+            self._cache[key] = stats
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+        return stats
+
+    def _compute(self, db_path, table_name):
+        table = quote_identifier(table_name)
+
+        with self.pool.connection(db_path) as conn:
+            kinds = self.column_kinds(conn, table_name)
+            numeric_cols = [col for col, kind in kinds.items() if kind == 'numeric']
+            categorical_cols = [col for col, kind in kinds.items() if kind == 'categorical'][:MAX_CATEGORICAL_COLUMNS]
+
+            # One pass for every count/min/max/avg/distinct
+            aggregates = ['COUNT(*)']
+            for col in numeric_cols:
+                value = _numeric_only(quote_identifier(col))
+                aggregates.extend([f"COUNT({value})", f"MIN({value})", f"MAX({value})", f"AVG({value})"])
+            for col in categorical_cols:
+                aggregates.append(f"COUNT(DISTINCT {quote_identifier(col)})")
+            row = conn.execute(f"SELECT {', '.join(aggregates)} FROM {table}").fetchone()
+
+            total = row[0]
+            approximate = total > LARGE_TABLE_ROWS
+            # Bernoulli sample of roughly SAMPLE_ROWS rows for large tables
+            sample_every = max(1, total // SAMPLE_ROWS) if approximate else 1
+            sample_filter = f"abs(random()) % {sample_every} = 0" if approximate else "1"
+
+            stats = {
+                'total_records': total,
+                'columns': {}
+            }
+
+            position = 1
+            for col in numeric_cols:
+                count, minimum, maximum, mean = row[position:position + 4]
+                position += 4
+                stats['columns'][col] = {
+                    'mean': _rounded(mean),
+                    'median': _rounded(self._median(conn, table, col, count, sample_filter, approximate)),
+                    'min': _rounded(minimum),
+                    'max': _rounded(maximum)
+                }
+                if approximate:
+                    stats['columns'][col]['approximate'] = True
+
+            for col in categorical_cols:
+                unique_values = row[position]
+                position += 1
+                quoted = quote_identifier(col)
+                top = conn.execute(
+                    f"SELECT {quoted}, COUNT(*) AS n FROM {table} WHERE {quoted} IS NOT NULL AND {sample_filter} "
+                    f"GROUP BY {quoted} ORDER BY n DESC, {quoted} LIMIT {TOP_VALUES}"
+                ).fetchall()
+                stats['columns'][col] = {
+                    'type': 'categorical',
+                    'unique_values': unique_values,
+                    # Sampled counts are scaled back up to the full table
+                    'top_values': {value: count * sample_every for value, count in top}
+                }
+                if approximate:
+                    stats['columns'][col]['approximate'] = True
+
+        return stats
+
+    def _median(self, conn, table, column, count, sample_filter, approximate):
+        """Exact median via ORDER BY/OFFSET, or the median of a random sample on large tables.
+
+        Only values stored as numbers count; count is how many there are.
+        """
+        quoted = quote_identifier(column)
+        numeric = f"typeof({quoted}) IN ('integer', 'real')"
+        if not count:
+            return None
+
+        if approximate:
+            values = np.array([
+                value for (value,) in conn.execute(
+                    f"SELECT {quoted} FROM {table} WHERE {numeric} AND {sample_filter}"
+                )
+            ], dtype=float)
+            return float(np.median(values)) if len(values) else None
+
+        # Middle value, or the two middle values for an even count
+        middle = conn.execute(
+            f"SELECT {quoted} FROM {table} WHERE {numeric} ORDER BY {quoted} LIMIT ? OFFSET ?",
+            (2 - count % 2, (count - 1) // 2)
+        ).fetchall()
+        return sum(value for (value,) in middle) / len(middle)
+
+    def stats(self):
+        """Return cache counters"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._cache)}
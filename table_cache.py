@@ -0,0 +1,171 @@
+import os
+import threading
+from collections import OrderedDict
+
+from instrumentation import cache_lookup
+
+
+def database_version(db_path):
+    """Return a signature that changes whenever the database file is modified.
+
+    Built from the mtime and size of the database file and of its WAL file
+    (if any). PRAGMA data_version cannot be used here: its value is only
+    comparable within a single connection, and pooled connections come and go.
+    """
+    signature = []
+    for path in (db_path, db_path + '-wal'):
+        try:
+            stat = os.stat(path)
+            signature.extend((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.extend((None, None))
+    return tuple(signature)
+
+
+class TableCache:
+    """Loaded table DataFrames shared between sessions, keyed by (db_path, table).
+
+    Every DataProcessor that has a table loaded holds a reference to its entry,
+    so two sessions viewing the same table share a single DataFrame. Cached
+    frames are treated as immutable; callers copy before modifying.
+
+    An entry is invalidated when database_version() of its file changes, so
+    a repeat view of an unchanged table costs no I/O. Unreferenced entries
+    are evicted least-recently-used first once the cache holds more than
+    max_entries tables or more than max_bytes of DataFrame memory.
+    """
+
+    def __init__(self, max_entries=8, max_bytes=512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (db_path, table, columns) -> {'df', 'refs', 'bytes', 'version'}
+        self._load_locks = {}          # (db_path, table, columns) -> Lock, so a table is only read once
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(db_path, table_name, columns=None):
+        return (os.path.abspath(db_path), table_name, tuple(columns) if columns else None)
+
+    def _lookup(self, key, version):
+        """Return a fresh entry for key (taking a reference), dropping it if stale (lock held)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry['version'] != version:
+            self._remove(key)
+            self.invalidations += 1
+            return None
+        entry['refs'] += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry['bytes']
+
+    def acquire(self, db_path, table_name, loader, columns=None):
+        """Return the DataFrame for a table, calling loader() on a miss, and take a reference.
+
+        A load of only some columns is cached separately from the full table.
+        """
+        key = self._key(db_path, table_name, columns)
+        version = database_version(key[0])
+
+        with self._lock:
+            entry = self._lookup(key, version)
+            if entry is not None:
+                self.hits += 1
+                cache_lookup('table', True)
+                return entry['df']
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # Another thread may have finished loading while we waited
+            with self._lock:
+                entry = self._lookup(key, version)
+                if entry is not None:
+                    self.hits += 1
+                    cache_lookup('table', True)
+                    return entry['df']
+                self.misses += 1
+                cache_lookup('table', False)
+
+            try:
+                df = loader()
+                size = int(df.memory_usage(deep=True).sum())
+
+                with self._lock:
+                    if key in self._entries:
+                        self._remove(key)
+                    self._entries[key] = {'df': df, 'refs': 1, 'bytes': size, 'version': version}
+                    self._bytes += size
+                    self._evict()
+            finally:
+                # Also when the load failed, so failed keys don't pile up
+                with self._lock:
+                    if self._load_locks.get(key) is load_lock:
+                        del self._load_locks[key]
+            return df
+
+    def release(self, db_path, table_name, df, columns=None):
+        """Drop a reference taken by acquire (no-op if the entry has since been replaced)"""
+        key = self._key(db_path, table_name, columns)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['df'] is df and entry['refs'] > 0:
+                entry['refs'] -= 1
+            self._evict()
+
+    def _evict(self):
+        """Evict unreferenced entries, oldest first, until within both limits (lock held)"""
+        for key in [key for key, entry in self._entries.items() if entry['refs'] == 0]:
+            if len(self._entries) <= self.max_entries and self._bytes <= self.max_bytes:
+                break
+            self._remove(key)
+            self.evictions += 1
+
+    def clear(self, db_path=None):
+        """Forget cached tables (for one database or all)"""
+        with self._lock:
+            if db_path is not None:
+                db_path = os.path.abspath(db_path)
+            for key in [key for key in self._entries if db_path is None or key[0] == db_path]:
+                self._remove(key)
+
+    def stats(self):
+        """Return hit/miss/eviction counters and cache occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'tables': [
+                    {
+                        'db_path': key[0],
+                        'table': key[1],
+                        'columns': list(key[2]) if key[2] else None,
+                        'rows': len(entry['df']),
+                        'refs': entry['refs'],
+                        'bytes': entry['bytes']
+                    }
+                    for key, entry in self._entries.items()
+                ]
+            }
+
+
+# Cache shared by every DataProcessor in the process
+shared_table_cache = TableCache()
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from query_compiler import quote_identifier
+
+# Rows read per chunk; each chunk is compacted before the next one is read
+LOAD_CHUNK_ROWS = 50000
+
+# Text columns with at most this ratio of distinct values to rows become 'category'
+CATEGORY_MAX_RATIO = 0.5
+
+# Declared column types parsed as datetimes (SQLite has no date storage class)
+DATE_TYPE_NAMES = ('DATE', 'TIME')
+
+
+def is_date_type(declared_type):
+    """True for declared types such as DATE, DATETIME or TIMESTAMP"""
+    declared_type = (declared_type or '').upper()
+    return any(name in declared_type for name in DATE_TYPE_NAMES)
+
+
+def compact_chunk(chunk, skip=()):
+    """Shrink a chunk's dtypes: downcast numerics and turn text into 'category'.
+
+    Floats are only narrowed to float32 when no value changes. Columns in
+    skip (date columns, parsed later) are left as they are.
+    """
+    for col in chunk.columns:
+        if col in skip:
+            continue
+        series = chunk[col]
+        if pd.api.types.is_integer_dtype(series):
+            chunk[col] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series):
+            narrowed = series.astype(np.float32)
+            if ((narrowed == series) | series.isna()).all():
+                chunk[col] = narrowed
+        elif series.dtype == object:
+            values = series.dropna()
+            if len(values) and values.map(type).eq(str).all():
+                chunk[col] = series.astype('category')
+    return chunk
+
+
+def combine_chunks(chunks):
+    """Concatenate compacted chunks, merging the categories of 'category' columns.
+
+    A chunk where a column is entirely NULL (read as object) takes the dtype
+    of the other chunks, so the result doesn't depend on where chunks split.
+    """
+    if len(chunks) == 1:
+        df = chunks[0]
+    else:
+        columns = {}
+        for col in chunks[0].columns:
+            parts = [chunk[col] for chunk in chunks]
+            typed = [part for part in parts if not (part.dtype == object and part.isna().all())]
+            if typed and all(isinstance(part.dtype, pd.CategoricalDtype) for part in typed):
+                parts = [part if part.dtype != object else part.astype('category') for part in parts]
+                columns[col] = pd.Series(union_categoricals(parts), name=col)
+            elif typed and all(pd.api.types.is_numeric_dtype(part) for part in typed):
+                # NULLs among numbers read as float NaN, as in a single read
+                columns[col] = pd.concat(
+                    [part if part.dtype != object else part.astype(np.float64) for part in parts],
+                    ignore_index=True
+                )
+            else:
+                # Mixed dtypes fall back to a common one (e.g. category + object -> object)
+                columns[col] = pd.concat(
+                    [part.astype(object) if isinstance(part.dtype, pd.CategoricalDtype) else part for part in parts],
+                    ignore_index=True
+                )
+        df = pd.DataFrame(columns)
+
+    # Mostly-unique text saves nothing as a category
+    for col in df.select_dtypes(include=['category']).columns:
+        if len(df) and len(df[col].cat.categories) > CATEGORY_MAX_RATIO * len(df):
+            df[col] = df[col].astype(object)
+    return df
+
+
+def parse_dates(df, date_columns):
+    """Parse declared date columns, keeping a column as is if any value fails to parse"""
+    for col in date_columns:
+        if col not in df.columns or pd.api.types.is_numeric_dtype(df[col]):
+            continue
+        parsed = pd.to_datetime(df[col], errors='coerce')
+        if parsed.notna().sum() == df[col].notna().sum():
+            df[col] = parsed
+    return df
+
+
+def read_table(conn, table_name, columns=None, chunk_rows=LOAD_CHUNK_ROWS, parse_date_columns=True):
+    """Read a table (or only `columns` of it) into a dtype-compact DataFrame.
+
+    Rows are read chunk by chunk and each chunk is compacted as it arrives,
+    so the full-width object frame is never materialized. With
+    parse_date_columns=False declared date columns are kept as stored.
+    """
+    table = quote_identifier(table_name)
+    declared = {row[1]: row[2] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+    if not declared:
+        raise ValueError(f"Unknown table: {table_name}")
+
+    if columns:
+        unknown = [col for col in columns if col not in declared]
+        if unknown:
+            raise ValueError(f"Unknown column: {unknown[0]}")
+    else:
+        columns = list(declared)
+
+    date_columns = [col for col in columns if is_date_type(declared[col])]
+    query = f"SELECT {', '.join(quote_identifier(col) for col in columns)} FROM {table}"
+
+    chunks = [
+        compact_chunk(chunk, skip=date_columns)
+        for chunk in pd.read_sql_query(query, conn, chunksize=chunk_rows)
+    ]
+    if not chunks:
+        return pd.read_sql_query(f"{query} LIMIT 0", conn)
+
+    df = combine_chunks(chunks)
+    return parse_dates(df, date_columns) if parse_date_columns else df
+
+
+def memory_footprint(df):
+    """Deep memory usage of a DataFrame: total bytes and bytes/dtype per column"""
+    usage = df.memory_usage(deep=True, index=False)
+    return {
+        'rows': len(df),
+        'bytes': int(usage.sum()),
+        'columns': {
+            col: {'dtype': str(df[col].dtype), 'bytes': int(usage[col])}
+            for col in df.columns
+        }
+    }
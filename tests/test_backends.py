@@ -0,0 +1,95 @@
+import math
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from backends import SQLiteBackend, DuckDBBackend, duckdb
+from connection_pool import ConnectionPool
+from data_processor import DataProcessor
+from stats_engine import StatsEngine
+from table_cache import TableCache
+
+pytestmark = pytest.mark.skipif(duckdb is None, reason="duckdb not installed")
+
+CATEGORIES = ['red', 'green', 'blue', 'cyan']
+
+
+@pytest.fixture(scope='module')
+def db_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('backends') / 'parity.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, cat TEXT, v REAL, n INTEGER, d DATE)")
+    conn.executemany("INSERT INTO t VALUES (?, ?, ?, ?, ?)", [
+        (
+            i,
+            None if i % 17 == 0 else CATEGORIES[i % len(CATEGORIES)],
+            None if i % 11 == 0 else (i * 7919 % 1000) / 10,
+            i % 5,
+            f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}"
+        )
+        for i in range(1, 501)
+    ])
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture(scope='module')
+def backends():
+    pool = ConnectionPool()
+    sqlite_backend = SQLiteBackend(pool, StatsEngine(pool))
+    duckdb_backend = DuckDBBackend(pool)
+    yield sqlite_backend, duckdb_backend
+    duckdb_backend.close()
+    pool.close_all()
+
+
+def close(a, b):
+    if isinstance(a, float) or isinstance(b, float):
+        return a == b or (a is not None and b is not None and math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9))
+    if isinstance(a, dict):
+        return isinstance(b, dict) and a.keys() == b.keys() and all(close(a[k], b[k]) for k in a)
+    if isinstance(a, (list, tuple)):
+        return len(a) == len(b) and all(close(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+@pytest.mark.parametrize('method, args', [
+    ('category_counts', ('cat',)),
+    ('category_sums', ('cat', 'v')),
+    ('histogram', ('v',)),
+    ('box_summary', ('cat', 'v')),
+    ('time_series', ('d', 'v')),
+])
+def test_chart_series_match(backends, db_path, method, args):
+    sqlite_backend, duckdb_backend = backends
+    expected = getattr(sqlite_backend.chart_engine, method)(db_path, 't', *args)
+    actual = getattr(duckdb_backend.chart_engine, method)(db_path, 't', *args)
+    assert close(expected, actual), (expected, actual)
+
+
+def test_table_stats_match(backends, db_path):
+    sqlite_backend, duckdb_backend = backends
+    expected = sqlite_backend.stats_engine.table_stats(db_path, 't')
+    actual = duckdb_backend.stats_engine.table_stats(db_path, 't')
+    assert close(expected, actual), (expected, actual)
+
+
+@pytest.mark.parametrize('filter_params', [
+    {'cat': ['red', 'blue']},
+    {'v': {'min': 10, 'max': 50}},
+    {'cat': 'green', 'n': {'min': 2}},
+    {'n': {'max': -1}},
+])
+def test_filter_rows_match(backends, db_path, filter_params):
+    sqlite_backend, duckdb_backend = backends
+    pool = ConnectionPool()
+    column_info = DataProcessor(db_path, pool=pool, table_cache=TableCache()).get_column_info('t')
+    pool.close_all()
+
+    expected = sqlite_backend.filter_rows(db_path, 't', filter_params, column_info)
+    actual = duckdb_backend.filter_rows(db_path, 't', filter_params, column_info)
+    actual = actual.sort_values('id').reset_index(drop=True)
+    assert list(actual.dtypes) == list(expected.dtypes)
+    pd.testing.assert_frame_equal(actual, expected)
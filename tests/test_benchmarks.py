@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+# The benchmark scripts import their helpers as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+import run  # noqa: E402
+from datasets import build_dataset  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory):
+    db_path = build_dataset('10k', str(tmp_path_factory.mktemp('bench')))
+    client = run.connect_client(db_path, warmup_timeout=60)
+    assert client is not None
+    return client, db_path
+
+
+def test_every_benchmark_route_answers_200(client):
+    client, db_path = client
+    requests = run.route_requests(client, db_path)
+    assert any(name.startswith('GET /api/chart/time_') for name in requests)
+    statuses = {name: run.check_route(request) for name, request in requests.items()}
+    assert statuses == {name: 200 for name in requests}
+
+
+def test_custom_query_waits_for_results(client):
+    client, _ = client
+    response = run.post_custom_query(client, "SELECT 42 AS answer")
+    assert response.status_code == 200
+    assert b'42' in response.data
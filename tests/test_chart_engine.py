@@ -0,0 +1,93 @@
+import json
+import sqlite3
+
+import numpy as np
+import pytest
+
+from chart_engine import ChartEngine
+from connection_pool import ConnectionPool
+from downsampling import lttb
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    db_path = str(tmp_path / 'daily.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE daily (day TEXT, value REAL)")
+    conn.executemany(
+        "INSERT INTO daily VALUES (date('2023-01-01', ?), ?)",
+        [(f"+{i} days", float(i % 17)) for i in range(1000)]
+    )
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+@pytest.fixture
+def engine():
+    pool = ConnectionPool()
+    yield ChartEngine(pool)
+    pool.close_all()
+
+
+def test_lttb_keeps_ends_and_peaks():
+    y = [0.0] * 100
+    y[42] = 10.0
+    keep = lttb(range(100), y, 10)
+    assert len(keep) == 10
+    assert keep[0] == 0 and keep[-1] == 99
+    assert 42 in keep
+
+
+def test_line_over_budget_is_downsampled_with_lttb(db_path, engine):
+    config = {'type': 'line', 'x_col': 'day', 'y_col': 'value', 'title': 'Value', 'point_budget': 200}
+    series = engine.chart_series(db_path, 'daily', config)
+    assert series['bucket_format'] == '%Y-%m-%d'
+    assert len(series['buckets']) == 1000
+
+    figure = json.loads(engine.render_chart(config, series))
+    assert figure['layout']['meta']['sampling'] == {'method': 'lttb', 'rows': 1000, 'points': 200}
+    assert len(figure['data'][0]['x']) == 200
+
+
+def test_line_within_budget_is_not_sampled(db_path, engine):
+    config = {'type': 'line', 'x_col': 'day', 'y_col': 'value', 'title': 'Value'}
+    figure = json.loads(engine.build_chart(db_path, 'daily', config))
+    assert 'meta' not in figure['layout']
+    assert len(figure['data'][0]['x']) == 1000
+
+
+def test_lttb_skips_gaps():
+    y = np.array([float(i % 5) for i in range(100)])
+    y[:30] = np.nan
+    y[60:63] = np.nan
+    keep = lttb(range(100), y, 20)
+    assert len(keep) == 20
+    assert keep[0] == 0 and keep[-1] == 99
+
+    # Every bucket with a y value keeps one of those points; all-gap buckets keep their first index
+    edges = np.linspace(1, 99, 19).astype(np.int64)
+    for i, index in enumerate(keep[1:-1]):
+        start, end = edges[i], edges[i + 1]
+        assert start <= index < end
+        if not np.isnan(y[start:end]).all():
+            assert not np.isnan(y[index])
+        else:
+            assert index == start
+
+
+def test_line_with_null_buckets_over_budget(tmp_path, engine):
+    db_path = str(tmp_path / 'gaps.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE daily (day TEXT, value REAL)")
+    conn.executemany(
+        "INSERT INTO daily VALUES (date('2023-01-01', ?), ?)",
+        [(f"+{i} days", None if i < 40 or i % 7 == 0 else float(i % 17)) for i in range(1000)]
+    )
+    conn.commit()
+    conn.close()
+
+    config = {'type': 'line', 'x_col': 'day', 'y_col': 'value', 'title': 'Value', 'point_budget': 200}
+    figure = json.loads(engine.build_chart(db_path, 'daily', config))
+    assert figure['layout']['meta']['sampling']['points'] == 200
+    assert sum(value is not None for value in figure['data'][0]['y']) > 150
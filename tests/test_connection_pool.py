@@ -0,0 +1,71 @@
+import sqlite3
+
+import pytest
+
+import connection_pool
+from connection_pool import ConnectionPool
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'pool.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (x)")
+    conn.close()
+    return path
+
+
+def test_connections_are_reused(db_path):
+    pool = ConnectionPool()
+    with pool.connection(db_path) as first:
+        pass
+    with pool.connection(db_path) as second:
+        assert second is first
+    assert pool.stats()['hits'] == 1 and pool.stats()['opened'] == 1
+
+
+def test_connections_are_read_only(db_path):
+    pool = ConnectionPool()
+    with pool.connection(db_path) as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("INSERT INTO t VALUES (1)")
+
+
+def test_idle_limit(db_path):
+    pool = ConnectionPool(max_idle_per_db=1)
+    a = pool.acquire(db_path)
+    b = pool.acquire(db_path)
+    pool.release(a)
+    pool.release(b)
+    assert pool.stats()['idle'] == {pool._key(db_path): 1}
+    assert pool.stats()['closed'] == 1
+
+
+def test_close_all_retires_checked_out(db_path):
+    pool = ConnectionPool()
+    conn = pool.acquire(db_path)
+    pool.close_all(db_path)
+    pool.release(conn)
+    assert pool.stats()['idle'] == {}
+
+
+def test_release_reaps_idle_connections(db_path, tmp_path, monkeypatch):
+    other_path = str(tmp_path / 'other.db')
+    sqlite3.connect(other_path).close()
+    monkeypatch.setattr(connection_pool, 'REAP_INTERVAL', 0)
+    pool = ConnectionPool(idle_timeout=0)
+
+    with pool.connection(db_path):
+        pass
+    # Releasing a connection to another database sweeps the stale one
+    with pool.connection(other_path):
+        pass
+    assert pool._key(db_path) not in pool.stats()['idle']
+
+
+def test_stats_have_no_side_effects(db_path):
+    pool = ConnectionPool(idle_timeout=0)
+    with pool.connection(db_path):
+        pass
+    pool.stats()
+    assert pool.stats()['closed'] == 0
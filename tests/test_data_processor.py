@@ -0,0 +1,159 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from connection_pool import ConnectionPool
+from data_processor import DataProcessor, encode_cursor, decode_cursor
+from table_cache import TableCache
+
+
+@pytest.fixture
+def processor(tmp_path):
+    db_path = str(tmp_path / 'pages.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.execute("CREATE TABLE plain (name TEXT)")
+    conn.executemany("INSERT INTO items VALUES (?, ?)", [(i, f"item {i}") for i in range(1, 26)])
+    conn.executemany("INSERT INTO plain VALUES (?)", [(f"row {i}",) for i in range(7)])
+    conn.commit()
+    conn.close()
+
+    pool = ConnectionPool()
+    processor = DataProcessor(pool=pool, table_cache=TableCache())
+    processor.connect_to_database(db_path)
+    yield processor
+    pool.close_all()
+
+
+def test_cursor_round_trip():
+    for value in (1, 2.5, 'abc', None):
+        assert decode_cursor(encode_cursor(value)) == value
+
+
+@pytest.mark.parametrize('cursor', ['not base64!', encode_cursor([1]), encode_cursor({'a': 1}), encode_cursor(True)])
+def test_invalid_cursor_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_keyset_pages_cover_table(processor):
+    page = processor.get_page('items', limit=10)
+    assert page['total'] == 25
+    ids = [row['id'] for row in page['rows']]
+    while page['next_cursor']:
+        page = processor.get_page('items', limit=10, cursor=page['next_cursor'])
+        assert page['total'] is None
+        ids.extend(row['id'] for row in page['rows'])
+    assert ids == list(range(1, 26))
+
+
+def test_rowid_cursor_hides_rowid(processor):
+    page = processor.get_page('plain', limit=5)
+    assert list(page['rows'][0]) == ['name']
+    rest = processor.get_page('plain', limit=5, cursor=page['next_cursor'])
+    assert [row['name'] for row in rest['rows']] == ['row 5', 'row 6']
+    assert rest['next_cursor'] is None
+
+
+def test_offset_paging(processor):
+    page = processor.get_page('items', limit=10, offset=20)
+    assert [row['id'] for row in page['rows']] == list(range(21, 26))
+    assert page['next_offset'] is None
+
+
+def test_bad_cursor_and_table(processor):
+    with pytest.raises(ValueError):
+        processor.get_page('items', cursor=encode_cursor([1]))
+    with pytest.raises(ValueError):
+        processor.get_page('missing')
+
+
+def test_page_total_reuses_row_count(processor):
+    statements = []
+    with processor.pool.connection(processor.db_path) as conn:
+        conn.set_trace_callback(statements.append)
+    try:
+        assert processor.get_page('items', limit=5)['total'] == 25
+        assert processor.get_table_row_counts()['items'] == 25
+        assert processor.get_page('items', limit=5)['total'] == 25
+        assert sum('COUNT(*)' in sql for sql in statements) == 1
+
+        conn = sqlite3.connect(processor.db_path)
+        conn.execute("INSERT INTO items VALUES (26, 'item 26')")
+        conn.commit()
+        conn.close()
+        assert processor.get_page('items', limit=5)['total'] == 26
+    finally:
+        with processor.pool.connection(processor.db_path) as conn:
+            conn.set_trace_callback(None)
+
+
+def test_query_finishing_after_a_write_is_not_cached_as_fresh(processor, monkeypatch):
+    submitted = {}
+
+    def submit(db_path, sql, query_id=None, owner=None, on_done=None):
+        submitted['on_done'] = on_done
+        return 'q1'
+    monkeypatch.setattr(processor.query_runner, 'submit', submit)
+    query = "SELECT name FROM plain"
+    assert processor.start_custom_query(query)['status'] == 'running'
+
+    conn = sqlite3.connect(processor.db_path)
+    conn.execute("INSERT INTO plain VALUES ('late row')")
+    conn.commit()
+    conn.close()
+
+    submitted['on_done']({'columns': ['name'], 'rows': [['row 0']], 'truncated': False})
+    assert processor.query_cache.get(processor.db_path, query, processor.query_runner.max_rows) is None
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_dashboard_charts_in_suggestion_order(processor, workers):
+    assert processor.load_table_data('items')
+    charts = processor.generate_dashboard_charts(workers=workers)
+    assert list(charts) == list(processor.detect_chart_types())
+    assert all(chart['json'] for chart in charts.values())
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_failed_chart_gets_placeholder(processor, monkeypatch, workers):
+    assert processor.load_table_data('items')
+    create_chart = processor.create_chart
+
+    def failing(config, raise_errors=False):
+        if config['type'] == 'histogram':
+            raise RuntimeError("boom")
+        return create_chart(config, raise_errors=raise_errors)
+    monkeypatch.setattr(processor, 'create_chart', failing)
+
+    charts = processor.generate_dashboard_charts(workers=workers)
+    assert charts['hist_id'] == {'config': charts['hist_id']['config'], 'json': None, 'error': 'Chart failed: boom'}
+    assert charts['bar_name']['json']
+
+
+def test_slow_chart_times_out_without_holding_up_the_rest(processor, monkeypatch):
+    assert processor.load_table_data('items')
+    create_chart = processor.create_chart
+    release = threading.Event()
+    lock_free = []
+
+    def slow(config, raise_errors=False):
+        # The caller holds the processor lock while charts are built
+        lock_free.append(processor.lock.acquire(blocking=False))
+        if config['type'] == 'histogram':
+            release.wait(5)
+        return create_chart(config, raise_errors=raise_errors)
+    monkeypatch.setattr(processor, 'create_chart', slow)
+
+    started = time.monotonic()
+    try:
+        charts = processor.generate_dashboard_charts(workers=2, timeout=0.3)
+    finally:
+        release.set()
+    assert time.monotonic() - started < 2
+    assert charts['hist_id']['json'] is None
+    assert charts['hist_id']['error'] == 'Chart timed out after 0.3s'
+    assert charts['bar_name']['json']
+    assert lock_free and not any(lock_free)
@@ -0,0 +1,80 @@
+import sqlite3
+
+import pytest
+
+import live_dashboard
+from chart_engine import ChartEngine
+from connection_pool import ConnectionPool
+from live_dashboard import LiveTable, merge_counts, merge_histogram
+
+CHARTS = {
+    'bar_cat': {'type': 'bar', 'x_col': 'cat', 'title': 'cat'},
+    'hist_v': {'type': 'histogram', 'x_col': 'v', 'title': 'v'},
+    'time_d_v': {'type': 'line', 'x_col': 'd', 'y_col': 'v', 'title': 'v over d'},
+}
+
+
+def append(db_path, start, n):
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO t (cat, v, d) VALUES (?, ?, ?)",
+        [(f"c{i % 7}", float(i % 100), f"2024-01-{1 + i % 28:02d}") for i in range(start, start + n)]
+    )
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def live(tmp_path):
+    db_path = str(tmp_path / 'live.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE t (cat TEXT, v REAL, d DATETIME)")
+    conn.close()
+    pool = ConnectionPool()
+    yield LiveTable(pool, ChartEngine(pool), db_path, 't', CHARTS)
+    pool.close_all()
+
+
+def test_merge_counts_folds_overflow_into_other(monkeypatch):
+    monkeypatch.setattr(live_dashboard, 'MAX_CATEGORIES', 2)
+    import pandas as pd
+    series = {'labels': ['a', 'b'], 'counts': [5, 3], 'other': 1}
+    merged = merge_counts(series, pd.Series(['c', 'c', 'c', 'c', 'a', None]))
+    assert merged == {'labels': ['a', 'c'], 'counts': [6, 4], 'other': 4}
+
+
+def test_merge_histogram_keeps_total():
+    import pandas as pd
+    series = {'edges': [0.0, 1.0, 2.0], 'counts': [2, 3]}
+    merged = merge_histogram(series, pd.Series([0.5, 1.5, 10.0, 'x']))
+    assert sum(merged['counts']) == 8
+    assert merged['edges'][0] <= 0.0 and merged['edges'][-1] >= 10.0
+
+
+def test_appending_more_than_a_batch_to_empty_table(live, monkeypatch):
+    monkeypatch.setattr(live_dashboard, 'LIVE_BATCH_SIZE', 1000)
+    assert live.poll()
+    assert live.row_count == 0
+
+    append(live.db_path, 0, 3500)
+    assert live.poll()
+    assert live.row_count == 3500
+    assert sum(live._series['hist_v']['counts']) == 3500
+    assert sum(live._series['bar_cat']['counts']) + live._series['bar_cat']['other'] == 3500
+    assert sum(live._series['time_d_v']['counts']) == 3500
+
+
+def test_merged_series_match_rebuilt_ones(live, monkeypatch):
+    monkeypatch.setattr(live_dashboard, 'LIVE_BATCH_SIZE', 1000)
+    append(live.db_path, 0, 2000)
+    live.poll()
+    append(live.db_path, 2000, 2500)
+    assert live.poll()
+    assert live.high_water == 4500
+
+    for chart_id in ('bar_cat', 'time_d_v'):
+        fresh = live.chart_engine.chart_series(live.db_path, 't', CHARTS[chart_id])
+        merged = live._series[chart_id]
+        assert merged['counts'] == fresh['counts']
+        assert merged.get('labels', merged.get('buckets')) == fresh.get('labels', fresh.get('buckets'))
+    assert not live.poll()
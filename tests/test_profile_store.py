@@ -0,0 +1,178 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import stats_engine
+from connection_pool import ConnectionPool
+from data_processor import DataProcessor
+from job_queue import JobQueue
+from profile_store import ProfileStore
+from table_cache import TableCache
+
+
+def _insert_events(db_path, start, stop):
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO events (amount, category) VALUES (?, ?)",
+        [(float(i), f"cat {i % 7}") for i in range(start, stop)]
+    )
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def pool():
+    pool = ConnectionPool()
+    yield pool
+    pool.close_all()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    db_path = str(tmp_path / 'events.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, amount REAL, category TEXT)")
+    conn.close()
+    _insert_events(db_path, 0, 1000)
+    return db_path
+
+
+def test_append_merges_into_profile(tmp_path, db_path, pool):
+    store = ProfileStore(str(tmp_path / 'profiles'), pool=pool)
+    assert store.refresh(db_path, 'events')
+    _insert_events(db_path, 1000, 1500)
+    assert store.get_profile(db_path, 'events') is None
+
+    assert store.refresh(db_path, 'events')
+    merged = store.get_profile(db_path, 'events')
+    assert merged['row_count'] == 1500
+    assert merged['high_water'] == 1500
+
+    rebuilt_store = ProfileStore(str(tmp_path / 'rebuilt'), pool=pool)
+    rebuilt_store.refresh(db_path, 'events')
+    rebuilt = rebuilt_store.get_profile(db_path, 'events')
+
+    amount, expected = merged['stats']['columns']['amount'], rebuilt['stats']['columns']['amount']
+    assert amount['approximate']
+    for key in ('mean', 'min', 'max'):
+        assert amount[key] == expected[key]
+    assert amount['median'] == pytest.approx(expected['median'], rel=0.05)
+
+    category = merged['stats']['columns']['category']
+    assert category['unique_values'] == 7
+    assert category['top_values'] == rebuilt['stats']['columns']['category']['top_values']
+
+
+def test_update_rebuilds_profile(tmp_path, db_path, pool):
+    store = ProfileStore(str(tmp_path / 'profiles'), pool=pool)
+    store.refresh(db_path, 'events')
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE events SET amount = amount + 1000")
+    conn.commit()
+    conn.close()
+
+    store.refresh(db_path, 'events')
+    stats = store.get_profile(db_path, 'events')['stats']
+    assert stats['columns']['amount']['min'] == 1000
+    assert not stats['columns']['amount'].get('approximate')
+
+
+@pytest.fixture
+def dated_db(tmp_path):
+    db_path = str(tmp_path / 'dated.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE readings (day DATE, epoch DATE, label DATE, value REAL, site TEXT)")
+    conn.executemany(
+        "INSERT INTO readings VALUES (?, ?, ?, ?, ?)",
+        [(f"2024-01-{i % 28 + 1:02d}", 1700000000 + i * 86400, f"week {i}", i * 1.5, f"site {i % 3}")
+         for i in range(60)]
+    )
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def test_date_columns_classified_once(tmp_path, dated_db, pool):
+    processor = DataProcessor(pool=pool, table_cache=TableCache(),
+                              profile_store=ProfileStore(str(tmp_path / 'profiles'), pool=pool))
+    processor.connect_to_database(dated_db)
+
+    with pool.connection(dated_db) as conn:
+        kinds = processor.stats_engine.chart_kinds(conn, 'readings')
+    assert kinds == {'day': 'date', 'epoch': 'numeric', 'label': 'categorical', 'value': 'numeric', 'site': 'categorical'}
+
+    suggestions = processor.get_chart_suggestions('readings')
+    assert 'time_day_value' in suggestions
+    assert 'time_label_value' not in suggestions
+    assert 'bar_label' in suggestions and 'hist_epoch' in suggestions
+
+    # Profiled or not, and from a loaded table, the chart ids are the same
+    processor.profile_store.refresh(dated_db, 'readings')
+    assert processor.get_chart_suggestions('readings') == suggestions
+    assert processor.load_table_data('readings')
+    assert processor.detect_chart_types() == suggestions
+
+
+def test_cancelling_a_group_keeps_other_groups_refresh(tmp_path, db_path, pool):
+    job_queue = JobQueue(workers=1)
+    release = threading.Event()
+    job_queue.submit(lambda job: release.wait(5), "Block the worker", priority=0)
+
+    store = ProfileStore(str(tmp_path / 'profiles'), pool=pool, job_queue=job_queue)
+    [first] = store.refresh_in_background(db_path, ['events'], group='a')
+    [second] = store.refresh_in_background(db_path, ['events'], group='b')
+    assert first != second
+
+    assert job_queue.cancel_group('a') == 1
+    release.set()
+    for _ in range(100):
+        states = {job['id']: job['state'] for job in job_queue.jobs()}
+        if states[second] not in ('queued', 'running'):
+            break
+        time.sleep(0.05)
+    assert states[first] == 'cancelled'
+    assert states[second] == 'done'
+    assert store.get_profile(db_path, 'events')['row_count'] == 1000
+
+
+def test_text_in_numeric_column_is_skipped(tmp_path, db_path, pool, monkeypatch):
+    monkeypatch.setattr(stats_engine, 'TYPE_SAMPLE_ROWS', 10)
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO events (amount, category) VALUES ('unknown', 'cat 0')")
+    conn.commit()
+    conn.close()
+
+    store = ProfileStore(str(tmp_path / 'profiles'), pool=pool)
+    assert store.refresh(db_path, 'events')
+    _insert_events(db_path, 1000, 1100)
+    assert store.refresh(db_path, 'events')
+
+    amount = store.get_profile(db_path, 'events')['stats']['columns']['amount']
+    assert (amount['min'], amount['max']) == (0, 1099)
+
+
+def test_suggestions_use_stored_kinds(tmp_path, dated_db, pool, monkeypatch):
+    store = ProfileStore(str(tmp_path / 'profiles'), pool=pool)
+    processor = DataProcessor(pool=pool, table_cache=TableCache(), profile_store=store)
+    processor.connect_to_database(dated_db)
+    store.refresh(dated_db, 'readings')
+    assert store.get_profile(dated_db, 'readings')['kinds']['day'] == 'date'
+
+    def classify(conn, table_name):
+        raise AssertionError("classified again despite a fresh profile")
+    monkeypatch.setattr(processor.stats_engine, 'chart_kinds', classify)
+    assert 'time_day_value' in processor.get_chart_suggestions('readings')
+
+
+def test_older_profile_format_is_discarded(tmp_path, db_path, pool):
+    store = ProfileStore(str(tmp_path / 'profiles'), pool=pool)
+    store.refresh(db_path, 'events')
+    conn = sqlite3.connect(store.profile_path(db_path))
+    conn.execute("PRAGMA user_version = 1")
+    conn.close()
+
+    assert store.get_profile(db_path, 'events', fresh_only=False) is None
+    assert store.refresh(db_path, 'events')
+    assert store.get_profile(db_path, 'events')['row_count'] == 1000
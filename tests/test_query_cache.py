@@ -0,0 +1,95 @@
+import sqlite3
+
+import pytest
+
+from query_cache import QueryCache, full_scan_warnings, normalize_sql
+from table_cache import database_version
+
+
+@pytest.mark.parametrize('sql, expected', [
+    ("SELECT *\n  FROM   Items;", "select * from items"),
+    ("select * -- trailing comment\nfrom items", "select * from items"),
+    ("SELECT/* inline */name FROM items ;;", "select name from items"),
+    ("SELECT 'It''s  A' FROM \"My  Table\"", "select 'It''s  A' from \"My  Table\""),
+    ("SELECT [Odd  Col], `Other  Col` FROM t", "select [Odd  Col], `Other  Col` from t"),
+    ("SELECT '-- not a comment' FROM t", "select '-- not a comment' from t"),
+])
+def test_normalize_sql(sql, expected):
+    assert normalize_sql(sql) == expected
+
+
+def test_literal_case_keeps_keys_apart():
+    assert normalize_sql("SELECT * FROM t WHERE name = 'A'") != normalize_sql("SELECT * FROM t WHERE name = 'a'")
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    db_path = str(tmp_path / 'queries.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.executemany("INSERT INTO items (name) VALUES (?)", [(f"item {i}",) for i in range(50)])
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def _result(rows=1):
+    return {'columns': ['id'], 'rows': [[i] for i in range(rows)], 'truncated': False}
+
+
+def test_equivalent_sql_hits_until_database_changes(db_path):
+    cache = QueryCache()
+    result = _result()
+    cache.put(db_path, "SELECT id FROM items", 100, result)
+    assert cache.get(db_path, "select  id\nfrom ITEMS;", 100) is result
+    assert cache.get(db_path, "SELECT id FROM items", 10) is None
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO items (name) VALUES ('new')")
+    conn.commit()
+    conn.close()
+    assert cache.get(db_path, "SELECT id FROM items", 100) is None
+
+
+def test_ttl_and_size_limits(db_path, monkeypatch):
+    cache = QueryCache(max_entries=2, ttl=0)
+    cache.put(db_path, "SELECT 1", 100, _result())
+    monkeypatch.setattr('query_cache.time.monotonic', lambda: float('inf'))
+    assert cache.get(db_path, "SELECT 1", 100) is None
+    assert cache.stats()['expirations'] == 1
+    monkeypatch.undo()
+
+    cache = QueryCache(max_entries=2)
+    for i in range(3):
+        cache.put(db_path, f"SELECT {i}", 100, _result())
+    assert cache.get(db_path, "SELECT 0", 100) is None
+    assert cache.stats()['evictions'] == 1
+
+    small = QueryCache(max_bytes=10)
+    small.put(db_path, "SELECT 1", 100, _result(100))
+    assert small.stats()['entries'] == 0
+
+
+def test_full_scan_warnings(db_path):
+    conn = sqlite3.connect(db_path)
+    assert full_scan_warnings(conn, "SELECT * FROM items i WHERE name = 'x'", min_rows=10) == [
+        "Full scan of table 'items' (about 50 rows)"
+    ]
+    assert full_scan_warnings(conn, "SELECT * FROM items WHERE id = 3", min_rows=10) == []
+    assert full_scan_warnings(conn, "SELECT * FROM items LIMIT 5", min_rows=10) == []
+    assert full_scan_warnings(conn, "SELECT * FROM items", min_rows=1000) == []
+    assert full_scan_warnings(conn, "SELECT * FROM missing", min_rows=10) == []
+    conn.close()
+
+
+def test_result_stored_under_starting_version(db_path):
+    cache = QueryCache()
+    started = database_version(db_path)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO items (name) VALUES ('written while running')")
+    conn.commit()
+    conn.close()
+
+    cache.put(db_path, "SELECT id FROM items", 100, _result(), version=started)
+    assert cache.get(db_path, "SELECT id FROM items", 100) is None
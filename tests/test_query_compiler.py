@@ -0,0 +1,71 @@
+import sqlite3
+
+import pytest
+
+from query_compiler import MAX_IN_VALUES, column_affinity, compile_filter_query, compile_filters, quote_identifier
+
+COLUMNS = [
+    {'name': 'id', 'type': 'INTEGER'},
+    {'name': 'price', 'type': 'REAL'},
+    {'name': 'name', 'type': 'VARCHAR(20)'},
+    {'name': 'odd "col"', 'type': ''},
+]
+
+
+@pytest.mark.parametrize('declared, affinity', [
+    ('INTEGER', 'INTEGER'), ('BIGINT', 'INTEGER'), ('VARCHAR(20)', 'TEXT'), ('', 'BLOB'),
+    ('DOUBLE', 'REAL'), ('DECIMAL(10,2)', 'NUMERIC'), ('DATE', 'NUMERIC'),
+])
+def test_column_affinity(declared, affinity):
+    assert column_affinity(declared) == affinity
+
+
+def test_quote_identifier_escapes_quotes():
+    assert quote_identifier('odd "col"') == '"odd ""col"""'
+
+
+def test_compile_shapes():
+    where, params = compile_filters('items', {
+        'id': [1, '2', None],
+        'price': {'min': '1.5', 'max': 10},
+        'name': 5,
+        'odd "col"': None,
+    }, COLUMNS)
+    assert where == (
+        ' WHERE ("id" IN (?, ?) OR "id" IS NULL) AND "price" BETWEEN ? AND ? '
+        'AND "name" = ? AND "odd ""col""" IS NULL'
+    )
+    assert params == [1, 2, 1.5, 10, '5']
+
+
+def test_one_sided_ranges_and_empty_filters():
+    assert compile_filters('items', {'price': {'min': 3}}, COLUMNS) == (' WHERE "price" >= ?', [3])
+    assert compile_filters('items', {'price': {'max': 3}}, COLUMNS) == (' WHERE "price" <= ?', [3])
+    assert compile_filters('items', {'price': {}}, COLUMNS) == ('', [])
+    assert compile_filters('items', {'id': []}, COLUMNS) == (' WHERE 0', [])
+    assert compile_filters('items', {}, COLUMNS) == ('', [])
+
+
+@pytest.mark.parametrize('filter_params', [
+    [],
+    {'missing': 1},
+    {'id': 'abc'},
+    {'id': float('nan')},
+    {'id': {'min': 1, 'step': 2}},
+    {'name': {'nested': [1]}},
+    {'name': [[1]]},
+    {'id': list(range(MAX_IN_VALUES + 1))},
+])
+def test_invalid_filters_rejected(filter_params):
+    with pytest.raises(ValueError):
+        compile_filters('items', filter_params, COLUMNS)
+
+
+def test_injection_stays_a_value():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE items (id INTEGER, price REAL, name VARCHAR(20), \"odd \"\"col\"\"\")")
+    conn.executemany("INSERT INTO items VALUES (?, ?, ?, NULL)", [(1, 2.0, 'a'), (2, 3.0, "x' OR '1'='1")])
+
+    query, params = compile_filter_query('items', {'name': "x' OR '1'='1"}, COLUMNS, columns=['id'])
+    assert query.startswith('SELECT "id" FROM "items" WHERE')
+    assert conn.execute(query, params).fetchall() == [(2,)]
@@ -0,0 +1,91 @@
+import sqlite3
+import time
+
+import pytest
+
+import query_runner
+from query_runner import QueryRunner
+
+# Runs until interrupted
+SLOW_QUERY = (
+    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+    "SELECT COUNT(*) FROM n"
+)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'query.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(50)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_submit_returns_before_query_finishes(db_path):
+    runner = QueryRunner(timeout=5)
+    start = time.monotonic()
+    query_id = runner.submit(db_path, SLOW_QUERY, owner='me')
+    assert time.monotonic() - start < 1
+    assert runner.result(query_id, owner='me')['status'] == 'running'
+    assert runner.stats()['running'] == 1
+
+    assert runner.result(query_id, owner='someone else') is None
+    assert not runner.cancel(query_id, owner='someone else')
+    assert runner.cancel(query_id, owner='me')
+    result = runner.result(query_id, owner='me', wait=5)
+    assert result['error'] == "Query cancelled"
+    assert runner.stats()['running'] == 0
+
+
+def test_timeout(db_path):
+    runner = QueryRunner(timeout=0.2)
+    query_id = runner.submit(db_path, SLOW_QUERY)
+    assert 'timed out' in runner.result(query_id, wait=5)['error']
+
+
+def test_result_and_row_cap(db_path):
+    done = []
+    runner = QueryRunner(max_rows=10)
+    query_id = runner.submit(db_path, "SELECT x FROM t ORDER BY x", on_done=done.append)
+    result = runner.result(query_id, wait=5)
+    assert result['columns'] == ['x']
+    assert [row[0] for row in result['rows']] == list(range(10))
+    assert result['truncated'] and result['sql'] == "SELECT x FROM t ORDER BY x"
+    assert done and done[0]['rows'] == result['rows']
+
+
+@pytest.mark.parametrize('sql', [
+    "DELETE FROM t",
+    "PRAGMA query_only = OFF",
+    "ATTACH DATABASE ':memory:' AS other",
+])
+def test_writes_refused(db_path, sql):
+    runner = QueryRunner()
+    assert 'error' in runner.result(runner.submit(db_path, sql), wait=5)
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 50
+    conn.close()
+
+
+def test_queue_limit_and_duplicate_ids(db_path):
+    runner = QueryRunner(workers=1, max_queued=0, timeout=5)
+    query_id = runner.submit(db_path, SLOW_QUERY)
+    assert 'error' in runner.submit(db_path, "SELECT 1")
+    assert runner.stats()['rejected'] == 1
+    assert 'error' in runner.submit(db_path, "SELECT 1", query_id=query_id)
+    runner.cancel(query_id)
+
+
+def test_finished_results_expire(db_path, monkeypatch):
+    monkeypatch.setattr(query_runner, 'MAX_FINISHED_QUERIES', 2)
+    runner = QueryRunner()
+    query_ids = []
+    for _ in range(3):
+        query_ids.append(runner.submit(db_path, "SELECT 1"))
+        runner.result(query_ids[-1], wait=5)
+    runner.submit(db_path, "SELECT 1")
+    assert runner.result(query_ids[0]) is None
+    assert runner.result(query_ids[2]) is not None
@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import serialization
+from serialization import ORIENTS, frame_to_json
+
+
+@pytest.fixture(params=['orjson', 'pandas'])
+def encoder(request, monkeypatch):
+    if request.param == 'orjson':
+        if serialization.orjson is None:
+            pytest.skip("orjson not installed")
+    else:
+        monkeypatch.setattr(serialization, 'orjson', None)
+    return request.param
+
+
+def sample_frame():
+    return pd.DataFrame({
+        'i': pd.array([1, None, 3], dtype='Int64'),
+        'f': [0.12345678901234567, np.nan, 2.5],
+        's': ['a', None, 'c'],
+        'd': pd.to_datetime(['2024-01-02', None, '2024-03-04']),
+    })
+
+
+def test_orients(encoder):
+    df = sample_frame()
+    records = json.loads(frame_to_json(df, 'records'))
+    assert records[0]['i'] == 1 and records[1]['i'] is None
+    assert records[1]['f'] is None and records[1]['d'] is None
+    assert records[2]['d'].startswith('2024-03-04')
+
+    split = json.loads(frame_to_json(df, 'split'))
+    assert split['columns'] == ['i', 'f', 's', 'd']
+    assert [row[2] for row in split['data']] == ['a', None, 'c']
+
+    columns = json.loads(frame_to_json(df, 'columns'))
+    assert columns['i'] == [1, None, 3]
+
+
+def test_float_precision(encoder):
+    value = json.loads(frame_to_json(sample_frame(), 'columns'))['f'][0]
+    assert value == pytest.approx(0.12345678901234567, rel=1e-14)
+
+
+def test_unknown_orient():
+    assert 'index' not in ORIENTS
+    with pytest.raises(ValueError):
+        frame_to_json(sample_frame(), 'index')
+
+
+def test_compressed_response_gets_weak_etag():
+    from flask import Response
+    from werkzeug.datastructures import Accept
+
+    body = json.dumps({'values': list(range(2000))})
+    response = Response(body, mimetype='application/json')
+    response.set_etag('abc')
+    compressed = serialization.compress_response(response, Accept([('gzip', 1)]))
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.get_etag() == ('abc', True)
+
+    plain = Response(body, mimetype='application/json')
+    plain.set_etag('abc')
+    assert serialization.compress_response(plain, Accept([])).get_etag() == ('abc', False)
@@ -0,0 +1,39 @@
+from session_registry import ProcessorRegistry
+
+
+class FakeProcessor:
+    def __init__(self):
+        self.db_path = None
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_sessions_get_their_own_processor():
+    registry = ProcessorRegistry(processor_factory=FakeProcessor)
+    first = registry.get('a')
+    assert registry.get('a') is first
+    assert registry.get('b') is not first
+    assert len(registry) == 2
+
+
+def test_remove_closes_processor():
+    registry = ProcessorRegistry(processor_factory=FakeProcessor)
+    processor = registry.get('a')
+    registry.remove('a')
+    assert processor.closed
+    assert len(registry) == 0
+    assert registry.get('a') is not processor
+    registry.remove('missing')
+
+
+def test_least_recently_used_evicted():
+    registry = ProcessorRegistry(max_sessions=2, processor_factory=FakeProcessor)
+    first = registry.get('a')
+    second = registry.get('b')
+    registry.get('a')
+    registry.get('c')
+    assert len(registry) == 2
+    assert second.closed
+    assert not first.closed
@@ -0,0 +1,65 @@
+import sqlite3
+
+import pytest
+
+import stats_engine
+from connection_pool import ConnectionPool
+from stats_engine import StatsEngine
+
+
+@pytest.fixture
+def pool():
+    pool = ConnectionPool()
+    yield pool
+    pool.close_all()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    db_path = str(tmp_path / 'mixed.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE readings (value, site TEXT)")
+    conn.executemany("INSERT INTO readings VALUES (?, ?)", [(i, f"site {i % 3}") for i in range(1, 10)])
+    # Past the type sample: text stored in a column classified as numeric
+    conn.executemany("INSERT INTO readings VALUES (?, ?)", [('n/a', 'site 0'), ('high', 'site 1')])
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+@pytest.mark.parametrize('large', [False, True])
+def test_numeric_stats_skip_text_values(db_path, pool, monkeypatch, large):
+    monkeypatch.setattr(stats_engine, 'TYPE_SAMPLE_ROWS', 5)
+    if large:
+        monkeypatch.setattr(stats_engine, 'LARGE_TABLE_ROWS', 5)
+        monkeypatch.setattr(stats_engine, 'SAMPLE_ROWS', 100)
+
+    stats = StatsEngine(pool).table_stats(db_path, 'readings')
+    assert stats['total_records'] == 11
+    assert stats['columns']['value'] == dict(
+        {'mean': 5.0, 'median': 5.0, 'min': 1, 'max': 9},
+        **({'approximate': True} if large else {})
+    )
+
+
+def test_even_count_median(tmp_path, pool):
+    db_path = str(tmp_path / 'even.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE t (value REAL)")
+    conn.executemany("INSERT INTO t VALUES (?)", [(v,) for v in (4, 1, 3, 2)])
+    conn.commit()
+    conn.close()
+    assert StatsEngine(pool).table_stats(db_path, 't')['columns']['value']['median'] == 2.5
+
+
+def test_stats_cached_per_database_version(db_path, pool):
+    engine = StatsEngine(pool)
+    first = engine.table_stats(db_path, 'readings')
+    assert engine.table_stats(db_path, 'readings') is first
+    assert engine.stats()['hits'] == 1
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO readings VALUES (100, 'site 2')")
+    conn.commit()
+    conn.close()
+    assert engine.table_stats(db_path, 'readings')['total_records'] == 12
@@ -0,0 +1,98 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from table_cache import TableCache, database_version
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    db_path = str(tmp_path / 'cache.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE t (a INTEGER)")
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def _loader(calls, rows=1):
+    def load():
+        calls.append(1)
+        return pd.DataFrame({'a': range(rows)})
+    return load
+
+
+def test_version_changes_on_write(db_path):
+    version = database_version(db_path)
+    assert database_version(db_path) == version
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO t VALUES (2)")
+    conn.commit()
+    conn.close()
+    assert database_version(db_path) != version
+
+
+def test_hit_until_database_changes(db_path):
+    cache = TableCache()
+    calls = []
+    first = cache.acquire(db_path, 't', _loader(calls))
+    assert cache.acquire(db_path, 't', _loader(calls)) is first
+    assert len(calls) == 1
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO t VALUES (2)")
+    conn.commit()
+    conn.close()
+
+    assert cache.acquire(db_path, 't', _loader(calls)) is not first
+    assert len(calls) == 2
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['invalidations']) == (1, 2, 1)
+
+
+def test_column_subsets_cached_separately(db_path):
+    cache = TableCache()
+    calls = []
+    full = cache.acquire(db_path, 't', _loader(calls))
+    subset = cache.acquire(db_path, 't', _loader(calls), columns=['a'])
+    assert subset is not full
+    assert cache.acquire(db_path, 't', _loader(calls), columns=['a']) is subset
+    assert len(calls) == 2
+
+
+def test_only_unreferenced_entries_evicted(db_path):
+    cache = TableCache(max_entries=1)
+    calls = []
+    held = cache.acquire(db_path, 't', _loader(calls))
+    other = cache.acquire(db_path, 'u', _loader(calls))
+    assert cache.stats()['entries'] == 2
+
+    cache.release(db_path, 'u', other)
+    assert [entry['table'] for entry in cache.stats()['tables']] == ['t']
+    assert cache.acquire(db_path, 't', _loader(calls)) is held
+
+
+def test_evicts_over_byte_limit(db_path):
+    cache = TableCache(max_bytes=1)
+    df = cache.acquire(db_path, 't', _loader([], rows=100))
+    assert cache.stats()['bytes'] > 1
+    cache.release(db_path, 't', df)
+    stats = cache.stats()
+    assert (stats['entries'], stats['bytes'], stats['evictions']) == (0, 0, 1)
+
+
+def test_failed_load_releases_load_lock(db_path):
+    cache = TableCache()
+
+    def fail():
+        raise ValueError("unreadable")
+
+    with pytest.raises(ValueError):
+        cache.acquire(db_path, 't', fail)
+    assert cache._load_locks == {}
+    assert cache.stats()['entries'] == 0
+    assert len(cache.acquire(db_path, 't', _loader([]))) == 1
+    assert cache._load_locks == {}
@@ -0,0 +1,85 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from table_loader import combine_chunks, is_date_type, read_table
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE t (n INTEGER, x REAL, cat TEXT, mixed, day DATE, bad DATE, epoch TIMESTAMP)")
+    rows = []
+    for i in range(12):
+        gap = 4 <= i < 8  # the second 4-row chunk is NULL in most columns
+        rows.append((
+            None if gap else i,
+            None if gap else i * 0.5,
+            None if gap else ('a' if i < 4 else 'b' if i % 2 else 'c'),
+            i if i % 3 else f"s{i}",
+            None if gap else f"2024-01-{i + 1:02d}",
+            'not a date' if i == 11 else f"2024-02-{i + 1:02d}",
+            1700000000 + i,
+        ))
+    conn.executemany("INSERT INTO t VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    yield conn
+    conn.close()
+
+
+def test_null_only_chunk_keeps_column_types(conn):
+    chunked = read_table(conn, 't', chunk_rows=4)
+    whole = read_table(conn, 't', chunk_rows=1000)
+    assert chunked['n'].dtype.kind == 'f' and chunked['x'].dtype.kind == 'f'
+    assert isinstance(chunked['cat'].dtype, pd.CategoricalDtype)
+    assert chunked['n'].isna().sum() == 4
+    pd.testing.assert_frame_equal(chunked, whole, check_dtype=False, check_categorical=False)
+
+
+def test_categories_merged_across_chunks(conn):
+    df = read_table(conn, 't', columns=['cat'], chunk_rows=4)
+    assert list(df['cat'].cat.categories) == ['a', 'b', 'c']
+    assert df['cat'].tolist()[:4] == ['a'] * 4
+    assert df['cat'].tolist()[8:] == ['c', 'b', 'c', 'b']
+
+
+def test_mixed_type_column_keeps_values(conn):
+    df = read_table(conn, 't', columns=['mixed'], chunk_rows=4)
+    assert df['mixed'].dtype == object
+    assert df['mixed'].tolist() == [i if i % 3 else f"s{i}" for i in range(12)]
+
+
+def test_declared_dates(conn):
+    df = read_table(conn, 't', chunk_rows=4)
+    assert pd.api.types.is_datetime64_any_dtype(df['day'])
+    assert df['day'].isna().sum() == 4
+    # One unparseable value keeps the column as stored; numbers are never parsed
+    assert df['bad'].dtype == object and df['bad'].iloc[-1] == 'not a date'
+    assert pd.api.types.is_integer_dtype(df['epoch'])
+
+    raw = read_table(conn, 't', columns=['day'], parse_date_columns=False)
+    assert raw['day'].iloc[0] == '2024-01-01'
+
+
+def test_mostly_unique_text_is_not_a_category():
+    chunks = [
+        pd.DataFrame({'name': pd.Series([f"n{i}" for i in range(start, start + 4)], dtype='category')})
+        for start in (0, 4)
+    ]
+    assert combine_chunks(chunks)['name'].dtype == object
+
+
+def test_empty_and_unknown(conn):
+    conn.execute("CREATE TABLE empty (a INTEGER, b TEXT)")
+    assert list(read_table(conn, 'empty').columns) == ['a', 'b']
+    with pytest.raises(ValueError):
+        read_table(conn, 'missing')
+    with pytest.raises(ValueError):
+        read_table(conn, 't', columns=['nope'])
+
+
+@pytest.mark.parametrize('declared, expected', [
+    ('DATE', True), ('datetime', True), ('TIMESTAMP', True), ('TEXT', False), (None, False),
+])
+def test_is_date_type(declared, expected):
+    assert is_date_type(declared) is expected
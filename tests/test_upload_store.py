@@ -0,0 +1,126 @@
+import hashlib
+import io
+import os
+import time
+
+import pytest
+
+import upload_store
+from upload_store import UploadStore
+
+CONTENT = b'SQLite format 3\x00' + bytes(range(256)) * 40
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadStore(str(tmp_path))
+
+
+def upload_in_chunks(store, content, chunk_size=1000, filename='data.db'):
+    upload_id = store.start(filename, len(content))['upload_id']
+    offset = 0
+    while offset < len(content):
+        chunk = content[offset:offset + chunk_size]
+        offset = store.append(upload_id, offset, io.BytesIO(chunk), len(chunk))
+    return upload_id, store.complete(upload_id)
+
+
+def test_chunked_upload(store):
+    upload_id, result = upload_in_chunks(store, CONTENT)
+    assert not result['deduplicated']
+    assert result['sha256'] == hashlib.sha256(CONTENT).hexdigest()
+    with open(result['db_path'], 'rb') as f:
+        assert f.read() == CONTENT
+    assert os.listdir(store.partial_dir) == []
+    assert upload_id not in store._upload_locks
+
+
+def test_resume_after_wrong_offset(store):
+    upload_id = store.start('data.db', len(CONTENT))['upload_id']
+    store.append(upload_id, 0, io.BytesIO(CONTENT[:500]), 500)
+    with pytest.raises(ValueError):
+        store.append(upload_id, 0, io.BytesIO(CONTENT[:500]), 500)
+
+    # A client that lost track asks where to continue
+    received = store.status(upload_id)['received']
+    assert received == 500
+    store.append(upload_id, received, io.BytesIO(CONTENT[received:]), len(CONTENT) - received)
+    assert store.complete(upload_id)['sha256'] == hashlib.sha256(CONTENT).hexdigest()
+
+
+def test_resume_after_restart(store, tmp_path):
+    upload_id = store.start('data.db', len(CONTENT))['upload_id']
+    store.append(upload_id, 0, io.BytesIO(CONTENT[:700]), 700)
+
+    # A new store has no running hash and rebuilds it from the .part file
+    restarted = UploadStore(str(tmp_path))
+    restarted.append(upload_id, 700, io.BytesIO(CONTENT[700:]), len(CONTENT) - 700)
+    assert restarted.complete(upload_id)['sha256'] == hashlib.sha256(CONTENT).hexdigest()
+
+
+def test_duplicate_content_is_deduplicated(store):
+    _, first = upload_in_chunks(store, CONTENT)
+    upload_id, second = upload_in_chunks(store, CONTENT, filename='copy.db')
+    assert second == {'db_path': first['db_path'], 'sha256': first['sha256'], 'deduplicated': True}
+    assert not os.path.exists(os.path.join(store.upload_dir, 'copy.db'))
+    assert upload_id not in store._upload_locks and os.listdir(store.partial_dir) == []
+
+    announced = store.start('again.db', len(CONTENT), sha256=first['sha256'].upper())
+    assert announced == {'db_path': first['db_path'], 'deduplicated': True}
+
+
+def test_same_name_different_content(store):
+    _, first = upload_in_chunks(store, CONTENT)
+    _, second = upload_in_chunks(store, CONTENT[::-1])
+    assert first['db_path'] != second['db_path']
+
+
+def test_hash_mismatch_aborts(store):
+    upload_id = store.start('data.db', len(CONTENT), sha256='0' * 64)['upload_id']
+    store.append(upload_id, 0, io.BytesIO(CONTENT), len(CONTENT))
+    with pytest.raises(ValueError):
+        store.complete(upload_id)
+    assert os.listdir(store.partial_dir) == []
+    assert upload_id not in store._upload_locks
+
+
+def test_rejects_bad_input(store):
+    with pytest.raises(ValueError):
+        store.start('data.exe', 10)
+    with pytest.raises(ValueError):
+        store.start('data.db', 0)
+    upload_id = store.start('data.db', 10)['upload_id']
+    with pytest.raises(ValueError):
+        store.append(upload_id, 0, io.BytesIO(b'x' * 11), 11)
+    with pytest.raises(ValueError):
+        store.complete(upload_id)
+    with pytest.raises(ValueError):
+        store.status('../etc')
+
+
+def test_abort_releases_lock(store):
+    upload_id = store.start('data.db', 10)['upload_id']
+    store.append(upload_id, 0, io.BytesIO(b'x' * 5), 5)
+    store.abort(upload_id)
+    assert upload_id not in store._upload_locks
+    assert os.listdir(store.partial_dir) == []
+
+
+def test_stale_uploads_removed(store, tmp_path, monkeypatch):
+    stale_id = store.start('old.db', 10)['upload_id']
+    fresh_id = store.start('new.db', 10)['upload_id']
+    old = time.time() - upload_store.STALE_UPLOAD_SECONDS - 60
+    os.utime(store._part_path(stale_id), (old, old))
+
+    # Runs when a store is created...
+    UploadStore(str(tmp_path))
+    assert not os.path.exists(store._part_path(stale_id))
+    assert store.status(fresh_id)['received'] == 0
+
+    # ...and again when an upload starts once the interval has passed
+    os.utime(store._part_path(fresh_id), (old, old))
+    store.start('other.db', 10)
+    assert os.path.exists(store._part_path(fresh_id))
+    monkeypatch.setattr(upload_store, 'CLEANUP_INTERVAL_SECONDS', 0)
+    store.start('other.db', 10)
+    assert not os.path.exists(store._part_path(fresh_id))
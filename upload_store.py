@@ -0,0 +1,297 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+from werkzeug.exceptions import ClientDisconnected
+from werkzeug.utils import secure_filename
+
+# Largest chunk accepted per request, and the block size used to stream it to disk
+MAX_CHUNK_BYTES = 16 * 1024 * 1024
+STREAM_BLOCK_BYTES = 1024 * 1024
+
+# Unfinished uploads untouched for this long are removed by cleanup(), which
+# runs when the store is created and then at most once per interval as uploads start
+STALE_UPLOAD_SECONDS = 24 * 3600
+CLEANUP_INTERVAL_SECONDS = 3600
+
+# Extensions accepted for uploaded databases
+UPLOAD_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+
+class UploadStore:
+    """Chunked, resumable database uploads with content-hash deduplication.
+
+    An upload is started with the file name and size, then receives chunks
+    in order: each append gives the offset it starts at, which must equal the
+    bytes received so far, so a client that lost its connection asks for
+    the current offset and continues from there. Chunks are streamed to a
+    .part file in small blocks and fed to a SHA-256 as they arrive.
+
+    Finished files are indexed by hash. Uploading (or announcing, via the
+    sha256 passed to start) content that is already in the upload folder
+    returns the existing file instead of storing a second copy.
+
+    Abandoned uploads are removed after STALE_UPLOAD_SECONDS.
+    """
+
+    def __init__(self, upload_dir):
+        self.upload_dir = upload_dir
+        self.partial_dir = os.path.join(upload_dir, '.partial')
+        self.index_path = os.path.join(upload_dir, '.upload_index.json')
+
+        self._lock = threading.Lock()
+        self._upload_locks = {}  # upload_id -> Lock, so chunks of one upload are written one at a time
+        self._hashers = {}       # upload_id -> running sha256 of the bytes received
+        self._last_cleanup = 0
+
+        os.makedirs(self.partial_dir, exist_ok=True)
+        self._cleanup_if_due()
+
+    def _meta_path(self, upload_id):
+        return os.path.join(self.partial_dir, f"{upload_id}.json")
+
+    def _part_path(self, upload_id):
+        return os.path.join(self.partial_dir, f"{upload_id}.part")
+
+    def _load_index(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def find(self, sha256):
+        """Path of a stored upload with this content hash, or None"""
+        with self._lock:
+            entry = self._load_index().get(sha256)
+        if entry is None:
+            return None
+        path = os.path.join(self.upload_dir, entry['filename'])
+        if not os.path.exists(path) or os.path.getsize(path) != entry['size']:
+            return None
+        return path
+
+    @staticmethod
+    def _check_filename(filename):
+        filename = secure_filename(filename or '')
+        if not filename or not filename.lower().endswith(UPLOAD_EXTENSIONS):
+            raise ValueError(f"Database file must have one of these extensions: {', '.join(UPLOAD_EXTENSIONS)}")
+        return filename
+
+    def start(self, filename, size, sha256=None):
+        """Begin an upload. Returns {'upload_id', 'received'} or {'db_path', 'deduplicated'} if sha256 is known."""
+        filename = self._check_filename(filename)
+        if not isinstance(size, int) or size <= 0:
+            raise ValueError("File size must be a positive integer")
+        self._cleanup_if_due()
+
+        if sha256:
+            existing = self.find(sha256.lower())
+            if existing:
+                return {'db_path': existing, 'deduplicated': True}
+
+        upload_id = uuid.uuid4().hex
+        meta = {
+            'filename': filename,
+            'size': size,
+            'sha256': sha256.lower() if sha256 else None,
+            'started_at': time.time()
+        }
+        with open(self._meta_path(upload_id), 'w') as f:
+            json.dump(meta, f)
+        open(self._part_path(upload_id), 'wb').close()
+
+        with self._lock:
+            self._hashers[upload_id] = hashlib.sha256()
+        return {'upload_id': upload_id, 'received': 0}
+
+    def _meta(self, upload_id):
+        if not upload_id.isalnum():
+            raise ValueError("Invalid upload id")
+        try:
+            with open(self._meta_path(upload_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            raise ValueError("Unknown upload id")
+
+    def _upload_lock(self, upload_id):
+        with self._lock:
+            return self._upload_locks.setdefault(upload_id, threading.Lock())
+
+    def _hasher(self, upload_id):
+        """Running hash for an upload, rebuilt from the .part file after a restart"""
+        with self._lock:
+            hasher = self._hashers.get(upload_id)
+        if hasher is None:
+            hasher = hashlib.sha256()
+            with open(self._part_path(upload_id), 'rb') as f:
+                for block in iter(lambda: f.read(STREAM_BLOCK_BYTES), b''):
+                    hasher.update(block)
+            with self._lock:
+                self._hashers[upload_id] = hasher
+        return hasher
+
+    def status(self, upload_id):
+        """Return {'upload_id', 'filename', 'size', 'received'} for an unfinished upload"""
+        meta = self._meta(upload_id)
+        return {
+            'upload_id': upload_id,
+            'filename': meta['filename'],
+            'size': meta['size'],
+            'received': os.path.getsize(self._part_path(upload_id))
+        }
+
+    def append(self, upload_id, offset, stream, length):
+        """Append `length` bytes read from stream at `offset`. Returns the new received count.
+
+        Raises ValueError if the offset doesn't match the bytes received so
+        far (the client should resume from status()['received']) or if the
+        chunk is too large or runs past the announced size.
+        """
+        meta = self._meta(upload_id)
+        if length is None or length <= 0:
+            raise ValueError("Chunk must have a Content-Length")
+        if length > MAX_CHUNK_BYTES:
+            raise ValueError(f"Chunk too large (max {MAX_CHUNK_BYTES} bytes)")
+
+        with self._upload_lock(upload_id):
+            part_path = self._part_path(upload_id)
+            received = os.path.getsize(part_path)
+            if offset != received:
+                raise ValueError(f"Expected offset {received}")
+            if received + length > meta['size']:
+                raise ValueError("Chunk runs past the end of the file")
+
+            hasher = self._hasher(upload_id)
+            written = 0
+            with open(part_path, 'ab') as f:
+                try:
+                    while written < length:
+                        block = stream.read(min(STREAM_BLOCK_BYTES, length - written))
+                        if not block:
+                            break
+                        f.write(block)
+                        hasher.update(block)
+                        written += len(block)
+                except ClientDisconnected:
+                    pass
+
+            if written < length:
+                # Client disconnected mid-chunk: drop the partial chunk so the hash stays in step
+                with open(part_path, 'ab') as f:
+                    f.truncate(received)
+                with self._lock:
+                    self._hashers.pop(upload_id, None)
+                raise ValueError("Chunk was cut short, resume from the last offset")
+
+            return received + written
+
+    def complete(self, upload_id):
+        """Finish an upload. Returns {'db_path', 'sha256', 'deduplicated'}."""
+        meta = self._meta(upload_id)
+
+        with self._upload_lock(upload_id):
+            part_path = self._part_path(upload_id)
+            if os.path.getsize(part_path) != meta['size']:
+                raise ValueError("Upload is incomplete")
+
+            sha256 = self._hasher(upload_id).hexdigest()
+            if meta['sha256'] and meta['sha256'] != sha256:
+                self.abort(upload_id)
+                raise ValueError("Uploaded file does not match the expected SHA-256")
+
+            existing = self.find(sha256)
+            if existing:
+                self.abort(upload_id)
+                return {'db_path': existing, 'sha256': sha256, 'deduplicated': True}
+
+            # Keep the uploaded name unless another database already uses it
+            filename = meta['filename']
+            if os.path.exists(os.path.join(self.upload_dir, filename)):
+                stem, ext = os.path.splitext(filename)
+                filename = f"{stem}-{sha256[:8]}{ext}"
+            db_path = os.path.join(self.upload_dir, filename)
+            os.replace(part_path, db_path)
+            os.remove(self._meta_path(upload_id))
+
+            with self._lock:
+                self._hashers.pop(upload_id, None)
+                index = self._load_index()
+                index[sha256] = {'filename': filename, 'size': meta['size'], 'uploaded_at': time.time()}
+                self._save_index(index)
+
+        with self._lock:
+            self._upload_locks.pop(upload_id, None)
+        return {'db_path': db_path, 'sha256': sha256, 'deduplicated': False}
+
+    def save(self, filename, stream):
+        """Store a whole file from a stream (e.g. a form upload), hashed and deduplicated like chunked uploads"""
+        filename = self._check_filename(filename)
+        upload_id = uuid.uuid4().hex
+        hasher = hashlib.sha256()
+        size = 0
+        with open(self._part_path(upload_id), 'wb') as f:
+            for block in iter(lambda: stream.read(STREAM_BLOCK_BYTES), b''):
+                f.write(block)
+                hasher.update(block)
+                size += len(block)
+
+        with open(self._meta_path(upload_id), 'w') as f:
+            json.dump({'filename': filename, 'size': size, 'sha256': None, 'started_at': time.time()}, f)
+        with self._lock:
+            self._hashers[upload_id] = hasher
+        return self.complete(upload_id)
+
+    def abort(self, upload_id):
+        """Discard an unfinished upload"""
+        if not upload_id.isalnum():
+            return
+        for path in (self._part_path(upload_id), self._meta_path(upload_id)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._hashers.pop(upload_id, None)
+            self._upload_locks.pop(upload_id, None)
+
+    def _cleanup_if_due(self):
+        """Run cleanup() unless it ran within the last CLEANUP_INTERVAL_SECONDS"""
+        now = time.monotonic()
+        with self._lock:
+            if self._last_cleanup and now - self._last_cleanup < CLEANUP_INTERVAL_SECONDS:
+                return
+            self._last_cleanup = now
+        try:
+            removed = self.cleanup()
+        except OSError as e:
+            print(f"Error removing stale uploads: {e}")
+            return
+        if removed:
+            print(f"Removed {removed} stale unfinished uploads")
+
+    def cleanup(self, max_age=STALE_UPLOAD_SECONDS):
+        """Remove unfinished uploads that have not received data for max_age seconds"""
+        cutoff = time.time() - max_age
+        removed = 0
+        for name in os.listdir(self.partial_dir):
+            if not name.endswith('.part'):
+                continue
+            upload_id = name[:-len('.part')]
+            try:
+                stale = os.path.getmtime(os.path.join(self.partial_dir, name)) < cutoff
+            except OSError:
+                continue  # finished or aborted meanwhile
+            if stale:
+                self.abort(upload_id)
+                removed += 1
+        return removed
@@ -0,0 +1,49 @@
+import os
+
+from job_queue import PRIORITY_ROW_COUNT, PRIORITY_CHARTS
+
+
+def schedule_warmup(job_queue, processor, group=None):
+    """Queue warm-up jobs for every table of a connected DataProcessor.
+
+    Row counts (for the tables page) run first, then table profiles (stats
+    and chart kinds), then the dashboard charts are pre-rendered into the
+    chart cache. The processor should be dedicated to warm-up so the jobs
+    don't swap tables under a user's session. Returns the job ids.
+    """
+    db_path = processor.db_path
+    tables = processor.get_table_list()
+    db_key = os.path.abspath(db_path)
+
+    job_ids = [
+        job_queue.submit(
+            lambda job, table_name=table_name: processor.count_table_rows(table_name),
+            f"Count rows of {table_name}",
+            group=group,
+            priority=PRIORITY_ROW_COUNT,
+            key=('rows', db_key, table_name, group)
+        )
+        for table_name in tables
+    ]
+
+    if processor.profile_store:
+        job_ids.extend(processor.profile_store.refresh_in_background(db_path, tables, group=group))
+
+    def prerender(job, table_name):
+        try:
+            return processor.prerender_charts(table_name, job=job)
+        finally:
+            # Charts that need a DataFrame load it; don't keep it leased once warm
+            processor.close()
+
+    job_ids.extend(
+        job_queue.submit(
+            lambda job, table_name=table_name: prerender(job, table_name),
+            f"Render charts for {table_name}",
+            group=group,
+            priority=PRIORITY_CHARTS,
+            key=('charts', db_key, table_name, group)
+        )
+        for table_name in tables
+    )
+    return job_ids